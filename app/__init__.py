@@ -1,13 +1,19 @@
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, jsonify
 from flask_cors import CORS
 from werkzeug.exceptions import HTTPException
-import jwt
-from functools import wraps
 
 from config import Config
-from app.routes.auth import bp as auth_bp
+from app.routes.auth import bp as auth_bp, require_auth
 from app.routes.jobs import bp as jobs_bp
 from app.routes.environments import bp as environments_bp
+from app.routes.admin import bp as admin_bp
+from app.routes.metrics import bp as metrics_bp
+from app.models.environment import Environment
+from app.services.env_prober import env_prober
+from app.utils.compression import init_compression
+from app.utils.static_assets import StaticAssets, build_static
+from app.utils.request_stats import init_request_stats, request_stats
+from app.utils.profiling import init_profiling, profiler
 
 
 def create_app(config_class=Config) -> Flask:
@@ -16,42 +22,46 @@ def create_app(config_class=Config) -> Flask:
 
     CORS(app, resources={r"/api/*": {"origins": "*"}})
 
-    def require_auth(f):
-        @wraps(f)
-        def wrapper(*args, **kwargs):
-            if request.path.startswith('/api/auth/'):
-                return f(*args, **kwargs)
-            auth_header = request.headers.get('Authorization', '')
-            if not auth_header.startswith('Bearer '):
-                return jsonify({'error': 'Missing or invalid Authorization header'}), 401
-            token = auth_header.split(' ', 1)[1]
-            try:
-                jwt.decode(
-                    token, app.config['SECRET_KEY'], algorithms=['HS256'])
-            except jwt.ExpiredSignatureError:
-                return jsonify({'error': 'Token expired'}), 401
-            except jwt.InvalidTokenError:
-                return jsonify({'error': 'Invalid token'}), 401
-            return f(*args, **kwargs)
-        return wrapper
-
-    # decorate all api view funcs except auth
-    for bp in (auth_bp, jobs_bp, environments_bp):
-        for endpoint, func in list(bp.view_functions.items()):
-            if not endpoint.startswith('auth.'):
-                bp.view_functions[endpoint] = require_auth(func)
-
     app.register_blueprint(auth_bp)
     app.register_blueprint(jobs_bp)
     app.register_blueprint(environments_bp)
+    app.register_blueprint(admin_bp)
+    app.register_blueprint(metrics_bp)
+
+    # Blueprint views only exist on the app once registered, so wrap them here
+    for endpoint, func in list(app.view_functions.items()):
+        if endpoint.split('.', 1)[0] in (jobs_bp.name, environments_bp.name):
+            app.view_functions[endpoint] = require_auth(func)
+
+    if app.config['PROBE_INTERVAL_SECONDS'] > 0:
+        env_prober.start_background(
+            app.config['PROBE_INTERVAL_SECONDS'], Environment.find_all)
+
+    static_assets = StaticAssets(app.static_folder, app.config['STATIC_BUILD_DIR'],
+                                 max_age=app.config['STATIC_MAX_AGE_SECONDS'])
+    app.view_functions['static'] = static_assets.send
+
+    # Registered before compression so recorded sizes are the compressed ones
+    init_request_stats(app, request_stats)
+    init_profiling(app, profiler)
+    if app.config['COMPRESSION_ENABLED']:
+        init_compression(app)
 
     @app.route('/')
     def index():
-        return send_from_directory(app.static_folder, 'index.html')
+        return static_assets.send('index.html')
 
     @app.route('/login')
     def login_page():
-        return send_from_directory(app.static_folder, 'login.html')
+        return static_assets.send('login.html')
+
+    @app.cli.command('build-static')
+    def build_static_command():
+        """Pre-compress and fingerprint static assets into STATIC_BUILD_DIR"""
+        result = build_static(app.static_folder, app.config['STATIC_BUILD_DIR'],
+                              min_bytes=app.config['COMPRESSION_MIN_BYTES'])
+        print(f"Compressed {result['compressed']} files, fingerprinted "
+              f"{result['fingerprinted']} into {result['buildDir']}")
 
     @app.errorhandler(Exception)
     def handle_exception(e):
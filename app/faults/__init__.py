@@ -0,0 +1,22 @@
+"""
+Fault injection for the execution layer
+
+With Config.FAULT_SCENARIO pointing at a scenario file, AcpService and
+AverifyService run the bundled fake acp/averify executable instead of
+the configured commands, and SSH-mode jobs connect through a local
+stand-in instead of paramiko. The scenario decides which runs get slow
+handshakes, stalled or huge output, partial bundles or which exit code.
+"""
+import os
+import shlex
+import sys
+
+from app.faults.scenario import EXIT_MESSAGES, FaultRule, FaultScenario, load_scenario
+
+FAKE_ACP = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fake_acp.py')
+
+
+def fake_command(command: str, scenario_path: str) -> str:
+    """Shell command running the fake executable for 'export', 'import' or 'averify'"""
+    return (f'{shlex.quote(sys.executable)} {shlex.quote(FAKE_ACP)} '
+            f'--scenario {shlex.quote(os.path.abspath(scenario_path))} {command}')
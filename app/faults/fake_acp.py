@@ -0,0 +1,110 @@
+"""
+Fake acp / averify executable driven by a fault scenario
+
+Accepts the same arguments the services pass to the real programs:
+
+    fake_acp.py --scenario faults.json export --host H --product-line PL --config C
+    fake_acp.py --scenario faults.json import --host H --config C --bundle B
+    fake_acp.py --scenario faults.json averify --host H --source S --target T
+
+The output is a replay of the matching sample log from app/demo_logs,
+shaped by the selected rule: startup delay, size multiplier, line rate,
+a stall part way through, a bundle (possibly cut short) and the exit
+code. The fault draw is keyed on the working directory, which is the job
+work directory when run by the services.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from scenario import EXIT_MESSAGES, load_scenario  # noqa: E402
+
+DEMO_LOGS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'demo_logs')
+SAMPLE_LOGS = {'export': 'export.log', 'import': 'import.log'}
+CHUNK = 1024 * 1024
+
+
+def sample_lines(command):
+    name = SAMPLE_LOGS.get(command)
+    if name and os.path.exists(os.path.join(DEMO_LOGS, name)):
+        with open(os.path.join(DEMO_LOGS, name), 'r', encoding='utf-8', errors='ignore') as f:
+            return f.read().splitlines()
+    return [f'[INFO] {command} step {i} of 40 completed' for i in range(1, 41)]
+
+
+def emit_log(lines, log, stall, exit_code):
+    """Write the log to stdout, repeating the middle half `multiplier` times"""
+    multiplier = max(float(log.get('multiplier', 1)), 0.0)
+    rate = float(log.get('linesPerSecond', 0))
+    stall_after = int(stall.get('afterLines', -1)) if stall else -1
+    head = len(lines) // 4
+    body = lines[head:len(lines) - head]
+    repeated = int(len(body) * multiplier)
+    # An injected failure stops the run two thirds of the way through
+    total = 2 * head + repeated
+    stop_at = total * 2 // 3 if exit_code else total
+
+    out = sys.stdout
+    written = 0
+    for i in range(stop_at):
+        if i < head:
+            line = lines[i]
+        elif i < head + repeated:
+            line = body[(i - head) % len(body)] if body else ''
+        else:
+            line = lines[len(lines) - total + i]
+        out.write(line + '\n')
+        written += 1
+        if written == stall_after:
+            out.flush()
+            time.sleep(float(stall.get('seconds', 0)))
+        if rate:
+            time.sleep(1 / rate)
+    out.flush()
+
+
+def write_bundle(args, bundle):
+    """Write the export bundle; `partial` keeps only that fraction of its bytes"""
+    size = int(bundle.get('bytes', 4096))
+    partial = bundle.get('partial')
+    if partial is not None:
+        size = int(size * float(partial))
+    name = bundle.get('name', 'export_{productLine}.zip').format(productLine=args.product_line or 'bundle')
+    block = bytes(range(256)) * (CHUNK // 256)
+    with open(name, 'wb') as f:
+        remaining = size
+        while remaining > 0:
+            f.write(block[:min(remaining, CHUNK)])
+            remaining -= CHUNK
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--scenario', required=True)
+    parser.add_argument('command', choices=('export', 'import', 'averify'))
+    parser.add_argument('--host')
+    parser.add_argument('--product-line')
+    parser.add_argument('--config')
+    parser.add_argument('--bundle')
+    parser.add_argument('--source')
+    parser.add_argument('--target')
+    args = parser.parse_args()
+
+    rule = load_scenario(args.scenario).select(
+        ' '.join(sys.argv[1:]), args.host, key=os.path.basename(os.getcwd()))
+    time.sleep(rule.startup_seconds)
+
+    emit_log(sample_lines(args.command), rule.log, rule.stall, rule.exit_code)
+    if args.command == 'export' and (rule.bundle or not rule.exit_code):
+        write_bundle(args, rule.bundle)
+    if rule.exit_code:
+        message = EXIT_MESSAGES.get(rule.exit_code, 'Unexpected error')
+        print(f'[ERROR] {message}')
+        print(f'Program terminated with exit code {rule.exit_code}', flush=True)
+    sys.exit(rule.exit_code)
+
+
+if __name__ == '__main__':
+    main()
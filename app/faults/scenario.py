@@ -0,0 +1,126 @@
+"""
+Fault scenarios - which failures to inject into which commands
+
+A scenario file is JSON:
+
+    {
+      "seed": 7,
+      "rules": [
+        {
+          "name": "qa handshakes are slow",
+          "match": {"command": "export", "host": "qa-*"},
+          "probability": 0.5,
+          "ssh": {"handshakeSeconds": 8, "fail": "timeout"},
+          "startupSeconds": 1,
+          "log": {"multiplier": 50, "linesPerSecond": 2000},
+          "stall": {"afterLines": 300, "seconds": 20},
+          "bundle": {"bytes": 10485760, "partial": 0.4},
+          "exitCode": 4
+        }
+      ]
+    }
+
+The first rule whose match fits (and whose probability draw passes) applies.
+Every field is optional; an empty rule is a clean, successful run. This
+module is stdlib-only so the fake executables can load it without the app.
+"""
+import fnmatch
+import json
+import random
+import shlex
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+# Error line printed for each injected ACP exit code
+EXIT_MESSAGES = {
+    1: 'Unexpected error during processing',
+    2: 'Unable to connect to database: Connection refused',
+    3: 'Authentication failed for user admin',
+    4: 'Invalid configuration file: unexpected element <criteria>',
+    5: 'Required file not found: config.xml',
+    6: 'Permission denied writing to output directory',
+    7: 'Data validation failed for object P00042',
+    8: 'Operation timed out waiting for server response',
+    9: 'Operation cancelled by user',
+}
+
+SSH_FAILURES = ('timeout', 'refused', 'auth')
+
+
+@dataclass
+class FaultRule:
+    name: str = ''
+    command: Optional[str] = None
+    host: Optional[str] = None
+    probability: float = 1.0
+    ssh: Dict = field(default_factory=dict)
+    startup_seconds: float = 0.0
+    log: Dict = field(default_factory=dict)
+    stall: Dict = field(default_factory=dict)
+    bundle: Dict = field(default_factory=dict)
+    exit_code: int = 0
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'FaultRule':
+        match = data.get('match', {})
+        rule = cls(
+            name=data.get('name', ''),
+            command=match.get('command'),
+            host=match.get('host'),
+            probability=float(data.get('probability', 1.0)),
+            ssh=data.get('ssh', {}),
+            startup_seconds=float(data.get('startupSeconds', 0)),
+            log=data.get('log', {}),
+            stall=data.get('stall', {}),
+            bundle=data.get('bundle', {}),
+            exit_code=int(data.get('exitCode', 0)),
+        )
+        if rule.ssh.get('fail') and rule.ssh['fail'] not in SSH_FAILURES:
+            raise ValueError(f"ssh.fail must be one of: {', '.join(SSH_FAILURES)}")
+        if not 0 <= rule.exit_code <= 255:
+            raise ValueError('exitCode must be between 0 and 255')
+        return rule
+
+    def matches(self, command_line: str, host: Optional[str]) -> bool:
+        if self.command and self.command not in shlex.split(command_line):
+            return False
+        if self.host and not fnmatch.fnmatch(host or '', self.host):
+            return False
+        return True
+
+
+class FaultScenario:
+    """Ordered fault rules loaded from a scenario file"""
+
+    def __init__(self, rules: List[FaultRule], seed: Optional[int] = None):
+        self.rules = rules
+        self.seed = seed
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'FaultScenario':
+        return cls([FaultRule.from_dict(r) for r in data.get('rules', [])], data.get('seed'))
+
+    def select(self, command_line: str, host: Optional[str], key: str = '') -> FaultRule:
+        """
+        First rule for this command and host. Probability draws are seeded
+        from the scenario seed and key, so the same key gets the same fault
+        """
+        rnd = random.Random(f'{self.seed}:{key}:{command_line}:{host}')
+        for rule in self.rules:
+            if not rule.matches(command_line, host):
+                continue
+            if rule.probability >= 1 or rnd.random() < rule.probability:
+                return rule
+        return FaultRule(name='clean')
+
+
+_loaded: Dict[str, FaultScenario] = {}
+
+
+def load_scenario(path: str) -> FaultScenario:
+    """Parse a scenario file; cached per path"""
+    scenario = _loaded.get(path)
+    if scenario is None:
+        with open(path, 'r', encoding='utf-8') as f:
+            scenario = _loaded[path] = FaultScenario.from_dict(json.load(f))
+    return scenario
@@ -0,0 +1,43 @@
+"""
+Local SSH stand-in
+
+Behaves like SSHClientWrapper, metrics and job timing included, but the
+handshake is simulated from the scenario's "ssh" section and commands run
+locally in the job work directory, as the remote shell would run them.
+"""
+import itertools
+import socket
+import subprocess
+import time
+from typing import Optional, Tuple
+
+from app.faults.scenario import load_scenario
+from app.utils.ssh_client import SSHClientWrapper
+
+_connections = itertools.count()
+
+
+class LocalSSHClient(SSHClientWrapper):
+    def __init__(self, scenario_path: str, hostname: str, username: str, port: int = 22,
+                 password: Optional[str] = None, key_filename: Optional[str] = None):
+        super().__init__(hostname, username, port, password, key_filename)
+        self.scenario = load_scenario(scenario_path)
+
+    def _connect(self) -> None:
+        # Connections are numbered per process, so a sequential run draws the same faults
+        rule = self.scenario.select('ssh', self.hostname, key=f'ssh-{next(_connections)}')
+        ssh = rule.ssh
+        time.sleep(float(ssh.get('handshakeSeconds', 0)))
+        failure = ssh.get('fail')
+        if failure == 'timeout':
+            raise socket.timeout(f'SSH handshake with {self.hostname} timed out')
+        if failure == 'refused':
+            raise ConnectionRefusedError(f'Connection to {self.hostname}:{self.port} refused')
+        if failure == 'auth':
+            raise PermissionError(f'Authentication failed for {self.username}@{self.hostname}')
+
+    def _exec(self, command: str) -> Tuple[int, str, str]:
+        proc = subprocess.run(command, shell=True, capture_output=True)
+        return (proc.returncode,
+                proc.stdout.decode('utf-8', errors='ignore'),
+                proc.stderr.decode('utf-8', errors='ignore'))
@@ -1,12 +1,34 @@
-import sqlite3
-import json
-from typing import List, Optional, Dict, Any
+import threading
+import time
+from typing import List, Optional, Dict, Any, Tuple
 from contextlib import contextmanager
 import os
 
+from app.utils.sqlite_pool import get_pool
+
+# Column order matches the constructor's positional parameters
+_COLUMNS = ('id', 'tag', 'agile_plm_url', 'propagation_user', 'propagation_password',
+            'dest_jdbc_url', 'dest_tns_name', 'dest_oracle_home', 'dest_db_user',
+            'dest_db_password', 'acp_project_dir')
+_SELECT = f"SELECT {', '.join(_COLUMNS)} FROM environments"
+
 
 class Environment:
     DB_PATH = 'environments.db'
+    DB_POOL_SIZE = 8
+    # How long lookups trust the in-memory catalog before checking whether
+    # another process changed the table (changes in this process apply at once)
+    CATALOG_RECHECK_SECONDS = 1.0
+
+    # Process-wide catalog snapshot: (rows by id, rows by tag, rows ordered by tag)
+    _catalog: Optional[Tuple[Dict[int, tuple], Dict[str, tuple], List[tuple]]] = None
+    _catalog_version: Optional[int] = None
+    _catalog_checked_at = 0.0
+    _catalog_lock = threading.Lock()
+
+    # Schema setup runs once per database file, on first use rather than at import
+    _initialized_path: Optional[str] = None
+    _init_lock = threading.Lock()
 
     def __init__(self, id: Optional[int] = None, tag: str = '', agile_plm_url: str = '',
                  propagation_user: str = '', propagation_password: str = '',
@@ -27,18 +49,32 @@ class Environment:
     @classmethod
     @contextmanager
     def get_db(cls):
-        """Context manager for database connection"""
-        conn = sqlite3.connect(cls.DB_PATH)
-        conn.row_factory = sqlite3.Row
-        try:
+        """Context manager for a pooled database connection"""
+        if cls._initialized_path != cls.DB_PATH:
+            cls._ensure_schema()
+        with get_pool(cls.DB_PATH, cls.DB_POOL_SIZE).connection() as conn:
             yield conn
-        finally:
-            conn.close()
+
+    @classmethod
+    def _from_row(cls, row) -> 'Environment':
+        return cls(*row)
 
     @classmethod
     def init_db(cls):
         """Initialize database table"""
-        with cls.get_db() as conn:
+        cls._ensure_schema(force=True)
+        cls.invalidate_catalog()
+
+    @classmethod
+    def _ensure_schema(cls, force: bool = False):
+        with cls._init_lock:
+            if force or cls._initialized_path != cls.DB_PATH:
+                cls._create_schema()
+                cls._initialized_path = cls.DB_PATH
+
+    @classmethod
+    def _create_schema(cls):
+        with get_pool(cls.DB_PATH, cls.DB_POOL_SIZE).connection() as conn:
             conn.execute('''
                 CREATE TABLE IF NOT EXISTS environments (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -55,15 +91,73 @@ class Environment:
                 )
             ''')
 
-            # Migration: Add acp_project_dir column if it doesn't exist
+            # Migration: Add optional columns missing from older databases,
+            # so lookups can select every column unconditionally
             cursor = conn.execute("PRAGMA table_info(environments)")
             columns = [row[1] for row in cursor.fetchall()]
-            if 'acp_project_dir' not in columns:
-                conn.execute(
-                    'ALTER TABLE environments ADD COLUMN acp_project_dir TEXT')
+            for column in _COLUMNS[5:]:
+                if column not in columns:
+                    conn.execute(
+                        f'ALTER TABLE environments ADD COLUMN {column} TEXT')
+
+            # Every write to the table, from any process, bumps this version
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS environments_version (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    version INTEGER NOT NULL
+                )
+            ''')
+            conn.execute(
+                'INSERT OR IGNORE INTO environments_version (id, version) VALUES (1, 0)')
+            for event in ('INSERT', 'UPDATE', 'DELETE'):
+                conn.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS environments_version_{event.lower()}
+                    AFTER {event} ON environments
+                    BEGIN
+                        UPDATE environments_version SET version = version + 1 WHERE id = 1;
+                    END
+                ''')
 
             conn.commit()
 
+    @classmethod
+    def invalidate_catalog(cls):
+        """Drop the in-memory catalog so the next lookup reloads it"""
+        with cls._catalog_lock:
+            cls._catalog = None
+
+    @classmethod
+    def _get_catalog(cls) -> Tuple[Dict[int, tuple], Dict[str, tuple], List[tuple]]:
+        catalog = cls._catalog
+        if catalog is not None and \
+                time.monotonic() - cls._catalog_checked_at < cls.CATALOG_RECHECK_SECONDS:
+            return catalog
+
+        with cls._catalog_lock:
+            catalog = cls._catalog
+            now = time.monotonic()
+            if catalog is not None and now - cls._catalog_checked_at < cls.CATALOG_RECHECK_SECONDS:
+                return catalog
+            with cls.get_db() as conn:
+                version = conn.execute(
+                    'SELECT version FROM environments_version WHERE id = 1').fetchone()[0]
+                if catalog is None or version != cls._catalog_version:
+                    # Read version and rows from one snapshot
+                    conn.execute('BEGIN')
+                    try:
+                        version = conn.execute(
+                            'SELECT version FROM environments_version WHERE id = 1').fetchone()[0]
+                        rows = conn.execute(f'{_SELECT} ORDER BY tag').fetchall()
+                    finally:
+                        conn.rollback()
+                    catalog = ({row[0]: row for row in rows},
+                               {row[1]: row for row in rows},
+                               rows)
+                    cls._catalog = catalog
+                    cls._catalog_version = version
+            cls._catalog_checked_at = now
+        return catalog
+
     def to_dict(self) -> Dict[str, Any]:
         """Convert environment to dictionary"""
         return {
@@ -121,89 +215,65 @@ class Environment:
                       self.dest_db_user, self.dest_db_password, self.acp_project_dir))
                 self.id = cursor.lastrowid
             conn.commit()
+        self.invalidate_catalog()
         return self
 
+    # Lookups are served from the catalog and return fresh objects, so callers
+    # can modify and save() them without touching the cached rows
+
     @classmethod
     def find_all(cls) -> List['Environment']:
         """Get all environments"""
-        with cls.get_db() as conn:
-            rows = conn.execute(
-                'SELECT * FROM environments ORDER BY tag').fetchall()
-            return [cls(
-                id=row['id'],
-                tag=row['tag'],
-                agile_plm_url=row['agile_plm_url'],
-                propagation_user=row['propagation_user'],
-                propagation_password=row['propagation_password'],
-                dest_jdbc_url=row['dest_jdbc_url'] if 'dest_jdbc_url' in row.keys(
-                ) else '',
-                dest_tns_name=row['dest_tns_name'] if 'dest_tns_name' in row.keys(
-                ) else '',
-                dest_oracle_home=row['dest_oracle_home'] if 'dest_oracle_home' in row.keys(
-                ) else '',
-                dest_db_user=row['dest_db_user'] if 'dest_db_user' in row.keys(
-                ) else '',
-                dest_db_password=row['dest_db_password'] if 'dest_db_password' in row.keys(
-                ) else '',
-                acp_project_dir=row['acp_project_dir'] if 'acp_project_dir' in row.keys(
-                ) else ''
-            ) for row in rows]
+        return [cls._from_row(row) for row in cls._get_catalog()[2]]
 
     @classmethod
     def find_by_id(cls, env_id: int) -> Optional['Environment']:
         """Find environment by ID"""
-        with cls.get_db() as conn:
-            row = conn.execute(
-                'SELECT * FROM environments WHERE id = ?', (env_id,)).fetchone()
-            if row:
-                return cls(
-                    id=row['id'],
-                    tag=row['tag'],
-                    agile_plm_url=row['agile_plm_url'],
-                    propagation_user=row['propagation_user'],
-                    propagation_password=row['propagation_password'],
-                    dest_jdbc_url=row['dest_jdbc_url'] if 'dest_jdbc_url' in row.keys(
-                    ) else '',
-                    dest_tns_name=row['dest_tns_name'] if 'dest_tns_name' in row.keys(
-                    ) else '',
-                    dest_oracle_home=row['dest_oracle_home'] if 'dest_oracle_home' in row.keys(
-                    ) else '',
-                    dest_db_user=row['dest_db_user'] if 'dest_db_user' in row.keys(
-                    ) else '',
-                    dest_db_password=row['dest_db_password'] if 'dest_db_password' in row.keys(
-                    ) else '',
-                    acp_project_dir=row['acp_project_dir'] if 'acp_project_dir' in row.keys(
-                    ) else ''
-                )
-        return None
+        row = cls._get_catalog()[0].get(env_id)
+        return cls._from_row(row) if row else None
 
     @classmethod
     def find_by_tag(cls, tag: str) -> Optional['Environment']:
         """Find environment by tag"""
+        row = cls._get_catalog()[1].get(tag)
+        return cls._from_row(row) if row else None
+
+    @classmethod
+    def bulk_upsert(cls, environments: List['Environment'], prune: bool = False) -> Dict[str, int]:
+        """
+        Insert or update environments by tag in a single transaction.
+        With prune, environments whose tag is not in the list are deleted.
+        """
+        existing = {row[1] for row in cls._get_catalog()[2]}
+        columns = _COLUMNS[1:]
+        params = [tuple(getattr(env, column) for column in columns) for env in environments]
+        tags = [env.tag for env in environments]
         with cls.get_db() as conn:
-            row = conn.execute(
-                'SELECT * FROM environments WHERE tag = ?', (tag,)).fetchone()
-            if row:
-                return cls(
-                    id=row['id'],
-                    tag=row['tag'],
-                    agile_plm_url=row['agile_plm_url'],
-                    propagation_user=row['propagation_user'],
-                    propagation_password=row['propagation_password'],
-                    dest_jdbc_url=row['dest_jdbc_url'] if 'dest_jdbc_url' in row.keys(
-                    ) else '',
-                    dest_tns_name=row['dest_tns_name'] if 'dest_tns_name' in row.keys(
-                    ) else '',
-                    dest_oracle_home=row['dest_oracle_home'] if 'dest_oracle_home' in row.keys(
-                    ) else '',
-                    dest_db_user=row['dest_db_user'] if 'dest_db_user' in row.keys(
-                    ) else '',
-                    acp_project_dir=row['acp_project_dir'] if 'acp_project_dir' in row.keys(
-                    ) else '',
-                    dest_db_password=row['dest_db_password'] if 'dest_db_password' in row.keys(
-                    ) else ''
-                )
-        return None
+            try:
+                conn.executemany(f'''
+                    INSERT INTO environments ({', '.join(columns)})
+                    VALUES ({', '.join('?' for _ in columns)})
+                    ON CONFLICT (tag) DO UPDATE SET
+                        {', '.join(f'{c} = excluded.{c}' for c in columns[1:])}
+                ''', params)
+                deleted = 0
+                if prune:
+                    conn.execute('''
+                        CREATE TEMP TABLE IF NOT EXISTS bulk_tags (tag TEXT PRIMARY KEY)
+                    ''')
+                    conn.execute('DELETE FROM bulk_tags')
+                    conn.executemany('INSERT OR IGNORE INTO bulk_tags (tag) VALUES (?)',
+                                     [(tag,) for tag in tags])
+                    deleted = conn.execute(
+                        'DELETE FROM environments WHERE tag NOT IN (SELECT tag FROM bulk_tags)'
+                    ).rowcount
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        cls.invalidate_catalog()
+        created = len(set(tags) - existing)
+        return {'created': created, 'updated': len(set(tags)) - created, 'deleted': deleted}
 
     def delete(self) -> bool:
         """Delete environment"""
@@ -212,8 +282,6 @@ class Environment:
         with self.get_db() as conn:
             conn.execute('DELETE FROM environments WHERE id = ?', (self.id,))
             conn.commit()
+        self.invalidate_catalog()
         return True
 
-
-# Initialize database on module import
-Environment.init_db()
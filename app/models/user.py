@@ -1,9 +1,17 @@
 import bcrypt
 import jwt
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from dataclasses import dataclass
 from typing import Optional
 
+from config import Config
+
+
+class LoginBusyError(Exception):
+    """Raised when too many logins are already waiting for password verification"""
+
 
 @dataclass
 class User:
@@ -22,15 +30,34 @@ class User:
         return jwt.encode(payload, secret, algorithm='HS256')
 
 
-# demo single user
-_password = b'admin'
+# demo single user; the default hash is bcrypt('admin'), precomputed so
+# importing this module does not spend a full bcrypt round at startup
+_DEFAULT_ADMIN_HASH = b'$2b$12$8kGpCcGyWvq0iAMqJk6APu13VMkYH8C2mP1Pj5xtXDRuRRBBErVha'
 ADMIN_USER = User(
     username='admin',
-    password_hash=bcrypt.hashpw(_password, bcrypt.gensalt()),
+    password_hash=Config.ADMIN_PASSWORD_HASH.encode('utf-8') or _DEFAULT_ADMIN_HASH,
 )
 
 
+# bcrypt is deliberately slow; run it on a dedicated, bounded pool and
+# turn away logins beyond LOGIN_MAX_PENDING instead of queueing them
+_login_executor = ThreadPoolExecutor(
+    max_workers=Config.LOGIN_WORKERS, thread_name_prefix='login')
+_login_slots = threading.BoundedSemaphore(Config.LOGIN_MAX_PENDING)
+
+
 def authenticate(username: str, password: str) -> Optional[User]:
-    if username == ADMIN_USER.username and ADMIN_USER.verify_password(password):
+    if username != ADMIN_USER.username:
+        return None
+    if not _login_slots.acquire(blocking=False):
+        raise LoginBusyError('Too many concurrent login attempts')
+    try:
+        future = _login_executor.submit(ADMIN_USER.verify_password, password)
+    except Exception:
+        _login_slots.release()
+        raise
+    # The slot is held until verification actually finishes, even if we time out
+    future.add_done_callback(lambda _: _login_slots.release())
+    if future.result(timeout=Config.LOGIN_TIMEOUT_SECONDS):
         return ADMIN_USER
     return None
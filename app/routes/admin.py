@@ -0,0 +1,109 @@
+from flask import Blueprint, Response, g, request, jsonify
+from werkzeug.exceptions import BadRequest, Conflict, Forbidden, NotFound
+
+from app.routes.auth import require_auth
+from app.utils.profiling import profiler
+from app.utils.request_stats import request_stats
+from config import Config
+
+bp = Blueprint('admin', __name__, url_prefix='/api/admin')
+
+PROFILE_FORMATS = {
+    'pstats': ('application/octet-stream', 'pstats'),
+    'text': ('text/plain', 'txt'),
+    'collapsed': ('text/plain', 'collapsed.txt'),
+}
+MAX_PROFILE_REQUESTS = 1000
+MAX_PROFILE_SECONDS = 300
+
+
+@bp.before_request
+@require_auth
+def require_admin():
+    if g.token_claims.get('sub') not in Config.ADMIN_USERS:
+        raise Forbidden('Admin access required')
+
+
+@bp.route('/requests', methods=['GET'])
+def get_request_stats():
+    """Latency histograms and payload sizes per endpoint"""
+    return jsonify(request_stats.snapshot())
+
+
+@bp.route('/requests/slow', methods=['GET'])
+def get_slow_requests():
+    limit = request.args.get('limit', default=100, type=int)
+    return jsonify({
+        'thresholdMs': request_stats.slow_ms,
+        'requests': request_stats.slow_requests(limit),
+    })
+
+
+@bp.route('/requests', methods=['DELETE'])
+def reset_request_stats():
+    request_stats.reset()
+    return jsonify({'success': True})
+
+
+@bp.route('/profile', methods=['POST'])
+def start_profile():
+    """
+    Start a profiling session: {"mode": "requests", "requests": N, "pathPrefix": "/api/jobs"}
+    profiles the next N matching requests; {"mode": "sample", "seconds": S} samples
+    every thread in this worker for S seconds
+    """
+    body = request.get_json(silent=True) or {}
+    try:
+        requests = int(body.get('requests', 10))
+        seconds = float(body.get('seconds', 10))
+        interval_ms = float(body.get('intervalMs', 10))
+    except (TypeError, ValueError):
+        raise BadRequest('requests, seconds and intervalMs must be numbers')
+    if not 1 <= requests <= MAX_PROFILE_REQUESTS:
+        raise BadRequest(f'requests must be between 1 and {MAX_PROFILE_REQUESTS}')
+    if not 0 < seconds <= MAX_PROFILE_SECONDS:
+        raise BadRequest(f'seconds must be between 0 and {MAX_PROFILE_SECONDS}')
+
+    try:
+        session = profiler.start(body.get('mode', 'requests'), requests=requests,
+                                 seconds=seconds, interval_ms=interval_ms,
+                                 path_prefix=body.get('pathPrefix') or '')
+    except ValueError as e:
+        raise BadRequest(str(e))
+    except RuntimeError as e:
+        raise Conflict(str(e))
+    return jsonify(session.to_dict()), 202
+
+
+@bp.route('/profile', methods=['GET'])
+def list_profiles():
+    return jsonify({'sessions': [s.to_dict() for s in profiler.sessions()]})
+
+
+@bp.route('/profile/stop', methods=['POST'])
+def stop_profile():
+    session = profiler.stop()
+    if not session:
+        raise NotFound('No profiling session is running')
+    return jsonify(session.to_dict())
+
+
+@bp.route('/profile/<session_id>', methods=['GET'])
+def download_profile(session_id):
+    """Download results as ?format=pstats (load with pstats.Stats), text or collapsed"""
+    session = profiler.get(session_id)
+    if not session:
+        raise NotFound('Profile session not found')
+    if not session.finished:
+        raise Conflict('Profile session is still running')
+    fmt = request.args.get('format', 'collapsed')
+    if fmt not in PROFILE_FORMATS:
+        raise BadRequest(f'format must be one of: {", ".join(PROFILE_FORMATS)}')
+    try:
+        data = session.export(fmt)
+    except ValueError as e:
+        raise BadRequest(str(e))
+    mimetype, extension = PROFILE_FORMATS[fmt]
+    return Response(data, mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename=profile-{session.id}.{extension}'
+    })
@@ -1,11 +1,40 @@
-from flask import Blueprint, request, jsonify
-from werkzeug.exceptions import Unauthorized, BadRequest
+import jwt
+from functools import wraps
+from flask import Blueprint, g, request, jsonify
+from concurrent.futures import TimeoutError
+from werkzeug.exceptions import Unauthorized, BadRequest, TooManyRequests, ServiceUnavailable
 
-from app.models.user import authenticate
+from app.models.user import authenticate, LoginBusyError
+from app.utils.token_cache import TokenCache
 from config import Config
 
 bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 
+# Tokens that already passed jwt.decode, so polls skip the signature check
+token_cache = TokenCache(Config.TOKEN_CACHE_SIZE)
+
+
+def require_auth(f):
+    """Reject requests without a valid bearer token; its claims are left in g.token_claims"""
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        auth_header = request.headers.get('Authorization', '')
+        if not auth_header.startswith('Bearer '):
+            return jsonify({'error': 'Missing or invalid Authorization header'}), 401
+        token = auth_header.split(' ', 1)[1]
+        payload = token_cache.get(token)
+        if payload is None:
+            try:
+                payload = jwt.decode(token, Config.SECRET_KEY, algorithms=['HS256'])
+            except jwt.ExpiredSignatureError:
+                return jsonify({'error': 'Token expired'}), 401
+            except jwt.InvalidTokenError:
+                return jsonify({'error': 'Invalid token'}), 401
+            token_cache.add(token, payload.get('exp'), payload)
+        g.token_claims = payload
+        return f(*args, **kwargs)
+    return wrapper
+
 
 @bp.route('/login', methods=['POST'])
 def login():
@@ -16,7 +45,12 @@ def login():
     if not username or not password:
         raise BadRequest('Username and password are required')
 
-    user = authenticate(username, password)
+    try:
+        user = authenticate(username, password)
+    except LoginBusyError:
+        raise TooManyRequests('Too many concurrent login attempts, please retry')
+    except TimeoutError:
+        raise ServiceUnavailable('Login timed out, please retry')
     if not user:
         raise Unauthorized('Invalid credentials')
 
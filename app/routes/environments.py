@@ -1,15 +1,55 @@
-from flask import Blueprint, request, jsonify
+import csv
+import io
+import json
+from flask import Blueprint, Response, request, jsonify
 from app.models.environment import Environment
+from app.services.env_prober import env_prober
 
 bp = Blueprint('environments', __name__, url_prefix='/api/environments')
 
+REQUIRED_FIELDS = ['tag', 'agilePlmUrl',
+                   'propagationUser', 'propagationPassword']
+
+# Field order for bulk export/import (id is assigned by the database)
+EXPORT_FIELDS = ['tag', 'agilePlmUrl', 'propagationUser', 'propagationPassword',
+                 'destJdbcUrl', 'destTnsName', 'destOracleHome', 'destDbUser',
+                 'destDbPassword', 'acpProjectDir']
+
 
 @bp.route('', methods=['GET'])
 def list_environments():
     """Get all environments"""
     try:
         environments = Environment.find_all()
-        return jsonify([env.to_dict() for env in environments]), 200
+        if request.args.get('probe', 'false').lower() == 'true':
+            env_prober.probe_all(environments)
+        result = []
+        for env in environments:
+            data = env.to_dict()
+            data['health'] = env_prober.cached(env.tag)
+            result.append(data)
+        return jsonify(result), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/probe', methods=['POST'])
+def probe_environments():
+    """Check reachability of all environments now"""
+    try:
+        return jsonify(env_prober.probe_all(Environment.find_all())), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/<int:env_id>/probe', methods=['POST'])
+def probe_environment(env_id):
+    """Check reachability of one environment now"""
+    try:
+        env = Environment.find_by_id(env_id)
+        if not env:
+            return jsonify({'error': 'Environment not found'}), 404
+        return jsonify(env_prober.probe(env)), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -35,9 +75,7 @@ def create_environment():
             return jsonify({'error': 'No data provided'}), 400
 
         # Validate required fields
-        required_fields = ['tag', 'agilePlmUrl',
-                           'propagationUser', 'propagationPassword']
-        for field in required_fields:
+        for field in REQUIRED_FIELDS:
             if not data.get(field):
                 return jsonify({'error': f'Missing required field: {field}'}), 400
 
@@ -66,9 +104,7 @@ def update_environment(env_id):
             return jsonify({'error': 'Environment not found'}), 404
 
         # Validate required fields
-        required_fields = ['tag', 'agilePlmUrl',
-                           'propagationUser', 'propagationPassword']
-        for field in required_fields:
+        for field in REQUIRED_FIELDS:
             if not data.get(field):
                 return jsonify({'error': f'Missing required field: {field}'}), 400
 
@@ -78,6 +114,7 @@ def update_environment(env_id):
             if existing:
                 return jsonify({'error': f'Environment with tag "{data["tag"]}" already exists'}), 409
 
+        env_prober.forget(env.tag)
         env.tag = data['tag']
         env.agile_plm_url = data['agilePlmUrl']
         env.propagation_user = data['propagationUser']
@@ -102,6 +139,106 @@ def delete_environment(env_id):
             return jsonify({'error': 'Environment not found'}), 404
 
         env.delete()
+        env_prober.forget(env.tag)
         return jsonify({'message': 'Environment deleted successfully'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+
+def _read_bulk_payload():
+    """Return (format, rows) from a JSON body, a CSV body or an uploaded file"""
+    fmt = request.args.get('format')
+    if 'file' in request.files:
+        upload = request.files['file']
+        fmt = fmt or ('csv' if upload.filename.lower().endswith('.csv') else 'json')
+        text = upload.read().decode('utf-8-sig')
+    elif request.is_json and fmt != 'csv':
+        data = request.get_json(silent=True)
+        if data is None:
+            raise ValueError('invalid JSON body')
+        if isinstance(data, dict):
+            data = data.get('environments')
+        return 'json', data
+    else:
+        fmt = fmt or ('csv' if 'csv' in (request.content_type or '') else 'json')
+        text = request.get_data(as_text=True)
+
+    if fmt == 'csv':
+        return 'csv', list(csv.DictReader(io.StringIO(text)))
+    data = json.loads(text)
+    if isinstance(data, dict):
+        data = data.get('environments')
+    return 'json', data
+
+
+@bp.route('/import', methods=['POST'])
+def import_environments():
+    """Bulk create/update environments by tag from JSON or CSV"""
+    try:
+        try:
+            fmt, rows = _read_bulk_payload()
+        except (ValueError, UnicodeDecodeError, csv.Error) as e:
+            return jsonify({'error': f'Could not parse payload: {e}'}), 400
+        if not isinstance(rows, list) or not rows:
+            return jsonify({'error': 'No environments provided'}), 400
+
+        # Validate everything before writing anything
+        errors = []
+        seen = set()
+        environments = []
+        for index, row in enumerate(rows, 1):
+            if not isinstance(row, dict):
+                errors.append(f'Row {index}: expected an object')
+                continue
+            missing = [field for field in REQUIRED_FIELDS if not row.get(field)]
+            if missing:
+                errors.append(f'Row {index}: missing required field(s): {", ".join(missing)}')
+                continue
+            if row['tag'] in seen:
+                errors.append(f'Row {index}: duplicate tag "{row["tag"]}"')
+                continue
+            seen.add(row['tag'])
+            env = Environment.from_dict({field: row.get(field) or '' for field in EXPORT_FIELDS})
+            environments.append(env)
+        if errors:
+            return jsonify({'error': 'Validation failed', 'details': errors}), 400
+
+        prune = request.args.get('prune', 'false').lower() == 'true'
+        result = Environment.bulk_upsert(environments, prune=prune)
+        result['format'] = fmt
+        return jsonify(result), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/export', methods=['GET'])
+def export_environments():
+    """Stream all environments as JSON or CSV"""
+    fmt = request.args.get('format', 'json').lower()
+    if fmt not in ('json', 'csv'):
+        return jsonify({'error': 'format must be json or csv'}), 400
+    environments = Environment.find_all()
+
+    def generate_json():
+        yield '['
+        for index, env in enumerate(environments):
+            data = env.to_dict()
+            yield (',' if index else '') + json.dumps({field: data[field] for field in EXPORT_FIELDS})
+        yield ']'
+
+    def generate_csv():
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        for env in environments:
+            writer.writerow(env.to_dict())
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+
+    if fmt == 'csv':
+        return Response(generate_csv(), mimetype='text/csv', headers={
+            'Content-Disposition': 'attachment; filename=environments.csv'})
+    return Response(generate_json(), mimetype='application/json', headers={
+        'Content-Disposition': 'attachment; filename=environments.json'})
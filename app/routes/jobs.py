@@ -1,14 +1,23 @@
 import os
+import time
 import uuid
-import shutil
+import sqlite3
 from flask import Blueprint, request, jsonify, send_file
-from werkzeug.exceptions import BadRequest, NotFound
+from werkzeug.exceptions import BadRequest, NotFound, ServiceUnavailable
 from werkzeug.utils import secure_filename
 
-from app.services.job_manager import JobManager
-from app.services.acp_service import AcpService
-from app.services.averify_service import AverifyService
+from app.services.job_manager import job_manager
 from app.services.demo_service import demo_service
+from app.services.export_cache import export_cache
+from app.services.fanout import fanout_manager
+from app.services.job_launcher import job_launcher, ssh_config
+from app.services.pipeline_manager import pipeline_manager
+from app.services.resource_scheduler import resource_claims, resource_scheduler
+from app.services.analysis_cache import analysis_cache
+from app.services.parser_rules import rule_registry
+from app.services.log_index import log_index
+from app.services.error_rollups import error_rollups
+from app.services.env_prober import env_prober
 from app.utils.validators import sanitize_filename
 from app.models.environment import Environment
 from config import Config
@@ -19,10 +28,6 @@ bp = Blueprint('jobs', __name__, url_prefix='/api/jobs')
 UPLOAD_FOLDER = os.path.join(os.getcwd(), 'work', 'uploads')
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-job_manager = JobManager()
-acp_service = AcpService()
-averify_service = AverifyService()
-
 
 def _require_json():
     data = request.get_json(silent=True)
@@ -31,6 +36,21 @@ def _require_json():
     return data
 
 
+def _preflight(body, *env_tags):
+    """Fail fast if any known environment a job depends on is unreachable"""
+    if not body.get('preflight', Config.PREFLIGHT_CHECKS):
+        return
+    for tag in env_tags:
+        env = Environment.find_by_tag(tag) if tag else None
+        if not env:
+            continue
+        health = env_prober.check(env)
+        failed = [c for c in health['checks'] if c['ok'] is False]
+        if failed:
+            details = '; '.join(f"{c['target']} {c['endpoint']}: {c.get('error')}" for c in failed)
+            raise ServiceUnavailable(f'Environment "{tag}" is not reachable ({details})')
+
+
 @bp.route('/upload', methods=['POST'])
 def upload_file():
     """Upload a file (config, bundle, etc.) for use in jobs"""
@@ -61,6 +81,63 @@ def list_jobs():
     return jsonify(jobs)
 
 
+@bp.route('/search', methods=['GET'])
+def search_logs():
+    """Full-text search across job output and ACP log files"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        raise BadRequest('q is required')
+    limit = min(request.args.get('limit', default=50, type=int), 500)
+    started = time.perf_counter()
+    try:
+        results = log_index.search(
+            query,
+            limit=limit,
+            job_id=request.args.get('jobId'),
+            job_type=request.args.get('jobType'),
+            raw=request.args.get('raw', 'false').lower() == 'true',
+        )
+    except sqlite3.OperationalError as e:
+        raise BadRequest(f'Invalid search query: {e}')
+    return jsonify({
+        'query': query,
+        'results': results,
+        'tookMs': round((time.perf_counter() - started) * 1000, 2),
+    })
+
+
+@bp.route('/failures/top', methods=['GET'])
+def top_failures():
+    """Most recurring error signatures across jobs in a time window"""
+    return jsonify(error_rollups.top_failures(
+        days=max(request.args.get('days', default=7, type=int), 1),
+        host=request.args.get('host'),
+        job_type=request.args.get('jobType'),
+        level=request.args.get('level'),
+        limit=min(request.args.get('limit', default=20, type=int), 200),
+    ))
+
+
+@bp.route('/failures/<signature>/trend', methods=['GET'])
+def failure_trend(signature):
+    """Daily occurrences of one error signature"""
+    return jsonify({
+        'signature': signature,
+        'days': error_rollups.trend(
+            signature,
+            days=max(request.args.get('days', default=30, type=int), 1),
+            host=request.args.get('host'),
+            job_type=request.args.get('jobType'),
+        ),
+    })
+
+
+@bp.route('/timings', methods=['GET'])
+def job_timings():
+    """Where finished jobs spent their wall-clock time, per job type and phase"""
+    return jsonify(job_manager.phase_summary(request.args.get('jobType')))
+
+
 @bp.route('/<job_id>', methods=['GET'])
 def get_job(job_id):
     job = job_manager.get_job(job_id)
@@ -94,21 +171,10 @@ def get_acp_log(job_id):
     if not job:
         raise NotFound('Job not found')
 
-    work_dir = job_manager.get_job_work_dir(job_id)
-
-    # Determine which log file to look for based on job type
-    log_filename = None
-    if job.type == 'acp-export':
-        log_filename = 'export.log'
-    elif job.type == 'acp-import':
-        log_filename = 'import.log'
-    elif job.type == 'file-copy':
-        log_filename = 'filecopy.log'
-
-    if not log_filename:
+    log_path = job_manager.get_acp_log_path(job_id)
+    if not log_path:
         raise NotFound('No ACP log file available for this job type')
-
-    log_path = os.path.join(work_dir, log_filename)
+    log_filename = os.path.basename(log_path)
 
     if not os.path.exists(log_path):
         raise NotFound(f'ACP log file not found: {log_filename}')
@@ -136,6 +202,27 @@ def get_job_analysis(job_id):
     })
 
 
+@bp.route('/reanalyze', methods=['POST'])
+def reanalyze_jobs():
+    """Re-analyze finished jobs whose parser rules changed since they ran"""
+    body = request.get_json(silent=True) or {}
+    if body.get('reloadRules') and Config.PARSER_RULES_FILE:
+        try:
+            rule_registry.load_file(Config.PARSER_RULES_FILE)
+        except ValueError as e:
+            raise BadRequest(str(e))
+
+    reanalyzed = 0
+    for job in job_manager.list_jobs():
+        if job_manager.reanalyze_job(job.id):
+            reanalyzed += 1
+    return jsonify({
+        'reanalyzed': reanalyzed,
+        'unchanged': len(job_manager.jobs) - reanalyzed,
+        'cache': analysis_cache.stats(),
+    })
+
+
 @bp.route('/<job_id>/download', methods=['GET'])
 def download_output(job_id):
     job = job_manager.get_job(job_id)
@@ -156,169 +243,98 @@ def download_output(job_id):
     return send_file(path, as_attachment=True)
 
 
+def _start_job(job_type, body, *env_tags):
+    """Validate a job request, run the preflight checks and start the job"""
+    try:
+        job_launcher.validate(job_type, body)
+    except ValueError as e:
+        raise BadRequest(str(e))
+    _preflight(body, *env_tags)
+    return job_launcher.start(job_type, body)
+
+
 @bp.route('/acp/export', methods=['POST'])
 def acp_export():
     body = _require_json()
-    xml_config = body.get('xmlConfig')
-    product_line = body.get('productLine')
-    host = body.get('host')
-    source_env_tag = body.get('sourceEnv')
-    mode = body.get('mode', 'local')
-    ssh = body.get('ssh', {})
-    if not xml_config or not product_line or not host:
-        raise BadRequest('xmlConfig, productLine and host are required')
-
-    # Get environment to retrieve acp_project_dir
-    env = None
-    if source_env_tag:
-        env = Environment.find_by_tag(source_env_tag)
-
-    acp_project_dir = env.acp_project_dir if env and env.acp_project_dir else None
-
-    remote = (mode == 'ssh')
-    ssh_cfg = None
-    if remote:
-        ssh_host = ssh.get('host') or host
-        ssh_user = ssh.get('username')
-        ssh_port = ssh.get('port', 22)
-        if not ssh_user:
-            raise BadRequest('ssh.username required for SSH mode')
-        ssh_cfg = {
-            'hostname': ssh_host,
-            'username': ssh_user,
-            'port': ssh_port,
-            'password': ssh.get('password'),
-            'key_filename': ssh.get('keyFilename'),
-        }
-
-    job_id = job_manager.create_job(job_type='acp-export')
-    work_dir = job_manager.get_job_work_dir(job_id)
+    job_id = _start_job('acp-export', body, body.get('sourceEnv'))
+    return jsonify({'jobId': job_id})
 
-    # If acp_project_dir is specified, copy the uploaded config to it as config.xml
-    if acp_project_dir and os.path.exists(acp_project_dir):
-        config_dest = os.path.join(acp_project_dir, 'config.xml')
-        if os.path.exists(xml_config):
-            shutil.copy2(xml_config, config_dest)
-            xml_config = config_dest
-            work_dir = acp_project_dir
 
-    def _run():
-        if Config.DEMO_MODE:
-            return demo_service.simulate_acp_export(
-                host=host,
-                product_line=product_line,
-                work_dir=work_dir
-            )
-        return acp_service.run_acp_export(
-            host=host,
-            xml_config_path=xml_config,
-            product_line=product_line,
-            work_dir=work_dir,
-            remote=remote,
-            ssh_config=ssh_cfg,
-        )
+@bp.route('/acp/export/cache', methods=['GET'])
+def export_cache_stats():
+    """Cached export bundles, most recently used first"""
+    return jsonify(export_cache.stats())
 
-    job_manager.start_job(job_id, _run)
-    return jsonify({'jobId': job_id})
+
+@bp.route('/acp/export/cache', methods=['DELETE'])
+def invalidate_export_cache():
+    """Drop cached bundles for ?sourceEnv= (and &productLine=), e.g. after admin changes there"""
+    body = request.get_json(silent=True) or {}
+    source_env = request.args.get('sourceEnv') or body.get('sourceEnv')
+    product_line = request.args.get('productLine') or body.get('productLine')
+    removed = job_launcher.invalidate_exports(source_env, product_line)
+    return jsonify({'removed': removed})
 
 
 @bp.route('/acp/import', methods=['POST'])
 def acp_import():
-    body = _require_json()
-    xml_config = body.get('xmlConfig')
-    export_bundle = body.get('exportBundle')
-    host = body.get('host')
-    mode = body.get('mode', 'local')
-    ssh = body.get('ssh', {})
-
     # In demo mode, xmlConfig and exportBundle are optional (simulated)
-    if not Config.DEMO_MODE:
-        if not xml_config or not export_bundle or not host:
-            raise BadRequest('xmlConfig, exportBundle and host are required')
-    else:
-        if not host:
-            raise BadRequest('host is required')
-    remote = (mode == 'ssh')
-    ssh_cfg = None
-    if remote:
-        ssh_host = ssh.get('host') or host
-        ssh_user = ssh.get('username')
-        ssh_port = ssh.get('port', 22)
-        if not ssh_user:
-            raise BadRequest('ssh.username required for SSH mode')
-        ssh_cfg = {
-            'hostname': ssh_host,
-            'username': ssh_user,
-            'port': ssh_port,
-            'password': ssh.get('password'),
-            'key_filename': ssh.get('keyFilename'),
-        }
-    job_id = job_manager.create_job(job_type='acp-import')
-    work_dir = job_manager.get_job_work_dir(job_id)
+    body = _require_json()
+    job_id = _start_job('acp-import', body, body.get('targetEnv'))
+    return jsonify({'jobId': job_id})
 
-    def _run():
-        if Config.DEMO_MODE:
-            return demo_service.simulate_acp_import(host=host, work_dir=work_dir)
-        return acp_service.run_acp_import(
-            host=host,
-            xml_config_path=xml_config,
-            export_bundle_path=export_bundle,
-            work_dir=work_dir,
-            remote=remote,
-            ssh_config=ssh_cfg,
-        )
 
-    job_manager.start_job(job_id, _run)
-    return jsonify({'jobId': job_id})
+@bp.route('/acp/import/fanout', methods=['POST'])
+def acp_import_fanout():
+    """Import one bundle into several target environments (see app/services/fanout.py)"""
+    body = _require_json()
+    try:
+        targets = fanout_manager.parse(body)
+    except ValueError as e:
+        raise BadRequest(str(e))
+    _preflight(body, *[target for target, _ in targets])
+    parent = fanout_manager.submit(body)
+    return jsonify({'jobId': parent.id, 'children': parent.children})
 
 
 @bp.route('/averify/run', methods=['POST'])
 def run_averify():
     body = _require_json()
-    source_env = body.get('sourceEnv')
-    target_env = body.get('targetEnv')
-    host = body.get('host')
-    config = body.get('configPath')
-    mode = body.get('mode', 'local')
-    ssh = body.get('ssh', {})
-    if not source_env or not target_env or not host:
-        raise BadRequest('sourceEnv, targetEnv and host are required')
-    remote = (mode == 'ssh')
-    ssh_cfg = None
-    if remote:
-        ssh_host = ssh.get('host') or host
-        ssh_user = ssh.get('username')
-        ssh_port = ssh.get('port', 22)
-        if not ssh_user:
-            raise BadRequest('ssh.username required for SSH mode')
-        ssh_cfg = {
-            'hostname': ssh_host,
-            'username': ssh_user,
-            'port': ssh_port,
-            'password': ssh.get('password'),
-            'key_filename': ssh.get('keyFilename'),
-        }
-    job_id = job_manager.create_job(job_type='averify')
-    work_dir = job_manager.get_job_work_dir(job_id)
+    job_id = _start_job('averify', body, body.get('sourceEnv'), body.get('targetEnv'))
+    return jsonify({'jobId': job_id})
 
-    def _run():
-        if Config.DEMO_MODE:
-            return demo_service.simulate_averify(
-                source_env=source_env,
-                target_env=target_env
-            )
-        return averify_service.run_averify(
-            host=host,
-            source_env=source_env,
-            target_env=target_env,
-            config_path=config,
-            work_dir=work_dir,
-            remote=remote,
-            ssh_config=ssh_cfg,
-        )
 
-    job_manager.start_job(job_id, _run)
-    return jsonify({'jobId': job_id})
+@bp.route('/pipelines', methods=['POST'])
+def create_pipeline():
+    """Submit a DAG of export/import/averify steps (see app/services/pipeline_manager.py)"""
+    body = _require_json()
+    try:
+        steps = pipeline_manager.parse(body)
+    except ValueError as e:
+        raise BadRequest(str(e))
+    env_tags = {step.body.get(key) for step in steps.values() for key in ('sourceEnv', 'targetEnv')}
+    _preflight(body, *sorted(tag for tag in env_tags if tag))
+    pipeline = pipeline_manager.submit(body)
+    return jsonify(pipeline.to_dict())
+
+
+@bp.route('/pipelines', methods=['GET'])
+def list_pipelines():
+    return jsonify([p.to_dict() for p in pipeline_manager.list_pipelines()])
+
+
+@bp.route('/pipelines/<pipeline_id>', methods=['GET'])
+def get_pipeline(pipeline_id):
+    pipeline = pipeline_manager.get(pipeline_id)
+    if not pipeline:
+        raise NotFound('Pipeline not found')
+    return jsonify(pipeline.to_dict())
+
+
+@bp.route('/scheduler', methods=['GET'])
+def scheduler_state():
+    """Jobs holding environment/host resources, and queued jobs with what they wait for"""
+    return jsonify(resource_scheduler.snapshot())
 
 
 @bp.route('/filecopy/run', methods=['POST'])
@@ -327,8 +343,6 @@ def run_filecopy():
     target_env = body.get('targetEnv')
     config_file = body.get('configFile')
     host = body.get('host')
-    mode = body.get('mode', 'local')
-    ssh = body.get('ssh', {})
 
     if not target_env:
         raise BadRequest('targetEnv is required')
@@ -338,30 +352,23 @@ def run_filecopy():
         if not config_file or not host:
             raise BadRequest('configFile and host are required')
 
-    remote = (mode == 'ssh')
-    ssh_cfg = None
-    if remote:
-        ssh_host = ssh.get('host') or host
-        ssh_user = ssh.get('username')
-        ssh_port = ssh.get('port', 22)
-        if not ssh_user:
-            raise BadRequest('ssh.username required for SSH mode')
-        ssh_cfg = {
-            'hostname': ssh_host,
-            'username': ssh_user,
-            'port': ssh_port,
-            'password': ssh.get('password'),
-            'key_filename': ssh.get('keyFilename'),
-        }
-
-    job_id = job_manager.create_job(job_type='file-copy')
+    try:
+        ssh_config(body)
+    except ValueError as e:
+        raise BadRequest(str(e))
+
+    job_id = job_manager.create_job(job_type='file-copy', host=host)
     work_dir = job_manager.get_job_work_dir(job_id)
+    claims = resource_claims('file-copy', body)
+
+    if Config.DEMO_MODE:
+        resource_scheduler.submit(job_id, claims, lambda: demo_service.start_file_copy(
+            job_id, target_env=target_env, work_dir=work_dir))
+        return jsonify({'jobId': job_id})
 
     def _run():
-        if Config.DEMO_MODE:
-            return demo_service.simulate_file_copy(target_env=target_env, work_dir=work_dir)
         # TODO: Implement real file copy service
         raise NotImplementedError('File copy service not yet implemented')
 
-    job_manager.start_job(job_id, _run)
+    resource_scheduler.submit(job_id, claims, lambda: job_manager.start_job(job_id, _run))
     return jsonify({'jobId': job_id})
@@ -0,0 +1,16 @@
+from flask import Blueprint, Response, request
+from werkzeug.exceptions import Unauthorized
+
+from app.utils.metrics import metrics
+from config import Config
+
+bp = Blueprint('metrics', __name__)
+
+
+@bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus text exposition of the in-process metrics registry"""
+    if Config.METRICS_TOKEN and \
+            request.headers.get('Authorization', '') != f'Bearer {Config.METRICS_TOKEN}':
+        raise Unauthorized('Missing or invalid metrics token')
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
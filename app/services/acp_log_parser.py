@@ -3,10 +3,33 @@ ACP Log Parser - Analyzes ACP program logs and extracts meaningful information
 Based on ACP Exit Codes and Program Logs documentation
 """
 import re
+import os
+import mmap
+import time
 from typing import Dict, List, Optional, Tuple
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
 
+from app.services.parser_rules import RuleProfile, rule_registry
+from app.utils.metrics import metrics
+
+PARSE_SECONDS = metrics.counter(
+    'acp_parser_seconds_total', 'Time spent parsing logs', ('profile',))
+PARSE_BYTES = metrics.counter(
+    'acp_parser_bytes_total', 'Log text parsed, in characters (bytes for files)', ('profile',))
+PARSE_SECONDS_PER_MB = metrics.histogram(
+    'acp_parser_seconds_per_mb', 'Parse time per MB, for logs of at least 64 KB', ('profile',),
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+PER_MB_MIN_BYTES = 64 * 1024
+
+
+def _record_parse(profile: Optional[str], size: int, seconds: float) -> None:
+    name = rule_registry.get(profile).name
+    PARSE_SECONDS.labels(name).inc(seconds)
+    PARSE_BYTES.labels(name).inc(size)
+    if size >= PER_MB_MIN_BYTES:
+        PARSE_SECONDS_PER_MB.labels(name).observe(seconds / (size / (1024 * 1024)))
+
 
 class ACPExitCode(Enum):
     """ACP Exit Codes as documented in ACP documentation"""
@@ -102,6 +125,27 @@ class ACPLogAnalysis:
         }
 
 
+@dataclass
+class _ChunkResult:
+    """Partial parse result for a contiguous, line-aligned run of a log"""
+    newline_count: int
+    error_count: int = 0
+    warning_count: int = 0
+    info_count: int = 0
+    errors: List[LogEntry] = field(default_factory=list)
+    warnings: List[LogEntry] = field(default_factory=list)
+    processed_items: int = 0
+    failed_items: int = 0
+    skipped_items: int = 0
+    duration: Optional[str] = None
+    summary_started: bool = False
+    summary_lines: List[str] = field(default_factory=list)
+    tail_lines: List[str] = field(default_factory=list)
+    issue_code: Optional[int] = None
+    head_text: str = ''
+    tail_text: str = ''
+
+
 class ACPLogParser:
     """Parser for ACP program logs"""
 
@@ -111,58 +155,88 @@ class ACPLogParser:
     TIMESTAMP_PATTERN = re.compile(
         r'(\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}:\d{2}|\d{2}/\d{2}/\d{4}\s+\d{2}:\d{2}:\d{2})')
 
-    # Item processing patterns
-    PROCESSED_PATTERN = re.compile(
-        r'(?:processed|completed|exported|imported)\s+(\d+)\s+(?:item|object|record|row)', re.IGNORECASE)
-    FAILED_PATTERN = re.compile(
-        r'(?:failed|error)\s+(\d+)\s+(?:item|object|record|row)', re.IGNORECASE)
-    SKIPPED_PATTERN = re.compile(
-        r'(?:skipped|ignored)\s+(\d+)\s+(?:item|object|record|row)', re.IGNORECASE)
-
     # Summary patterns
     SUMMARY_START_PATTERN = re.compile(
         r'(?:Summary|Statistics|Results):', re.IGNORECASE)
     DURATION_PATTERN = re.compile(
         r'(?:Duration|Elapsed|Time):\s*(\d+[hms\s]+)', re.IGNORECASE)
 
-    # Error specific patterns
-    CONNECTION_ERROR_PATTERNS = [
-        r'connection\s+(?:failed|refused|timeout)',
-        r'could\s+not\s+connect',
-        r'unable\s+to\s+connect',
-        r'network\s+(?:error|timeout)',
-    ]
-
-    AUTH_ERROR_PATTERNS = [
-        r'authentication\s+failed',
-        r'invalid\s+(?:credentials|username|password)',
-        r'access\s+denied',
-        r'login\s+failed',
-    ]
-
-    CONFIG_ERROR_PATTERNS = [
-        r'(?:invalid|malformed)\s+configuration',
-        r'config\s+(?:error|parse\s+error)',
-        r'invalid\s+xml',
-    ]
+    # Files smaller than this are parsed in-process by parse_file
+    PARALLEL_MIN_BYTES = 8 * 1024 * 1024
+    CHUNK_MIN_BYTES = 1024 * 1024
+    SUMMARY_LINE_LIMIT = 20
 
     @classmethod
-    def parse_log(cls, log_text: str, exit_code: int = 0) -> ACPLogAnalysis:
+    def parse_log(cls, log_text: str, exit_code: int = 0,
+                  profile: Optional[str] = None) -> ACPLogAnalysis:
         """Parse ACP log and extract meaningful information"""
-        lines = log_text.split('\n')
+        started = time.perf_counter()
+        rules = rule_registry.get(profile)
+        chunk = cls._scan_lines(log_text.split('\n'), rules)
 
-        errors: List[LogEntry] = []
-        warnings: List[LogEntry] = []
-        summary_lines: List[str] = []
+        # Determine actual exit code if not provided or analyze log for issues
+        analyzed_exit_code = cls._analyze_exit_code(log_text, exit_code, rules)
 
-        error_count = 0
-        warning_count = 0
-        info_count = 0
+        analysis = cls._build_analysis(chunk, chunk.newline_count + 1,
+                                       chunk.summary_lines, analyzed_exit_code)
+        _record_parse(profile, len(log_text), time.perf_counter() - started)
+        return analysis
 
-        processed_items = 0
-        failed_items = 0
-        skipped_items = 0
-        duration = None
+    @classmethod
+    def parse_file(cls, path: str, exit_code: int = 0, workers: Optional[int] = None,
+                   profile: Optional[str] = None) -> ACPLogAnalysis:
+        """
+        Parse a log file, splitting large files into line-aligned chunks
+        that are parsed in a process pool and merged in file order
+        """
+        size = os.path.getsize(path)
+        workers = workers or os.cpu_count() or 1
+        if size < cls.PARALLEL_MIN_BYTES or workers < 2:
+            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                return cls.parse_log(f.read(), exit_code, profile)
+
+        # multiprocessing is only imported once a file is big enough to need it
+        from concurrent.futures import ProcessPoolExecutor
+        started = time.perf_counter()
+        bounds = cls._chunk_bounds(path, size, workers)
+        with ProcessPoolExecutor(max_workers=min(workers, len(bounds))) as pool:
+            chunks = list(pool.map(
+                _parse_chunk,
+                [path] * len(bounds),
+                [start for start, _ in bounds],
+                [end for _, end in bounds],
+                [exit_code == 0] * len(bounds),
+                [profile] * len(bounds)))
+        analysis = cls._merge_chunks(chunks, exit_code, rule_registry.get(profile))
+        _record_parse(profile, size, time.perf_counter() - started)
+        return analysis
+
+    @classmethod
+    def _chunk_bounds(cls, path: str, size: int, workers: int) -> List[Tuple[int, int]]:
+        """Split a file into byte ranges that start and end on line boundaries"""
+        # A few chunks per worker keeps the pool busy when line density varies
+        target = max(cls.CHUNK_MIN_BYTES, size // (workers * 4))
+        bounds = []
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start = 0
+            while start < size:
+                end = mm.find(b'\n', min(start + target, size - 1))
+                end = size if end == -1 else end + 1
+                bounds.append((start, end))
+                start = end
+        return bounds
+
+    @classmethod
+    def _scan_lines(cls, lines: List[str], rules: RuleProfile) -> '_ChunkResult':
+        """Collect per-line statistics for a contiguous run of log lines"""
+        result = _ChunkResult(newline_count=len(lines) - 1)
+        errors = result.errors
+        warnings = result.warnings
+        summary_lines = result.summary_lines
+        processed_regex = rules.processed_regex
+        failed_regex = rules.failed_regex
+        skipped_regex = rules.skipped_regex
+        count_items = rules.has_item_patterns
 
         in_summary_section = False
 
@@ -194,82 +268,148 @@ class ACPLogParser:
                 )
 
                 if level in ['ERROR', 'SEVERE', 'FATAL']:
-                    error_count += 1
+                    result.error_count += 1
                     errors.append(entry)
                 elif level in ['WARN', 'WARNING']:
-                    warning_count += 1
+                    result.warning_count += 1
                     warnings.append(entry)
                 elif level == 'INFO':
-                    info_count += 1
+                    result.info_count += 1
 
             # Extract statistics
-            processed_match = cls.PROCESSED_PATTERN.search(line)
-            if processed_match:
-                processed_items = max(
-                    processed_items, int(processed_match.group(1)))
-
-            failed_match = cls.FAILED_PATTERN.search(line)
-            if failed_match:
-                failed_items = max(failed_items, int(failed_match.group(1)))
-
-            skipped_match = cls.SKIPPED_PATTERN.search(line)
-            if skipped_match:
-                skipped_items = max(skipped_items, int(skipped_match.group(1)))
+            if count_items:
+                processed_match = processed_regex and processed_regex.search(line)
+                if processed_match:
+                    result.processed_items = max(
+                        result.processed_items, int(processed_match.group(1)))
+
+                failed_match = failed_regex and failed_regex.search(line)
+                if failed_match:
+                    result.failed_items = max(
+                        result.failed_items, int(failed_match.group(1)))
+
+                skipped_match = skipped_regex and skipped_regex.search(line)
+                if skipped_match:
+                    result.skipped_items = max(
+                        result.skipped_items, int(skipped_match.group(1)))
 
             # Extract duration
             duration_match = cls.DURATION_PATTERN.search(line)
-            if duration_match and not duration:
-                duration = duration_match.group(1)
+            if duration_match and not result.duration:
+                result.duration = duration_match.group(1)
 
-        # Determine actual exit code if not provided or analyze log for issues
-        analyzed_exit_code = cls._analyze_exit_code(log_text, exit_code)
+        result.summary_started = in_summary_section
+        del summary_lines[:-cls.SUMMARY_LINE_LIMIT]
+
+        return result
+
+    @classmethod
+    def _scan_chunk(cls, text: str, detect_issues: bool, rules: RuleProfile) -> '_ChunkResult':
+        """Scan one chunk, keeping the context needed to merge it with its neighbours"""
+        lines = text.split('\n')
+        result = cls._scan_lines(lines, rules)
+
+        # Trailing lines belong to a summary section opened by an earlier chunk
+        for line in reversed(lines):
+            if len(result.tail_lines) == cls.SUMMARY_LINE_LIMIT:
+                break
+            if line.strip():
+                result.tail_lines.append(line.strip())
+        result.tail_lines.reverse()
+
+        if detect_issues:
+            result.issue_code = rules.detect_exit_code(text)
+            # Edge lines let multi-word issue patterns match across the boundary
+            non_blank = [i for i, line in enumerate(lines) if line.strip()]
+            if non_blank:
+                result.head_text = '\n'.join(lines[:non_blank[0] + 1])
+                result.tail_text = '\n'.join(lines[non_blank[-1]:])
+        return result
 
+    @classmethod
+    def _merge_chunks(cls, chunks: List['_ChunkResult'], exit_code: int,
+                      rules: RuleProfile) -> ACPLogAnalysis:
+        """Merge chunk results in file order into a single analysis"""
+        merged = _ChunkResult(newline_count=0)
+        summary_lines: List[str] = []
+        in_summary_section = False
+        issue_codes = []
+        previous = None
+
+        for chunk in chunks:
+            offset = merged.newline_count
+            for entry in chunk.errors:
+                entry.line_number += offset
+            for entry in chunk.warnings:
+                entry.line_number += offset
+            merged.errors.extend(chunk.errors)
+            merged.warnings.extend(chunk.warnings)
+            merged.error_count += chunk.error_count
+            merged.warning_count += chunk.warning_count
+            merged.info_count += chunk.info_count
+            merged.processed_items = max(merged.processed_items, chunk.processed_items)
+            merged.failed_items = max(merged.failed_items, chunk.failed_items)
+            merged.skipped_items = max(merged.skipped_items, chunk.skipped_items)
+            merged.duration = merged.duration or chunk.duration
+            merged.newline_count += chunk.newline_count
+
+            # A summary section opened earlier runs through the whole chunk
+            if in_summary_section:
+                summary_lines.extend(chunk.tail_lines)
+            elif chunk.summary_started:
+                summary_lines.extend(chunk.summary_lines)
+            in_summary_section = in_summary_section or chunk.summary_started
+            del summary_lines[:-cls.SUMMARY_LINE_LIMIT]
+
+            if chunk.issue_code is not None:
+                issue_codes.append(chunk.issue_code)
+            if previous is not None and exit_code == 0:
+                boundary_code = rules.detect_exit_code(
+                    previous.tail_text + chunk.head_text)
+                if boundary_code is not None:
+                    issue_codes.append(boundary_code)
+            previous = chunk
+
+        analyzed_exit_code = exit_code
+        if exit_code == 0 and issue_codes:
+            analyzed_exit_code = min(issue_codes, key=rules.precedence_index)
+
+        return cls._build_analysis(merged, merged.newline_count + 1,
+                                   summary_lines, analyzed_exit_code)
+
+    @classmethod
+    def _build_analysis(cls, result: '_ChunkResult', total_lines: int,
+                        summary_lines: List[str], exit_code: int) -> ACPLogAnalysis:
         return ACPLogAnalysis(
-            exit_code=analyzed_exit_code,
-            exit_description=ACPExitCode.get_description(analyzed_exit_code),
-            severity=ACPExitCode.get_severity(analyzed_exit_code),
-            total_lines=len(lines),
-            error_count=error_count,
-            warning_count=warning_count,
-            info_count=info_count,
-            errors=errors,
-            warnings=warnings,
+            exit_code=exit_code,
+            exit_description=ACPExitCode.get_description(exit_code),
+            severity=ACPExitCode.get_severity(exit_code),
+            total_lines=total_lines,
+            error_count=result.error_count,
+            warning_count=result.warning_count,
+            info_count=result.info_count,
+            errors=result.errors,
+            warnings=result.warnings,
             # Last 20 summary lines
-            summary_lines=summary_lines[-20:] if summary_lines else [],
-            processed_items=processed_items,
-            failed_items=failed_items,
-            skipped_items=skipped_items,
-            duration=duration,
+            summary_lines=summary_lines,
+            processed_items=result.processed_items,
+            failed_items=result.failed_items,
+            skipped_items=result.skipped_items,
+            duration=result.duration,
         )
 
     @classmethod
-    def _analyze_exit_code(cls, log_text: str, reported_exit_code: int) -> int:
+    def _analyze_exit_code(cls, log_text: str, reported_exit_code: int,
+                           rules: Optional[RuleProfile] = None) -> int:
         """
         Analyze log content to determine actual exit code
         This helps when exit code is not properly reported or needs verification
         """
         if reported_exit_code == 0:
             # Even if exit code is 0, check for errors in log
-            log_lower = log_text.lower()
-
-            # Check for connection errors
-            for pattern in cls.CONNECTION_ERROR_PATTERNS:
-                if re.search(pattern, log_lower):
-                    return 2  # Connection error
-
-            # Check for authentication errors
-            for pattern in cls.AUTH_ERROR_PATTERNS:
-                if re.search(pattern, log_lower):
-                    return 3  # Authentication error
-
-            # Check for config errors
-            for pattern in cls.CONFIG_ERROR_PATTERNS:
-                if re.search(pattern, log_lower):
-                    return 4  # Invalid config
-
-            # Check for general errors
-            if re.search(r'\[ERROR\]|\[SEVERE\]|\[FATAL\]', log_text, re.IGNORECASE):
-                return 1  # General error
+            detected = (rules or rule_registry.get()).detect_exit_code(log_text)
+            if detected is not None:
+                return detected
 
         return reported_exit_code
 
@@ -333,3 +473,11 @@ class ACPLogParser:
 
         lines.append("=" * 60)
         return '\n'.join(lines)
+
+
+def _parse_chunk(path: str, start: int, end: int, detect_issues: bool,
+                 profile: Optional[str]) -> _ChunkResult:
+    """Process pool entry point: parse bytes [start, end) of a log file"""
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        text = mm[start:end].decode('utf-8', errors='ignore')
+    return ACPLogParser._scan_chunk(text, detect_issues, rule_registry.get(profile))
@@ -2,57 +2,84 @@ import os
 import glob
 import shlex
 import subprocess
-from typing import Dict, Optional
+import time
+from typing import Dict, Optional, Sequence
 
 from config import Config
-from app.utils.ssh_client import SSHClientWrapper
+from app.utils.ssh_client import open_ssh
 from app.services.acp_log_parser import ACPLogParser
+from app.services.analysis_cache import analysis_cache
+from app.services.error_rollups import summarize_signatures
+from app.utils.files import link_or_copy
+from app.utils.job_timing import phase
+from app.utils.metrics import metrics
+
+COMMAND_SECONDS = metrics.histogram(
+    'acp_command_seconds', 'ACP and Averify command run time', ('command', 'mode'))
 
 
 class AcpService:
     def __init__(self):
         self.export_cmd = Config.ACP_EXPORT_CMD
         self.import_cmd = Config.ACP_IMPORT_CMD
+        if Config.FAULT_SCENARIO:
+            from app.faults import fake_command
+            self.export_cmd = fake_command('export', Config.FAULT_SCENARIO)
+            self.import_cmd = fake_command('import', Config.FAULT_SCENARIO)
 
     def _local_run(self, cmd: str, work_dir: str) -> Dict[str, str]:
-        proc = subprocess.Popen(
-            cmd,
-            cwd=work_dir,
-            shell=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-        )
-        out, _ = proc.communicate()
+        with phase('exec'):
+            proc = subprocess.Popen(
+                cmd,
+                cwd=work_dir,
+                shell=True,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+            )
+            out, _ = proc.communicate()
         log = out.decode('utf-8', errors='ignore')
         return {'exit_code': proc.returncode, 'log': log}
 
     def _ssh_run(self, cmd: str, work_dir: str, ssh_config: Dict) -> Dict[str, str]:
-        with SSHClientWrapper(**ssh_config) as client:
+        with open_ssh(**ssh_config) as client, phase('exec'):
             exit_code, out, err = client.run(cmd, work_dir)
         log = out + ('\n' + err if err else '')
         return {'exit_code': exit_code, 'log': log}
 
     def run_acp_export(self, host: str, xml_config_path: str, product_line: str,
                        work_dir: str, remote: bool = False,
-                       ssh_config: Optional[Dict] = None) -> Dict:
+                       ssh_config: Optional[Dict] = None,
+                       exclude: Sequence[str] = ()) -> Dict:
         xml_name = os.path.basename(xml_config_path)
         local_xml = os.path.join(work_dir, xml_name)
-        if os.path.exists(xml_config_path):
-            with open(xml_config_path, 'rb') as src, open(local_xml, 'wb') as dst:
-                dst.write(src.read())
+        with phase('staging'):
+            # A config already in the work directory is used in place; opening
+            # it for writing here would truncate it before it is read
+            if os.path.exists(xml_config_path) and os.path.abspath(xml_config_path) != os.path.abspath(local_xml):
+                with open(xml_config_path, 'rb') as src, open(local_xml, 'wb') as dst:
+                    dst.write(src.read())
         cmd = f"{self.export_cmd} --host {shlex.quote(host)} --product-line {shlex.quote(product_line)} --config {shlex.quote(xml_name)}"
+        started = time.perf_counter()
         if remote:
             res = self._ssh_run(cmd, work_dir, ssh_config)
         else:
             res = self._local_run(cmd, work_dir)
+        COMMAND_SECONDS.labels('export', 'ssh' if remote else 'local').observe(
+            time.perf_counter() - started)
 
         # Parse log and analyze outcome
-        analysis = ACPLogParser.parse_log(res['log'], res['exit_code'])
-        formatted_summary = ACPLogParser.format_summary(analysis)
+        with phase('log_parse'):
+            analysis, rules_version = analysis_cache.analyze(
+                res['log'], res['exit_code'], profile='acp-export')
+            formatted_summary = ACPLogParser.format_summary(analysis)
 
-        bundle_candidates = glob.glob(os.path.join(
-            work_dir, '*.xml')) + glob.glob(os.path.join(work_dir, '*.zip'))
-        outputs = {os.path.basename(p): p for p in bundle_candidates}
+        with phase('output_discovery'):
+            bundle_candidates = glob.glob(os.path.join(
+                work_dir, '*.xml')) + glob.glob(os.path.join(work_dir, '*.zip'))
+            # exclude lists files that were in work_dir before the run, such as a workspace clone
+            excluded = {os.path.abspath(p) for p in exclude}
+            outputs = {os.path.basename(p): p for p in bundle_candidates
+                       if os.path.abspath(p) not in excluded}
 
         return {
             'log': res['log'],
@@ -60,7 +87,10 @@ class AcpService:
             'summary': formatted_summary,
             'analysis': analysis.to_dict(),
             'exit_code': analysis.exit_code,
+            'reported_exit_code': res['exit_code'],
             'severity': analysis.severity,
+            'rules_version': rules_version,
+            'error_signatures': summarize_signatures(analysis),
         }
 
     def run_acp_import(self, host: str, xml_config_path: str, export_bundle_path: str,
@@ -68,23 +98,29 @@ class AcpService:
                        ssh_config: Optional[Dict] = None) -> Dict:
         xml_name = os.path.basename(xml_config_path)
         local_xml = os.path.join(work_dir, xml_name)
-        if os.path.exists(xml_config_path):
-            with open(xml_config_path, 'rb') as src, open(local_xml, 'wb') as dst:
-                dst.write(src.read())
         bundle_name = os.path.basename(export_bundle_path)
         local_bundle = os.path.join(work_dir, bundle_name)
-        if os.path.exists(export_bundle_path):
-            with open(export_bundle_path, 'rb') as src, open(local_bundle, 'wb') as dst:
-                dst.write(src.read())
+        with phase('staging'):
+            if os.path.exists(xml_config_path):
+                with open(xml_config_path, 'rb') as src, open(local_xml, 'wb') as dst:
+                    dst.write(src.read())
+            # Bundles can be hundreds of MB and are only read; link rather than copy
+            if os.path.exists(export_bundle_path):
+                link_or_copy(export_bundle_path, local_bundle)
         cmd = f"{self.import_cmd} --host {shlex.quote(host)} --config {shlex.quote(xml_name)} --bundle {shlex.quote(bundle_name)}"
+        started = time.perf_counter()
         if remote:
             res = self._ssh_run(cmd, work_dir, ssh_config)
         else:
             res = self._local_run(cmd, work_dir)
+        COMMAND_SECONDS.labels('import', 'ssh' if remote else 'local').observe(
+            time.perf_counter() - started)
 
         # Parse log and analyze outcome
-        analysis = ACPLogParser.parse_log(res['log'], res['exit_code'])
-        formatted_summary = ACPLogParser.format_summary(analysis)
+        with phase('log_parse'):
+            analysis, rules_version = analysis_cache.analyze(
+                res['log'], res['exit_code'], profile='acp-import')
+            formatted_summary = ACPLogParser.format_summary(analysis)
 
         return {
             'log': res['log'],
@@ -92,5 +128,8 @@ class AcpService:
             'summary': formatted_summary,
             'analysis': analysis.to_dict(),
             'exit_code': analysis.exit_code,
+            'reported_exit_code': res['exit_code'],
             'severity': analysis.severity,
+            'rules_version': rules_version,
+            'error_signatures': summarize_signatures(analysis),
         }
@@ -0,0 +1,177 @@
+"""
+Analysis Cache - Reuses ACPLogParser results for identical log content
+
+Entries are keyed by (log content hash, reported exit code, rule profile name,
+rule profile version), so a parser rule change invalidates exactly the
+entries produced under the old rules. Recent entries are kept in an
+in-memory LRU; every entry is also written to disk so the cache survives
+restarts and is shared between workers.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import asdict
+from typing import Dict, Optional, Tuple
+
+from config import Config
+from app.services.acp_log_parser import ACPLogAnalysis, ACPLogParser, LogEntry
+from app.services.parser_rules import rule_registry
+
+logger = logging.getLogger(__name__)
+
+
+def _to_record(analysis: ACPLogAnalysis) -> Dict:
+    return asdict(analysis)
+
+
+def _from_record(data: Dict) -> ACPLogAnalysis:
+    data = dict(data)
+    data['errors'] = [LogEntry(**e) for e in data['errors']]
+    data['warnings'] = [LogEntry(**w) for w in data['warnings']]
+    return ACPLogAnalysis(**data)
+
+
+class AnalysisCache:
+    """Content-addressed cache of log analyses with an in-memory LRU and disk spill"""
+
+    # Prune the disk cache every this many writes
+    PRUNE_INTERVAL = 100
+
+    def __init__(self, cache_dir: str, max_entries: int = 256, max_disk_entries: int = 5000):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self._entries: 'OrderedDict[str, ACPLogAnalysis]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def _key(content_hash: str, exit_code: int, profile: str, version: str) -> str:
+        return f'{content_hash}-{exit_code}-{profile}-{version}'
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + '.json')
+
+    def get(self, key: str) -> Optional[ACPLogAnalysis]:
+        with self._lock:
+            analysis = self._entries.get(key)
+            if analysis is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return analysis
+
+        path = self._path(key)
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    analysis = _from_record(json.load(f))
+            except (OSError, ValueError, TypeError, KeyError):
+                logger.warning(f"Discarding unreadable analysis cache entry: {path}")
+                analysis = None
+            if analysis is not None:
+                self._remember(key, analysis)
+                with self._lock:
+                    self.hits += 1
+                return analysis
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, analysis: ACPLogAnalysis) -> None:
+        self._remember(key, analysis)
+        path = self._path(key)
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(_to_record(analysis), f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write analysis cache entry {path}: {e}")
+            return
+
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % self.PRUNE_INTERVAL == 0
+        if prune:
+            self._prune_disk()
+
+    def _remember(self, key: str, analysis: ACPLogAnalysis) -> None:
+        with self._lock:
+            self._entries[key] = analysis
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _prune_disk(self) -> None:
+        """Drop the least recently written entries beyond max_disk_entries"""
+        try:
+            entries = [e for e in os.scandir(self.cache_dir) if e.name.endswith('.json')]
+        except OSError:
+            return
+        if len(entries) <= self.max_disk_entries:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for entry in entries[:len(entries) - self.max_disk_entries]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.json'):
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+
+    def analyze(self, log_text: str, exit_code: int = 0,
+                profile: Optional[str] = None) -> Tuple[ACPLogAnalysis, str]:
+        """Parse log text, reusing a cached analysis for identical content and rules"""
+        rules = rule_registry.get(profile)
+        content_hash = hashlib.sha256(log_text.encode('utf-8', errors='ignore')).hexdigest()
+        key = self._key(content_hash, exit_code, rules.name, rules.version)
+        analysis = self.get(key)
+        if analysis is None:
+            analysis = ACPLogParser.parse_log(log_text, exit_code, rules.name)
+            self.put(key, analysis)
+        return analysis, rules.version
+
+    def analyze_file(self, path: str, exit_code: int = 0,
+                     profile: Optional[str] = None) -> Tuple[ACPLogAnalysis, str]:
+        """Parse a log file, reusing a cached analysis for identical content and rules"""
+        rules = rule_registry.get(profile)
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        key = self._key(digest.hexdigest(), exit_code, rules.name, rules.version)
+        analysis = self.get(key)
+        if analysis is None:
+            analysis = ACPLogParser.parse_file(path, exit_code, profile=rules.name)
+            self.put(key, analysis)
+        return analysis, rules.version
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+analysis_cache = AnalysisCache(
+    cache_dir=Config.ANALYSIS_CACHE_DIR,
+    max_entries=Config.ANALYSIS_CACHE_SIZE,
+    max_disk_entries=Config.ANALYSIS_CACHE_DISK_ENTRIES,
+)
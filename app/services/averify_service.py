@@ -1,31 +1,43 @@
 import os
 import shlex
 import subprocess
+import time
 from typing import Dict, Optional
 
 from config import Config
-from app.utils.ssh_client import SSHClientWrapper
+from app.utils.ssh_client import open_ssh
 from app.services.acp_log_parser import ACPLogParser
+from app.services.analysis_cache import analysis_cache
+from app.services.error_rollups import summarize_signatures
+from app.utils.job_timing import phase
+from app.utils.metrics import metrics
+
+COMMAND_SECONDS = metrics.histogram(
+    'acp_command_seconds', 'ACP and Averify command run time', ('command', 'mode'))
 
 
 class AverifyService:
     def __init__(self):
         self.averify_cmd = Config.AVERIFY_CMD
+        if Config.FAULT_SCENARIO:
+            from app.faults import fake_command
+            self.averify_cmd = fake_command('averify', Config.FAULT_SCENARIO)
 
     def _local_run(self, cmd: str, work_dir: str) -> Dict[str, str]:
-        proc = subprocess.Popen(
-            cmd,
-            cwd=work_dir,
-            shell=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-        )
-        out, _ = proc.communicate()
+        with phase('exec'):
+            proc = subprocess.Popen(
+                cmd,
+                cwd=work_dir,
+                shell=True,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+            )
+            out, _ = proc.communicate()
         log = out.decode('utf-8', errors='ignore')
         return {'exit_code': proc.returncode, 'log': log}
 
     def _ssh_run(self, cmd: str, work_dir: str, ssh_config: Dict) -> Dict[str, str]:
-        with SSHClientWrapper(**ssh_config) as client:
+        with open_ssh(**ssh_config) as client, phase('exec'):
             exit_code, out, err = client.run(cmd, work_dir)
         log = out + ('\n' + err if err else '')
         return {'exit_code': exit_code, 'log': log}
@@ -37,18 +49,23 @@ class AverifyService:
         if config_path and os.path.exists(config_path):
             name = os.path.basename(config_path)
             local_cfg = os.path.join(work_dir, name)
-            with open(config_path, 'rb') as src, open(local_cfg, 'wb') as dst:
+            with phase('staging'), open(config_path, 'rb') as src, open(local_cfg, 'wb') as dst:
                 dst.write(src.read())
             cfg_arg = f" --config {shlex.quote(name)}"
         cmd = f"{self.averify_cmd} --host {shlex.quote(host)} --source {shlex.quote(source_env)} --target {shlex.quote(target_env)}{cfg_arg}"
+        started = time.perf_counter()
         if remote:
             res = self._ssh_run(cmd, work_dir, ssh_config)
         else:
             res = self._local_run(cmd, work_dir)
+        COMMAND_SECONDS.labels('averify', 'ssh' if remote else 'local').observe(
+            time.perf_counter() - started)
 
-        # Parse log and analyze outcome (Averify uses similar logging patterns)
-        analysis = ACPLogParser.parse_log(res['log'], res['exit_code'])
-        formatted_summary = ACPLogParser.format_summary(analysis)
+        # Parse log and analyze outcome with the Averify rule profile
+        with phase('log_parse'):
+            analysis, rules_version = analysis_cache.analyze(
+                res['log'], res['exit_code'], profile='averify')
+            formatted_summary = ACPLogParser.format_summary(analysis)
 
         return {
             'log': res['log'],
@@ -56,5 +73,8 @@ class AverifyService:
             'summary': formatted_summary,
             'analysis': analysis.to_dict(),
             'exit_code': analysis.exit_code,
+            'reported_exit_code': res['exit_code'],
             'severity': analysis.severity,
+            'rules_version': rules_version,
+            'error_signatures': summarize_signatures(analysis),
         }
@@ -1,12 +1,18 @@
 """
 Demo Service - Simulates job execution for demo purposes
+
+Each operation builds a SimulationScript from the sample logs in
+app/demo_logs and hands it to the demo simulator, which replays it into
+the job line by line.
 """
 import os
 import time
 import random
 import datetime
-from typing import Dict
+from functools import lru_cache
+from typing import List, Optional, Tuple
 from config import Config
+from app.services.demo_simulator import SimulationScript, demo_simulator
 
 
 class DemoService:
@@ -30,135 +36,79 @@ class DemoService:
         return f"[DEMO MODE] Sample log file not found: {filename}\n"
 
     @staticmethod
-    def simulate_acp_export(host: str, product_line: str, work_dir: str = None, duration: int = None) -> Dict:
-        """Simulate ACP export operation"""
-        duration = duration or Config.DEMO_JOB_DURATION
+    @lru_cache(maxsize=None)
+    def _sample_lines(filename: str) -> Tuple[str, ...]:
+        """Sample log split into lines, shared by every simulation that replays it"""
+        return tuple(DemoService._read_sample_log(filename).splitlines())
 
-        # Capture start time
+    @staticmethod
+    def _run_window(duration: float) -> Tuple[str, str, str]:
+        """Start date, expected end date and duration in ACP log format"""
         start_time = datetime.datetime.now()
-        start_date_str = start_time.strftime("%b %d, %Y %I:%M:%S %p")
-
-        # Read the actual export.log sample
-        log = DemoService._read_sample_log('export.log')
-
-        # Simulate processing time
-        time.sleep(duration)
-
-        # Capture end time
-        end_time = datetime.datetime.now()
-        end_date_str = end_time.strftime("%b %d, %Y %I:%M:%S %p")
-        duration_delta = end_time - start_time
-        hours, remainder = divmod(int(duration_delta.total_seconds()), 3600)
+        end_time = start_time + datetime.timedelta(seconds=duration)
+        hours, remainder = divmod(int(duration), 3600)
         minutes, seconds = divmod(remainder, 60)
-        duration_str = f"{hours}:{minutes}:{seconds}.{duration_delta.microseconds // 1000}"
+        millis = int((duration - int(duration)) * 1000)
+        return (start_time.strftime("%b %d, %Y %I:%M:%S %p"),
+                end_time.strftime("%b %d, %Y %I:%M:%S %p"),
+                f"{hours}:{minutes}:{seconds}.{millis}")
 
-        # Replace timestamps in log
-        log = log.replace('Jan 5, 2026 9:32:16 AM', start_date_str)
-        log = log.replace('Jan 5, 2026 9:32:32 AM', end_date_str)
-        log = log.replace('0:0:0:16.386', duration_str)
-
-        # Add demo mode header
-        demo_header = f"[DEMO MODE] Starting ACP Export\n"
-        demo_header += f"Host: {host}\n"
-        demo_header += f"Product Line: {product_line}\n"
-        demo_header += f"Simulating export process for {duration} seconds...\n\n"
-        demo_header += "=" * 70 + "\n\n"
-
-        full_log = demo_header + log
-
-        # Write export.log to work directory if provided
-        if work_dir:
-            log_path = os.path.join(work_dir, 'export.log')
-            try:
-                with open(log_path, 'w', encoding='utf-8') as f:
-                    f.write(log)
-            except Exception:
-                pass
+    @staticmethod
+    def _header(title: str, process: str, details: List[str], duration: float) -> str:
+        header = f"[DEMO MODE] Starting {title}\n"
+        header += ''.join(f"{line}\n" for line in details)
+        header += f"Simulating {process} process for {duration:g} seconds...\n\n"
+        header += "=" * 70 + "\n\n"
+        return header
 
-        return {
-            'log': full_log,
-            'output_files': {
-                f'export_{product_line}_{int(time.time())}.zip': f'/demo/output/export_{product_line}.zip'
+    @staticmethod
+    def start_acp_export(job_id: str, host: str, product_line: str,
+                         work_dir: Optional[str] = None, duration: Optional[float] = None) -> None:
+        """Simulate ACP export operation"""
+        duration = duration or Config.DEMO_JOB_DURATION
+        start, end, elapsed = DemoService._run_window(duration)
+        script = SimulationScript(
+            job_type='acp-export',
+            header=DemoService._header(
+                'ACP Export', 'export', [f"Host: {host}", f"Product Line: {product_line}"], duration),
+            lines=DemoService._sample_lines('export.log'),
+            replacements={
+                'Jan 5, 2026 9:32:16 AM': start,
+                'Jan 5, 2026 9:32:32 AM': end,
+                '0:0:0:16.386': elapsed,
             },
-            'exit_code': 0,
-            'severity': 'SUCCESS',
-            'analysis': {
-                'success': True,
-                'objects_exported': 2,
-                'warnings': 0,
-                'errors': 0
+            log_file='export.log',
+            output_files={
+                f'export_{product_line}_{int(time.time())}.zip': f'/demo/output/export_{product_line}.zip'
             },
-            'summary': f'Export completed successfully for {product_line}'
-        }
+        )
+        demo_simulator.start(job_id, script, duration, work_dir)
 
     @staticmethod
-    def simulate_acp_import(host: str, work_dir: str = None, duration: int = None) -> Dict:
+    def start_acp_import(job_id: str, host: str, work_dir: Optional[str] = None,
+                         duration: Optional[float] = None) -> None:
         """Simulate ACP import operation"""
         duration = duration or Config.DEMO_JOB_DURATION
-
-        # Capture start time
-        start_time = datetime.datetime.now()
-        start_date_str = start_time.strftime("%b %d, %Y %I:%M:%S %p")
-
-        # Read the actual import.log sample
-        log = DemoService._read_sample_log('import.log')
-
-        # Simulate processing time
-        time.sleep(duration)
-
-        # Capture end time
-        end_time = datetime.datetime.now()
-        end_date_str = end_time.strftime("%b %d, %Y %I:%M:%S %p")
-        duration_delta = end_time - start_time
-        hours, remainder = divmod(int(duration_delta.total_seconds()), 3600)
-        minutes, seconds = divmod(remainder, 60)
-        duration_str = f"{hours}:{minutes}:{seconds}.{duration_delta.microseconds // 1000}"
-
-        # Replace timestamps in log
-        log = log.replace('Jan 5, 2026 9:37:28 AM', start_date_str)
-        log = log.replace('Jan 5, 2026 9:38:09 AM', end_date_str)
-        log = log.replace('0:0:0:40.976', duration_str)
-
-        # Add demo mode header
-        demo_header = f"[DEMO MODE] Starting ACP Import\n"
-        demo_header += f"Host: {host}\n"
-        demo_header += f"Simulating import process for {duration} seconds...\n\n"
-        demo_header += "=" * 70 + "\n\n"
-
-        full_log = demo_header + log
-
-        # Write import.log to work directory if provided
-        if work_dir:
-            log_path = os.path.join(work_dir, 'import.log')
-            try:
-                with open(log_path, 'w', encoding='utf-8') as f:
-                    f.write(log)
-            except Exception:
-                pass
-
-        return {
-            'log': full_log,
-            'output_files': {},
-            'exit_code': 0,
-            'severity': 'SUCCESS',
-            'analysis': {
-                'success': True,
-                'objects_imported': 2,
-                'warnings': 0,
-                'errors': 0
+        start, end, elapsed = DemoService._run_window(duration)
+        script = SimulationScript(
+            job_type='acp-import',
+            header=DemoService._header('ACP Import', 'import', [f"Host: {host}"], duration),
+            lines=DemoService._sample_lines('import.log'),
+            replacements={
+                'Jan 5, 2026 9:37:28 AM': start,
+                'Jan 5, 2026 9:38:09 AM': end,
+                '0:0:0:40.976': elapsed,
             },
-            'summary': f'Import completed successfully'
-        }
+            log_file='import.log',
+        )
+        demo_simulator.start(job_id, script, duration, work_dir)
 
     @staticmethod
-    def simulate_averify(source_env: str, target_env: str, duration: int = None) -> Dict:
+    def start_averify(job_id: str, source_env: str, target_env: str,
+                      duration: Optional[float] = None) -> None:
         """Simulate Averify operation"""
         duration = duration or Config.DEMO_JOB_DURATION
 
-        log = f"[DEMO MODE] Starting Averify\n"
-        log += f"Source Environment: {source_env}\n"
-        log += f"Target Environment: {target_env}\n\n"
-
         steps = [
             "Connecting to source database...",
             "Connecting to target database...",
@@ -172,104 +122,54 @@ class DemoService:
             "Generating comparison report...",
             "Verification completed!"
         ]
-
-        step_duration = duration / len(steps)
-        for i, step in enumerate(steps):
-            time.sleep(step_duration)
-            log += f"[{i+1}/{len(steps)}] {step}\n"
+        lines = [f"[{i+1}/{len(steps)}] {step}" for i, step in enumerate(steps)]
 
         matches = random.randint(80, 95)
         differences = 100 - matches
+        lines += [
+            "",
+            "=== Verification Summary ===",
+            f"Total objects compared: {random.randint(100, 1000)}",
+            f"Matching: {matches}%",
+            f"Differences found: {differences}",
+            f"Operation completed successfully in {duration:g} seconds",
+        ]
 
-        log += f"\n=== Verification Summary ===\n"
-        log += f"Total objects compared: {random.randint(100, 1000)}\n"
-        log += f"Matching: {matches}%\n"
-        log += f"Differences found: {differences}\n"
-        log += f"Operation completed successfully in {duration} seconds\n"
-
-        return {
-            'log': log,
-            'output_files': {
+        script = SimulationScript(
+            job_type='averify',
+            header=f"[DEMO MODE] Starting Averify\n"
+                   f"Source Environment: {source_env}\n"
+                   f"Target Environment: {target_env}\n\n",
+            lines=lines,
+            output_files={
                 'averify_report.html': '/demo/output/averify_report.html'
             },
-            'exit_code': 0,
-            'severity': 'SUCCESS',
-            'analysis': {
-                'success': True,
-                'total_compared': random.randint(100, 1000),
-                'matches': matches,
-                'differences': differences,
-                'warnings': differences,
-                'errors': 0
-            },
-            'summary': f'Verification completed for {source_env} and {target_env}'
-        }
+        )
+        demo_simulator.start(job_id, script, duration)
 
     @staticmethod
-    def simulate_file_copy(target_env: str, work_dir: str = None, duration: int = None) -> Dict:
+    def start_file_copy(job_id: str, target_env: str, work_dir: Optional[str] = None,
+                        duration: Optional[float] = None) -> None:
         """Simulate File Copy operation"""
         duration = duration or Config.DEMO_JOB_DURATION
-
-        # Capture start time
-        start_time = datetime.datetime.now()
-        start_date_str = start_time.strftime("%b %d, %Y %I:%M:%S %p")
-
-        # Read the actual filecopy.log sample
-        log = DemoService._read_sample_log('filecopy.log')
-
-        # Simulate processing time
-        time.sleep(duration)
-
-        # Capture end time
-        end_time = datetime.datetime.now()
-        end_date_str = end_time.strftime("%b %d, %Y %I:%M:%S %p")
-        duration_delta = end_time - start_time
-        hours, remainder = divmod(int(duration_delta.total_seconds()), 3600)
-        minutes, seconds = divmod(remainder, 60)
-        duration_str = f"{hours}:{minutes}:{seconds}.{duration_delta.microseconds // 1000}"
-
-        # Replace timestamps in log
-        log = log.replace('Jan 5, 2026 10:15:30 AM', start_date_str)
-        log = log.replace('Jan 5, 2026 10:15:52 AM', end_date_str)
-        log = log.replace('0:0:0:22.500', duration_str)
-
-        # Replace target environment
-        log = log.replace('Target Environment:     QA',
-                          f'Target Environment:     {target_env}')
-
-        # Add demo mode header
-        demo_header = f"[DEMO MODE] Starting File Copy\n"
-        demo_header += f"Target Environment: {target_env}\n"
-        demo_header += f"Simulating file copy process for {duration} seconds...\n\n"
-        demo_header += "=" * 70 + "\n\n"
-
-        full_log = demo_header + log
-
-        # Write filecopy.log to work directory if provided
-        if work_dir:
-            log_path = os.path.join(work_dir, 'filecopy.log')
-            try:
-                with open(log_path, 'w', encoding='utf-8') as f:
-                    f.write(log)
-            except Exception:
-                pass
-
-        return {
-            'log': full_log,
-            'output_files': {
-                'filecopy_summary.txt': '/demo/output/filecopy_summary.txt'
+        start, end, elapsed = DemoService._run_window(duration)
+        script = SimulationScript(
+            job_type='file-copy',
+            header=DemoService._header(
+                'File Copy', 'file copy', [f"Target Environment: {target_env}"], duration),
+            lines=DemoService._sample_lines('filecopy.log'),
+            replacements={
+                'Jan 5, 2026 10:15:30 AM': start,
+                'Jan 5, 2026 10:15:52 AM': end,
+                '0:0:0:22.500': elapsed,
+                'Target Environment:     QA': f'Target Environment:     {target_env}',
             },
-            'exit_code': 0,
-            'severity': 'SUCCESS',
-            'analysis': {
-                'success': True,
-                'files_copied': 178,
-                'total_size_mb': 342.7,
-                'warnings': 0,
-                'errors': 0
+            log_file='filecopy.log',
+            output_files={
+                'filecopy_summary.txt': '/demo/output/filecopy_summary.txt'
             },
-            'summary': f'File copy completed successfully to {target_env}'
-        }
+        )
+        demo_simulator.start(job_id, script, duration, work_dir)
 
 
 demo_service = DemoService()
@@ -0,0 +1,252 @@
+"""
+Demo Simulator - Replays sample logs into demo jobs line by line
+
+One scheduler thread drives every simulated job from a heap ordered by
+due time. A simulated job therefore costs one heap entry rather than a
+sleeping thread, and thousands can run at once. Each time a job comes
+due it appends the lines whose time has come through
+JobManager.append_log, exactly like a running ACP job streaming its
+output. Finished jobs are analysed and persisted on a small worker pool
+through JobManager.complete_job.
+"""
+import heapq
+import itertools
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+from app.faults.scenario import EXIT_MESSAGES
+from app.services.acp_log_parser import ACPExitCode, ACPLogParser
+from app.services.analysis_cache import analysis_cache
+from app.services.error_rollups import summarize_signatures
+from app.services.job_manager import JobManager, job_manager
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SimulationScript:
+    """What a simulated job prints and what it leaves behind"""
+    job_type: str
+    header: str
+    lines: Sequence[str]
+    # Placeholder -> value substitutions applied to every emitted chunk
+    replacements: Dict[str, str] = field(default_factory=dict)
+    # Work-directory log file the real ACP program would have written
+    log_file: Optional[str] = None
+    output_files: Dict[str, str] = field(default_factory=dict)
+
+
+class Simulation:
+    __slots__ = ('job_id', 'script', 'work_dir', 'head', 'body', 'total', 'index', 'end',
+                 'interval', 'next_due', 'started', 'started_at', 'log_offset', 'exit_code')
+
+    def __init__(self, job_id: str, script: SimulationScript, work_dir: Optional[str],
+                 multiplier: float):
+        self.job_id = job_id
+        self.script = script
+        self.work_dir = work_dir
+        # The multiplier repeats the middle half of the log, so the start banner
+        # and the closing statistics still appear once
+        n = len(script.lines)
+        self.head = n // 4
+        self.body = n - 2 * self.head
+        self.total = n + int(self.body * max(multiplier - 1, 0))
+        self.index = 0
+        self.end = self.total
+        self.interval = 0.0
+        self.next_due = 0.0
+        self.started = 0.0
+        self.started_at = datetime.utcnow()
+        self.log_offset = 0
+        self.exit_code = 0
+
+    def line(self, i: int) -> str:
+        lines = self.script.lines
+        if i < self.head:
+            return lines[i]
+        repeated = self.total - 2 * self.head
+        if i < self.head + repeated:
+            return lines[self.head + (i - self.head) % self.body]
+        return lines[len(lines) - self.total + i]
+
+
+class DemoSimulator:
+    """Timer-driven log replay for demo jobs"""
+
+    def __init__(self, manager: JobManager, line_rate: float = 0.0, multiplier: float = 1.0,
+                 jitter: float = 0.3, failure_rate: float = 0.0, tick_ms: float = 50.0,
+                 workers: int = 2, seed: Optional[str] = None):
+        self.manager = manager
+        self.line_rate = line_rate
+        self.multiplier = multiplier
+        self.jitter = min(max(jitter, 0.0), 1.0)
+        self.failure_rate = failure_rate
+        self.tick = max(tick_ms, 1.0) / 1000
+        self._random = random.Random(seed or None)
+        self._heap: List = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._workers = workers
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._active = 0
+
+    @property
+    def active(self) -> int:
+        """Simulated jobs that have not finished yet"""
+        return self._active
+
+    def start(self, job_id: str, script: SimulationScript, duration: float,
+              work_dir: Optional[str] = None) -> None:
+        """Begin replaying script into job_id over roughly duration seconds"""
+        sim = Simulation(job_id, script, work_dir, self.multiplier)
+        if self.line_rate > 0:
+            sim.interval = 1.0 / self.line_rate
+        else:
+            sim.interval = max(duration, 0.0) / max(sim.total, 1)
+        if self.failure_rate and self._random.random() < self.failure_rate:
+            sim.end = self._random.randint(sim.total // 5, max(sim.total * 9 // 10, sim.total // 5))
+            sim.exit_code = self._random.randint(2, 9)
+
+        self.manager.begin_job(job_id)
+        self.manager.append_log(job_id, script.header)
+        job = self.manager.get_job(job_id)
+        sim.log_offset = len(job.log) if job else 0
+        sim.started = time.monotonic()
+        sim.started_at = datetime.utcnow()
+        sim.next_due = sim.started + self._delay(sim)
+
+        with self._cond:
+            self._active += 1
+            self._ensure_running()
+            heapq.heappush(self._heap, (sim.next_due, next(self._seq), sim))
+            self._cond.notify()
+
+    def _ensure_running(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._pool = self._pool or ThreadPoolExecutor(
+                max_workers=self._workers, thread_name_prefix='demo-finish')
+            self._thread = threading.Thread(target=self._loop, daemon=True, name='demo-simulator')
+            self._thread.start()
+
+    def _delay(self, sim: Simulation) -> float:
+        if not self.jitter:
+            return sim.interval
+        return sim.interval * self._random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                now = time.monotonic()
+                due = self._heap[0][0]
+                if due > now:
+                    self._cond.wait(due - now)
+                    continue
+                batch = []
+                while self._heap and self._heap[0][0] <= now:
+                    batch.append(heapq.heappop(self._heap)[2])
+            for sim in batch:
+                try:
+                    self._advance(sim, now)
+                except Exception:
+                    logger.exception(f"Demo simulation for job {sim.job_id} failed")
+                    self._finish_later(sim, failed=True)
+
+    def _advance(self, sim: Simulation, now: float) -> None:
+        if self.manager.get_job(sim.job_id) is None:
+            # Job deleted while running
+            with self._cond:
+                self._active -= 1
+            return
+
+        parts = []
+        while sim.index < sim.end and sim.next_due <= now:
+            parts.append(sim.line(sim.index))
+            sim.index += 1
+            sim.next_due += self._delay(sim)
+        if parts:
+            self.manager.append_log(sim.job_id, self._render(sim, '\n'.join(parts) + '\n'))
+
+        if sim.index >= sim.end:
+            self._finish_later(sim)
+            return
+        with self._cond:
+            # Revisit at most once per tick however fast the lines are due
+            heapq.heappush(self._heap, (max(sim.next_due, now + self.tick), next(self._seq), sim))
+
+    def _render(self, sim: Simulation, text: str) -> str:
+        for placeholder, value in sim.script.replacements.items():
+            if placeholder in text:
+                text = text.replace(placeholder, value)
+        return text
+
+    def _finish_later(self, sim: Simulation, failed: bool = False) -> None:
+        self._pool.submit(self._finish, sim, failed)
+
+    def _finish(self, sim: Simulation, failed: bool = False) -> None:
+        try:
+            if failed:
+                self.manager.complete_job(sim.job_id, error=RuntimeError('Demo simulation failed'))
+                return
+            self.manager.complete_job(sim.job_id, self._result(sim))
+        except Exception:
+            logger.exception(f"Could not complete demo job {sim.job_id}")
+        finally:
+            with self._cond:
+                self._active -= 1
+
+    def _result(self, sim: Simulation) -> Dict:
+        job = self.manager.get_job(sim.job_id)
+        if job is None:
+            return {}
+        if sim.exit_code:
+            message = EXIT_MESSAGES.get(sim.exit_code, ACPExitCode.get_description(sim.exit_code))
+            self.manager.append_log(
+                sim.job_id, f'[ERROR] {message}\nProgram terminated with exit code {sim.exit_code}\n')
+        job.timings.add('exec', sim.started_at, time.monotonic() - sim.started)
+        log = job.log[sim.log_offset:]
+
+        if sim.script.log_file and sim.work_dir:
+            try:
+                with open(os.path.join(sim.work_dir, sim.script.log_file), 'w', encoding='utf-8') as f:
+                    f.write(log)
+            except OSError:
+                pass
+
+        parse_started_at = datetime.utcnow()
+        parse_started = time.perf_counter()
+        analysis, rules_version = analysis_cache.analyze(log, sim.exit_code, profile=sim.script.job_type)
+        job.timings.add('log_parse', parse_started_at, time.perf_counter() - parse_started)
+        return {
+            'output_files': {} if sim.exit_code else sim.script.output_files,
+            'summary': ACPLogParser.format_summary(analysis),
+            'analysis': analysis.to_dict(),
+            'exit_code': analysis.exit_code,
+            'reported_exit_code': sim.exit_code,
+            'severity': analysis.severity,
+            'rules_version': rules_version,
+            'error_signatures': summarize_signatures(analysis),
+            # The replayed log is already in the job log; point at it for reanalysis
+            'analyzed_span': (sim.log_offset, sim.log_offset + len(log)),
+        }
+
+
+demo_simulator = DemoSimulator(
+    job_manager,
+    line_rate=Config.DEMO_LINE_RATE,
+    multiplier=Config.DEMO_LOG_MULTIPLIER,
+    jitter=Config.DEMO_JITTER,
+    failure_rate=Config.DEMO_FAILURE_RATE,
+    tick_ms=Config.DEMO_TICK_MS,
+    seed=Config.DEMO_SEED,
+)
@@ -0,0 +1,234 @@
+"""
+Environment Prober - Reachability checks for configured environments
+
+Checks each environment's Agile PLM URL with an HTTP HEAD request and its
+destination database (JDBC URL or TNS entry) with a TCP connect, running
+environments concurrently on a bounded pool. Results are cached for
+PROBE_TTL_SECONDS so listing environments and pre-flight checks at job
+submission do not wait on the network.
+"""
+import http.client
+import logging
+import os
+import re
+import socket
+import ssl
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ORACLE_PORT = 1521
+
+_descriptor_host_re = re.compile(r'\(\s*HOST\s*=\s*([^)\s]+)\s*\)', re.IGNORECASE)
+_descriptor_port_re = re.compile(r'\(\s*PORT\s*=\s*(\d+)\s*\)', re.IGNORECASE)
+# host[:port][/service] or host:port:SID, optionally prefixed with //
+_ezconnect_re = re.compile(r'^(?://)?([A-Za-z0-9_.\-]+)(?::(\d+))?(?:[:/].*)?$')
+
+
+def parse_db_endpoint(value: str) -> Optional[Tuple[str, int]]:
+    """Extract (host, port) from a JDBC URL, connect descriptor or EZConnect string"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.lower().startswith('jdbc:'):
+        value = value.split('@', 1)[1] if '@' in value else ''
+    if '(' in value:
+        host = _descriptor_host_re.search(value)
+        port = _descriptor_port_re.search(value)
+        if host:
+            return host.group(1), int(port.group(1)) if port else DEFAULT_ORACLE_PORT
+        return None
+    match = _ezconnect_re.match(value)
+    # A bare word with no port or service is a TNS alias, not a host
+    if not match or (not match.group(2) and '/' not in value):
+        return None
+    return match.group(1), int(match.group(2) or DEFAULT_ORACLE_PORT)
+
+
+def resolve_tns_alias(alias: str, oracle_home: str) -> Optional[Tuple[str, int]]:
+    """Look a TNS alias up in tnsnames.ora under TNS_ADMIN or the Oracle home"""
+    candidates = []
+    if os.getenv('TNS_ADMIN'):
+        candidates.append(os.path.join(os.getenv('TNS_ADMIN'), 'tnsnames.ora'))
+    if oracle_home:
+        candidates.append(os.path.join(oracle_home, 'network', 'admin', 'tnsnames.ora'))
+    entry_re = re.compile(
+        r'^\s*' + re.escape(alias) + r'(?:\.[\w.]+)?\s*=\s*(\(.*?)(?=^\s*[\w.]+\s*=|\Z)',
+        re.IGNORECASE | re.MULTILINE | re.DOTALL)
+    for path in candidates:
+        try:
+            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                match = entry_re.search(f.read())
+        except OSError:
+            continue
+        if match:
+            return parse_db_endpoint(match.group(1))
+    return None
+
+
+def check_tcp(host: str, port: int, timeout: float) -> Dict:
+    started = time.perf_counter()
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            pass
+        return {'ok': True, 'latencyMs': round((time.perf_counter() - started) * 1000, 1)}
+    except OSError as e:
+        return {'ok': False, 'error': str(e) or e.__class__.__name__}
+
+
+def check_http(url: str, timeout: float) -> Dict:
+    """
+    HEAD the URL; any HTTP response below 500 means the server is reachable.
+    A TLS handshake or certificate failure also counts as reachable: the
+    port answered, and self-signed or internal-CA certificates are common
+    on Agile PLM hosts. A URL that cannot be parsed is reported as
+    misconfigured (ok None) rather than down
+    """
+    started = time.perf_counter()
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError as e:
+        return {'ok': None, 'misconfigured': True, 'error': f'Invalid URL {url}: {e}'}
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        return {'ok': None, 'misconfigured': True, 'error': f'Unsupported URL: {url}'}
+    if parts.scheme == 'https':
+        conn = http.client.HTTPSConnection(parts.hostname, port, timeout=timeout,
+                                           context=ssl.create_default_context())
+    else:
+        conn = http.client.HTTPConnection(parts.hostname, port, timeout=timeout)
+    try:
+        conn.request('HEAD', parts.path or '/')
+        status = conn.getresponse().status
+    except ssl.SSLError as e:
+        return {'ok': True, 'tlsError': str(e) or e.__class__.__name__,
+                'latencyMs': round((time.perf_counter() - started) * 1000, 1)}
+    except (OSError, http.client.HTTPException) as e:
+        return {'ok': False, 'error': str(e) or e.__class__.__name__}
+    finally:
+        conn.close()
+    result = {'ok': status < 500, 'status': status,
+              'latencyMs': round((time.perf_counter() - started) * 1000, 1)}
+    if status >= 500:
+        result['error'] = f'HTTP {status}'
+    return result
+
+
+class EnvironmentProber:
+    """Concurrent, cached reachability checks for Environment records"""
+
+    def __init__(self, max_workers: int = 8, timeout: float = 3.0, ttl: float = 60.0):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.ttl = ttl
+        self._cache: Dict[str, Tuple[float, Dict]] = {}
+        self._lock = threading.Lock()
+        self._background: Optional[threading.Thread] = None
+
+    def _targets(self, env) -> List[Dict]:
+        targets = []
+        if env.agile_plm_url:
+            targets.append({'target': 'agilePlmUrl', 'kind': 'http', 'url': env.agile_plm_url})
+        seen = set()
+        for name, value in (('destJdbcUrl', env.dest_jdbc_url), ('destTnsName', env.dest_tns_name)):
+            if not value:
+                continue
+            endpoint = parse_db_endpoint(value)
+            if endpoint is None and name == 'destTnsName':
+                endpoint = resolve_tns_alias(value, env.dest_oracle_home)
+            if endpoint is None:
+                targets.append({'target': name, 'kind': 'unresolved', 'value': value})
+            elif endpoint not in seen:
+                seen.add(endpoint)
+                targets.append({'target': name, 'kind': 'tcp', 'host': endpoint[0], 'port': endpoint[1]})
+        return targets
+
+    def probe(self, env) -> Dict:
+        """Check one environment now and cache the result"""
+        checks = []
+        for target in self._targets(env):
+            if target['kind'] == 'http':
+                result = check_http(target['url'], self.timeout)
+                result['endpoint'] = target['url']
+            elif target['kind'] == 'tcp':
+                result = check_tcp(target['host'], target['port'], self.timeout)
+                result['endpoint'] = f"{target['host']}:{target['port']}"
+            else:
+                result = {'ok': None, 'endpoint': target['value'],
+                          'error': 'Could not resolve host and port'}
+            result['target'] = target['target']
+            checks.append(result)
+
+        outcomes = [c['ok'] for c in checks if c['ok'] is not None]
+        if any(c.get('misconfigured') for c in checks):
+            status = 'misconfigured'
+        elif not outcomes:
+            status = 'unknown'
+        elif all(outcomes):
+            status = 'up'
+        elif any(outcomes):
+            status = 'degraded'
+        else:
+            status = 'down'
+        health = {
+            'status': status,
+            'checkedAt': datetime.utcnow().isoformat() + 'Z',
+            'checks': checks,
+        }
+        with self._lock:
+            self._cache[env.tag] = (time.monotonic(), health)
+        return health
+
+    def probe_all(self, environments: List) -> Dict[str, Dict]:
+        """Check environments concurrently, at most max_workers at a time"""
+        if not environments:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(environments))) as pool:
+            results = pool.map(self.probe, environments)
+            return {env.tag: health for env, health in zip(environments, results)}
+
+    def cached(self, tag: str) -> Optional[Dict]:
+        """Last result for an environment if it is younger than the TTL"""
+        with self._lock:
+            entry = self._cache.get(tag)
+        if entry and time.monotonic() - entry[0] < self.ttl:
+            return entry[1]
+        return None
+
+    def check(self, env) -> Dict:
+        """Cached result if fresh, otherwise probe now"""
+        return self.cached(env.tag) or self.probe(env)
+
+    def forget(self, tag: str) -> None:
+        with self._lock:
+            self._cache.pop(tag, None)
+
+    def start_background(self, interval: float, load_environments) -> None:
+        """Re-probe every environment every interval seconds on a daemon thread"""
+        if self._background and self._background.is_alive():
+            return
+
+        def loop():
+            while True:
+                try:
+                    self.probe_all(load_environments())
+                except Exception:  # noqa
+                    logger.exception('Environment probe cycle failed')
+                time.sleep(interval)
+
+        self._background = threading.Thread(target=loop, daemon=True)
+        self._background.start()
+
+
+env_prober = EnvironmentProber(
+    max_workers=Config.PROBE_WORKERS,
+    timeout=Config.PROBE_TIMEOUT_SECONDS,
+    ttl=Config.PROBE_TTL_SECONDS,
+)
@@ -0,0 +1,236 @@
+"""
+Error Rollups - Cross-job error signatures and daily trend aggregates
+
+Error and warning messages from ACPLogParser are normalized into signatures
+(timestamps, numbers, quoted names, ids and paths replaced by placeholders)
+so the same failure groups together across jobs. Counts are kept per
+signature x host x job type x day and updated once per finished job, so
+dashboard queries never rescan logs.
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from config import Config
+from app.services.acp_log_parser import ACPLogAnalysis, ACPLogParser
+
+SIGNATURE_MAX_LENGTH = 200
+
+_NORMALIZERS = [
+    (ACPLogParser.TIMESTAMP_PATTERN, ''),
+    (ACPLogParser.LOG_LEVEL_PATTERN, ''),
+    (re.compile(r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}', re.IGNORECASE), '<id>'),
+    (re.compile(r'"[^"]*"|\'[^\']*\''), '<str>'),
+    (re.compile(r'(?:\b[A-Za-z]:|(?<!\w))[\\/][\w.\-\\/]+'), '<path>'),
+    (re.compile(r'\b0x[0-9a-f]+\b', re.IGNORECASE), '<n>'),
+    (re.compile(r'\d+(?:[.:]\d+)*'), '<n>'),
+    (re.compile(r'^\W*<n>\)\s*'), ''),
+    (re.compile(r'\s+'), ' '),
+]
+
+
+def signature_for(message: str) -> str:
+    """Normalize a log message so recurrences of the same failure compare equal"""
+    for pattern, replacement in _NORMALIZERS:
+        message = pattern.sub(replacement, message)
+    return message.strip()[:SIGNATURE_MAX_LENGTH]
+
+
+def summarize_signatures(analysis: ACPLogAnalysis) -> Dict[str, Dict]:
+    """Group an analysis' errors and warnings by signature"""
+    signatures: Dict[str, Dict] = {}
+    for entry in analysis.errors + analysis.warnings:
+        signature = signature_for(entry.message)
+        if not signature:
+            continue
+        item = signatures.get(signature)
+        if item is None:
+            level = 'ERROR' if entry.level in ('ERROR', 'SEVERE', 'FATAL') else 'WARNING'
+            signatures[signature] = item = {
+                'level': level, 'count': 0, 'sample': entry.message.strip()}
+        item['count'] += 1
+    return signatures
+
+
+class ErrorRollups:
+    """Incremental signature x host x job type x day aggregates in SQLite"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        # Tables are created on first use so importing this module stays cheap
+        self._initialized = False
+        self._init_lock = threading.Lock()
+
+    @contextmanager
+    def _db(self):
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    self._init_db()
+                    self._initialized = True
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript('''
+                CREATE TABLE IF NOT EXISTS signatures (
+                    hash TEXT PRIMARY KEY,
+                    signature TEXT NOT NULL,
+                    level TEXT NOT NULL,
+                    sample TEXT NOT NULL,
+                    first_seen TEXT NOT NULL,
+                    last_seen TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS signature_daily (
+                    hash TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    host TEXT NOT NULL,
+                    job_type TEXT NOT NULL,
+                    occurrences INTEGER NOT NULL,
+                    jobs INTEGER NOT NULL,
+                    PRIMARY KEY (hash, day, host, job_type)
+                );
+                CREATE INDEX IF NOT EXISTS idx_signature_daily_day
+                    ON signature_daily (day, job_type, host);
+                CREATE TABLE IF NOT EXISTS job_daily (
+                    day TEXT NOT NULL,
+                    host TEXT NOT NULL,
+                    job_type TEXT NOT NULL,
+                    jobs INTEGER NOT NULL,
+                    failed_jobs INTEGER NOT NULL,
+                    PRIMARY KEY (day, host, job_type)
+                );
+            ''')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def record_job(self, job_type: str, host: Optional[str], finished_at: datetime,
+                   failed: bool, signatures: Optional[Dict[str, Dict]]) -> None:
+        """Fold one finished job into the daily aggregates"""
+        day = finished_at.date().isoformat()
+        seen = finished_at.isoformat() + 'Z'
+        host = host or ''
+        signatures = signatures or {}
+        rows = []
+        for signature, item in signatures.items():
+            digest = hashlib.sha1(signature.encode('utf-8')).hexdigest()[:16]
+            rows.append((digest, signature, item['level'], item['sample'], item['count']))
+
+        with self._db() as conn:
+            conn.execute('''
+                INSERT INTO job_daily (day, host, job_type, jobs, failed_jobs)
+                VALUES (?, ?, ?, 1, ?)
+                ON CONFLICT (day, host, job_type) DO UPDATE SET
+                    jobs = jobs + 1, failed_jobs = failed_jobs + excluded.failed_jobs
+            ''', (day, host, job_type, int(failed)))
+            conn.executemany('''
+                INSERT INTO signatures (hash, signature, level, sample, first_seen, last_seen)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (hash) DO UPDATE SET last_seen = excluded.last_seen
+            ''', [(digest, signature, level, sample, seen, seen)
+                  for digest, signature, level, sample, _ in rows])
+            conn.executemany('''
+                INSERT INTO signature_daily (hash, day, host, job_type, occurrences, jobs)
+                VALUES (?, ?, ?, ?, ?, 1)
+                ON CONFLICT (hash, day, host, job_type) DO UPDATE SET
+                    occurrences = occurrences + excluded.occurrences, jobs = jobs + 1
+            ''', [(digest, day, host, job_type, count)
+                  for digest, _, _, _, count in rows])
+            conn.commit()
+
+    @staticmethod
+    def _filters(days: int, host: Optional[str], job_type: Optional[str], alias: str):
+        since = (datetime.utcnow().date() - timedelta(days=days - 1)).isoformat()
+        clauses = [f'{alias}.day >= ?']
+        params: List = [since]
+        if host:
+            clauses.append(f'{alias}.host = ?')
+            params.append(host)
+        if job_type:
+            clauses.append(f'{alias}.job_type = ?')
+            params.append(job_type)
+        return ' AND '.join(clauses), params
+
+    def top_failures(self, days: int = 7, host: Optional[str] = None,
+                     job_type: Optional[str] = None, level: Optional[str] = None,
+                     limit: int = 20) -> Dict:
+        """Most recurring signatures in the window, with the share of jobs they hit"""
+        where, params = self._filters(days, host, job_type, 'd')
+        total_where, total_params = self._filters(days, host, job_type, 'j')
+        if level:
+            where += ' AND s.level = ?'
+            params.append(level.upper())
+
+        with self._db() as conn:
+            totals = conn.execute(f'''
+                SELECT COALESCE(SUM(jobs), 0) AS jobs, COALESCE(SUM(failed_jobs), 0) AS failed_jobs
+                FROM job_daily j WHERE {total_where}
+            ''', total_params).fetchone()
+            rows = conn.execute(f'''
+                SELECT s.hash, s.signature, s.level, s.sample, s.first_seen, s.last_seen,
+                       SUM(d.occurrences) AS occurrences, SUM(d.jobs) AS jobs,
+                       COUNT(DISTINCT d.host) AS hosts
+                FROM signature_daily d JOIN signatures s ON s.hash = d.hash
+                WHERE {where}
+                GROUP BY s.hash
+                ORDER BY jobs DESC, occurrences DESC
+                LIMIT ?
+            ''', params + [limit]).fetchall()
+
+        total_jobs = totals['jobs']
+        return {
+            'days': days,
+            'totalJobs': total_jobs,
+            'failedJobs': totals['failed_jobs'],
+            'signatures': [{
+                'signature': row['hash'],
+                'pattern': row['signature'],
+                'level': row['level'],
+                'sample': row['sample'],
+                'occurrences': row['occurrences'],
+                'jobs': row['jobs'],
+                'jobShare': round(row['jobs'] / total_jobs, 4) if total_jobs else 0.0,
+                'hosts': row['hosts'],
+                'firstSeen': row['first_seen'],
+                'lastSeen': row['last_seen'],
+            } for row in rows],
+        }
+
+    def trend(self, signature_hash: str, days: int = 30, host: Optional[str] = None,
+              job_type: Optional[str] = None) -> List[Dict]:
+        """Daily occurrences of one signature, broken down by host and job type"""
+        where, params = self._filters(days, host, job_type, 'd')
+        with self._db() as conn:
+            rows = conn.execute(f'''
+                SELECT d.day, d.host, d.job_type, d.occurrences, d.jobs
+                FROM signature_daily d
+                WHERE d.hash = ? AND {where}
+                ORDER BY d.day
+            ''', [signature_hash] + params).fetchall()
+        by_day: Dict[str, List[Dict]] = defaultdict(list)
+        for row in rows:
+            by_day[row['day']].append({
+                'host': row['host'],
+                'jobType': row['job_type'],
+                'occurrences': row['occurrences'],
+                'jobs': row['jobs'],
+            })
+        return [{'day': day, 'breakdown': items} for day, items in by_day.items()]
+
+
+error_rollups = ErrorRollups(Config.ROLLUP_DB_PATH)
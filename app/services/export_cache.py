@@ -0,0 +1,234 @@
+"""
+Export Cache - Durable cache of export bundles
+
+Entries are keyed by (source environment tag, product line, config XML
+hash). An entry is a directory under EXPORT_CACHE_DIR holding the export
+job's output files and its export.log, plus meta.json. Files from the
+job's own work directory are hard-linked, since nothing writes to them
+once the job is done. Anything else, such as outputs left in a shared
+acp_project_dir when workspaces are off, is copied: the next export there
+rewrites those files in place, which would change the entry. An entry
+expires EXPORT_CACHE_TTL_SECONDS after it was written. Reading an
+entry touches meta.json, so when the cache grows past
+EXPORT_CACHE_MAX_BYTES the least recently used entries are evicted first.
+Hits are linked into the new job's work directory, so evicting an entry
+never breaks a job that was served from it.
+
+invalidate() drops entries for a source environment (and optionally a
+product line). Call it after admin changes in that Agile instance.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from config import Config
+from app.utils.files import link_or_copy
+from app.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CACHE_LOOKUPS = metrics.counter(
+    'acp_export_cache_lookups_total', 'Export cache lookups by result', ('result',))
+
+META_FILE = 'meta.json'
+
+
+def _is_within(path: str, directory: str) -> bool:
+    directory = os.path.realpath(directory)
+    return os.path.commonpath([os.path.realpath(path), directory]) == directory
+
+
+class ExportCache:
+    """TTL and size-bounded LRU cache of export bundles on disk"""
+
+    def __init__(self, cache_dir: str, ttl_seconds: float, max_bytes: int, enabled: bool = True):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(source_env: str, product_line: str, config_hash: str) -> str:
+        return hashlib.sha256(
+            f'{source_env}\0{product_line}\0{config_hash}'.encode('utf-8')).hexdigest()
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    @staticmethod
+    def _read_meta(entry_dir: str) -> Optional[Dict]:
+        try:
+            with open(os.path.join(entry_dir, META_FILE), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _fresh(self, meta: Optional[Dict]) -> bool:
+        return meta is not None and time.time() - meta.get('createdAt', 0) <= self.ttl_seconds
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Metadata of a fresh, complete entry, with absolute file paths; None on a miss"""
+        if not self.enabled:
+            return None
+        entry_dir = self._entry_dir(key)
+        meta = self._read_meta(entry_dir)
+        if not self._fresh(meta):
+            CACHE_LOOKUPS.labels('expired' if meta else 'miss').inc()
+            return None
+        files = {name: os.path.join(entry_dir, name) for name in meta.get('files', [])}
+        if not files or not all(os.path.exists(p) for p in files.values()):
+            CACHE_LOOKUPS.labels('miss').inc()
+            return None
+        try:
+            os.utime(os.path.join(entry_dir, META_FILE))
+        except OSError:
+            pass
+        CACHE_LOOKUPS.labels('hit').inc()
+        return dict(meta, files=files, entryDir=entry_dir)
+
+    def put(self, key: str, source_env: str, product_line: str, config_hash: str,
+            output_files: Dict[str, str], log_path: Optional[str] = None,
+            job_id: Optional[str] = None, analysis: Optional[Dict] = None,
+            work_dir: Optional[str] = None) -> bool:
+        """
+        Store an export's output files; False if there was nothing to store.
+        Files under work_dir, the job's own work directory, are linked and
+        the rest copied
+        """
+        if not self.enabled:
+            return False
+        files = {name: path for name, path in output_files.items() if os.path.isfile(path)}
+        if not files:
+            return False
+        os.makedirs(self.cache_dir, exist_ok=True)
+        staging = os.path.join(self.cache_dir, f'.{key}.{uuid.uuid4().hex}.tmp')
+
+        def store(path: str, name: str) -> None:
+            dst = os.path.join(staging, name)
+            if work_dir and _is_within(path, work_dir):
+                link_or_copy(path, dst)
+            else:
+                shutil.copyfile(path, dst)
+
+        try:
+            os.makedirs(staging)
+            size = 0
+            for name, path in files.items():
+                store(path, name)
+                size += os.path.getsize(path)
+            log_name = None
+            if log_path and os.path.isfile(log_path):
+                log_name = os.path.basename(log_path)
+                store(log_path, f'log-{log_name}')
+            meta = {
+                'key': key,
+                'sourceEnv': source_env,
+                'productLine': product_line,
+                'configHash': config_hash,
+                'createdAt': time.time(),
+                'files': sorted(files),
+                'log': f'log-{log_name}' if log_name else None,
+                'bytes': size,
+                'jobId': job_id,
+                'analysis': analysis,
+            }
+            with open(os.path.join(staging, META_FILE), 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            with self._lock:
+                entry_dir = self._entry_dir(key)
+                if os.path.exists(entry_dir):
+                    shutil.rmtree(entry_dir, ignore_errors=True)
+                os.replace(staging, entry_dir)
+        except OSError as e:
+            logger.warning(f"Could not store export cache entry {key}: {e}")
+            shutil.rmtree(staging, ignore_errors=True)
+            return False
+        self.prune()
+        return True
+
+    def _entries(self) -> List[Dict]:
+        entries = []
+        try:
+            scanned = list(os.scandir(self.cache_dir))
+        except OSError:
+            return entries
+        for item in scanned:
+            if not item.is_dir() or item.name.startswith('.'):
+                continue
+            meta = self._read_meta(item.path)
+            try:
+                used = os.stat(os.path.join(item.path, META_FILE)).st_mtime
+            except OSError:
+                used = 0
+            entries.append({'dir': item.path, 'meta': meta, 'usedAt': used})
+        return entries
+
+    def prune(self) -> int:
+        """Remove expired and unreadable entries, then least recently used ones beyond max_bytes"""
+        removed = 0
+        with self._lock:
+            live = []
+            for entry in self._entries():
+                if self._fresh(entry['meta']):
+                    live.append(entry)
+                else:
+                    shutil.rmtree(entry['dir'], ignore_errors=True)
+                    removed += 1
+            live.sort(key=lambda e: e['usedAt'])
+            total = sum(e['meta'].get('bytes', 0) for e in live)
+            while live and total > self.max_bytes:
+                entry = live.pop(0)
+                total -= entry['meta'].get('bytes', 0)
+                shutil.rmtree(entry['dir'], ignore_errors=True)
+                removed += 1
+        return removed
+
+    def invalidate(self, source_env: Optional[str] = None, product_line: Optional[str] = None) -> int:
+        """Drop entries matching the filters (all entries when none are given)"""
+        removed = 0
+        with self._lock:
+            for entry in self._entries():
+                meta = entry['meta'] or {}
+                if source_env and meta.get('sourceEnv') != source_env:
+                    continue
+                if product_line and meta.get('productLine') != product_line:
+                    continue
+                shutil.rmtree(entry['dir'], ignore_errors=True)
+                removed += 1
+        return removed
+
+    def stats(self) -> Dict:
+        with self._lock:
+            entries = [e for e in self._entries() if e['meta']]
+        return {
+            'enabled': self.enabled,
+            'ttlSeconds': self.ttl_seconds,
+            'maxBytes': self.max_bytes,
+            'bytes': sum(e['meta'].get('bytes', 0) for e in entries),
+            'entries': [{
+                'sourceEnv': e['meta'].get('sourceEnv'),
+                'productLine': e['meta'].get('productLine'),
+                'configHash': e['meta'].get('configHash'),
+                'files': e['meta'].get('files'),
+                'bytes': e['meta'].get('bytes'),
+                'jobId': e['meta'].get('jobId'),
+                'createdAt': e['meta'].get('createdAt'),
+                'lastUsedAt': e['usedAt'],
+                'fresh': self._fresh(e['meta']),
+            } for e in sorted(entries, key=lambda e: e['usedAt'], reverse=True)],
+        }
+
+
+export_cache = ExportCache(
+    cache_dir=Config.EXPORT_CACHE_DIR,
+    ttl_seconds=Config.EXPORT_CACHE_TTL_SECONDS,
+    max_bytes=Config.EXPORT_CACHE_MAX_BYTES,
+    enabled=Config.EXPORT_CACHE_ENABLED,
+)
@@ -0,0 +1,246 @@
+"""
+Fan-out imports - One export bundle imported into many target environments
+
+A fan-out request is an acp/import body with a list of targets in place of
+a single targetEnv. It becomes a parent job (type acp-import-fanout) with
+one acp-import child job per target, all created up front so the caller
+gets every job id at once.
+
+The parent stages the bundle into its own work directory once. Each child
+then links that copy into its work directory rather than copying it again.
+Children wait in one FIFO queue shared by every fan-out request. They
+start as slots free up, within a global limit (FANOUT_MAX_CONCURRENCY), a
+per-ACP-host limit (FANOUT_MAX_PER_HOST) and an optional per-request
+maxConcurrency. The parent finishes when its last child does. Its status
+and summary aggregate the children.
+
+A deleted child counts as failed and frees its slot. Deleting the parent
+fails the children that have not started yet; those already running carry on.
+"""
+import os
+import threading
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Tuple
+
+from config import Config
+from app.services.job_launcher import job_launcher
+from app.services.job_manager import Job, job_manager
+from app.utils.files import link_or_copy
+from app.utils.job_timing import phase
+from app.utils.metrics import metrics
+
+FANOUT_KEYS = ('targets', 'maxConcurrency')
+
+
+@dataclass
+class FanOutChild:
+    target: str
+    job_id: str
+    host: str
+    body: Dict
+    started: bool = False
+
+
+@dataclass
+class FanOut:
+    parent_id: str
+    children: List[FanOutChild]
+    max_concurrency: int
+    running: int = 0
+    finished: int = 0
+    # The parent job was deleted: children that have not started never will
+    cancelled: bool = False
+    done: threading.Event = field(default_factory=threading.Event)
+
+
+class FanOutManager:
+    def __init__(self, max_concurrency: int, max_per_host: int):
+        self.max_concurrency = max(max_concurrency, 1)
+        self.max_per_host = max(max_per_host, 1)
+        self._queue: Deque[Tuple[FanOut, FanOutChild]] = deque()
+        self._running = 0
+        self._running_by_host: Counter = Counter()
+        self._by_child: Dict[str, Tuple[FanOut, FanOutChild]] = {}
+        self._by_parent: Dict[str, FanOut] = {}
+        self._lock = threading.Lock()
+        job_manager.add_finish_listener(self._on_job_finished)
+        job_manager.add_delete_listener(self._on_job_deleted)
+
+    @staticmethod
+    def parse(body: Dict) -> List[Tuple[str, Dict]]:
+        """(target, acp/import body) per target of a fan-out request; raises ValueError"""
+        targets = body.get('targets')
+        if not isinstance(targets, list) or not targets:
+            raise ValueError('targets must be a non-empty list of environment tags')
+        base = {k: v for k, v in body.items() if k not in FANOUT_KEYS}
+        result = []
+        for item in targets:
+            child = dict(base)
+            child.update({'targetEnv': item} if isinstance(item, str) else item)
+            target = child.get('targetEnv')
+            if not target:
+                raise ValueError('every target needs a targetEnv')
+            if any(target == t for t, _ in result):
+                raise ValueError(f'Duplicate target: {target}')
+            try:
+                job_launcher.validate('acp-import', child)
+            except ValueError as e:
+                raise ValueError(f'Target {target}: {e}')
+            result.append((target, child))
+        return result
+
+    def submit(self, body: Dict) -> Job:
+        """Create the parent and child jobs and start the parent"""
+        targets = self.parse(body)
+        max_concurrency = int(body.get('maxConcurrency') or self.max_concurrency)
+        parent_id = job_manager.create_job(job_type='acp-import-fanout', host=body.get('host'))
+        children = []
+        for target, child_body in targets:
+            job_id = job_manager.create_job(job_type='acp-import', host=child_body['host'])
+            job_manager.get_job(job_id).parent_id = parent_id
+            children.append(FanOutChild(target, job_id, child_body['host'], child_body))
+        parent = job_manager.get_job(parent_id)
+        parent.children = {child.target: child.job_id for child in children}
+
+        fanout = FanOut(parent_id, children, max(max_concurrency, 1))
+        with self._lock:
+            self._by_parent[parent_id] = fanout
+            for child in children:
+                self._by_child[child.job_id] = (fanout, child)
+        job_manager.start_job(parent_id, lambda: self._run(fanout))
+        return parent
+
+    def _run(self, fanout: FanOut) -> Dict:
+        """Parent job: stage the bundle once, queue the children and wait for them"""
+        first = fanout.children[0].body
+        bundle = first.get('exportBundle')
+        if bundle and os.path.exists(bundle):
+            shared = os.path.join(job_manager.get_job_work_dir(fanout.parent_id),
+                                  os.path.basename(bundle))
+            with phase('staging'):
+                link_or_copy(bundle, shared)
+            for child in fanout.children:
+                if child.body.get('exportBundle') == bundle:
+                    child.body = dict(child.body, exportBundle=shared)
+            job_manager.append_log(fanout.parent_id, f'Staged {bundle} as {shared}\n')
+        job_manager.append_log(
+            fanout.parent_id,
+            f"Importing into {len(fanout.children)} targets: "
+            f"{', '.join(child.target for child in fanout.children)}\n")
+
+        with self._lock:
+            # Children deleted meanwhile are already accounted for
+            if not fanout.cancelled:
+                self._queue.extend((fanout, child) for child in fanout.children
+                                   if child.job_id in self._by_child)
+            ready = self._take_ready()
+        self._start(ready)
+        fanout.done.wait()
+        return self._result(fanout)
+
+    def _take_ready(self) -> List[FanOutChild]:
+        """Dequeue every child that fits within the limits now, oldest first; call with the lock held"""
+        ready = []
+        for item in list(self._queue):
+            if self._running >= self.max_concurrency:
+                break
+            fanout, child = item
+            if self._running_by_host[child.host] >= self.max_per_host:
+                continue
+            if fanout.running >= fanout.max_concurrency:
+                continue
+            self._queue.remove(item)
+            self._running += 1
+            self._running_by_host[child.host] += 1
+            fanout.running += 1
+            child.started = True
+            ready.append(child)
+        return ready
+
+    @staticmethod
+    def _start(children: List[FanOutChild]) -> None:
+        for child in children:
+            try:
+                job_launcher.start('acp-import', child.body, job_id=child.job_id)
+            except Exception as e:  # noqa
+                # complete_job runs the finish listener, which frees the slot
+                job_manager.complete_job(child.job_id, error=e)
+
+    def _on_job_finished(self, job: Job) -> None:
+        self._child_done(job.id, f'{job.status} (exit code {job.exit_code}), job {job.id}')
+
+    def _on_job_deleted(self, job_id: str) -> None:
+        with self._lock:
+            fanout = self._by_parent.get(job_id)
+        if fanout:
+            self._cancel(fanout)
+        # A deleted job is never completed, so this is the only chance to free its slot
+        self._child_done(job_id, f'deleted, job {job_id}')
+
+    def _cancel(self, fanout: FanOut) -> None:
+        """Fail the children of a deleted parent that have not started"""
+        with self._lock:
+            fanout.cancelled = True
+            pending = [child for child in fanout.children
+                       if not child.started and child.job_id in self._by_child]
+            for item in [item for item in self._queue if item[0] is fanout]:
+                self._queue.remove(item)
+        for child in pending:
+            job_manager.complete_job(child.job_id, error=RuntimeError('Fan-out parent job was deleted'))
+
+    def _child_done(self, job_id: str, outcome: str) -> None:
+        """Account for a child that finished or was deleted, and start what its slot lets in"""
+        with self._lock:
+            entry = self._by_child.pop(job_id, None)
+            if entry is None:
+                return
+            fanout, child = entry
+            if child.started:
+                self._running -= 1
+                self._running_by_host[child.host] -= 1
+                fanout.running -= 1
+            else:
+                for item in [item for item in self._queue if item[1] is child]:
+                    self._queue.remove(item)
+            fanout.finished += 1
+            if fanout.finished == len(fanout.children):
+                self._by_parent.pop(fanout.parent_id, None)
+            ready = self._take_ready()
+        job_manager.append_log(fanout.parent_id, f'{child.target}: {outcome}\n')
+        # A child job that no longer exists was deleted, which counts as a failure
+        failed = sum(1 for c in fanout.children
+                     if getattr(job_manager.get_job(c.job_id), 'status', 'error') == 'error')
+        parent = job_manager.get_job(fanout.parent_id)
+        if parent:
+            parent.summary = (f'{fanout.finished} of {len(fanout.children)} targets finished, '
+                              f'{failed} failed')
+        if fanout.finished == len(fanout.children):
+            fanout.done.set()
+        self._start(ready)
+
+    @staticmethod
+    def _result(fanout: FanOut) -> Dict:
+        jobs = {child.target: job_manager.get_job(child.job_id) for child in fanout.children}
+        failed = [target for target, job in jobs.items() if not job or job.status != 'success']
+        summary = f'Imported into {len(jobs) - len(failed)} of {len(jobs)} targets'
+        if failed:
+            summary += f"; failed: {', '.join(failed)}"
+        return {
+            'log': summary + '\n',
+            'output_files': {},
+            'summary': summary,
+            'analysis': None,
+            'exit_code': 1 if failed else 0,
+            'severity': 'ERROR' if failed else 'SUCCESS',
+        }
+
+    def child_counts(self) -> Dict[Tuple[str], int]:
+        with self._lock:
+            return {('queued',): len(self._queue), ('running',): self._running}
+
+
+fanout_manager = FanOutManager(Config.FANOUT_MAX_CONCURRENCY, Config.FANOUT_MAX_PER_HOST)
+
+metrics.gauge_callback('acp_fanout_children', 'Fan-out import child jobs, by state',
+                       ('state',), fanout_manager.child_counts)
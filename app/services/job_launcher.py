@@ -0,0 +1,349 @@
+"""
+Job Launcher - Validate and start ACP export/import and Averify jobs
+
+Takes the same JSON request bodies as the /api/jobs endpoints, so a job
+can be started from an HTTP request or from a pipeline step alike.
+validate() checks a body before anything is created; start() creates the
+job and, once the resource scheduler has the environments and host it
+uses free, hands it to the demo simulator or to a job thread running the
+real service.
+
+Exports are coalesced. An export's key is a hash of its host, product line
+and config XML content. A new export whose key matches a running export
+attaches to that job. One matching an export that succeeded less than
+EXPORT_FRESHNESS_SECONDS ago, with its output files still on disk, reuses
+that job. Either way start() returns the existing job id and no ACP
+process is started.
+
+Exports with a sourceEnv also go through the export cache, per the body's
+cachePolicy:
+- use (the default): serve a cached bundle as a job that finishes within
+  milliseconds, or run the export and cache its bundle
+- refresh: always run the export, and replace the cached bundle
+- bypass: run the export and leave the cache alone
+"""
+import hashlib
+import os
+import shutil
+import threading
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from config import Config
+from app.models.environment import Environment
+from app.services.acp_service import AcpService
+from app.services.averify_service import AverifyService
+from app.services.demo_service import demo_service
+from app.services.export_cache import export_cache
+from app.services.job_manager import Job, job_manager
+from app.services.resource_scheduler import resource_claims, resource_scheduler
+from app.services.workspaces import workspace_manager
+from app.utils.files import link_or_copy
+from app.utils.job_timing import phase
+from app.utils.metrics import metrics
+
+EXPORTS_COALESCED = metrics.counter(
+    'acp_exports_coalesced_total', 'Export requests served by an existing job',
+    ('outcome',))
+
+# Job types a launcher body can start, and the fields each one requires
+REQUIRED_FIELDS = {
+    'acp-export': ('xmlConfig', 'productLine', 'host'),
+    'acp-import': ('xmlConfig', 'exportBundle', 'host'),
+    'averify': ('sourceEnv', 'targetEnv', 'host'),
+}
+
+
+CACHE_POLICIES = ('use', 'refresh', 'bypass')
+
+
+def config_digest(xml_config: str) -> str:
+    """SHA-256 of a config XML file's content (of the value itself if it is not a file)"""
+    digest = hashlib.sha256()
+    if os.path.isfile(xml_config):
+        with open(xml_config, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+    else:
+        digest.update(xml_config.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def export_key(body: Dict) -> str:
+    """Content hash of what an export reads: host, product line and config XML"""
+    return hashlib.sha256(
+        f"{body.get('host')}\0{body.get('productLine')}\0"
+        f"{config_digest(body.get('xmlConfig') or '')}".encode('utf-8')).hexdigest()
+
+
+def ssh_config(body: Dict) -> Optional[Dict]:
+    """paramiko connection settings for an SSH-mode body, None for local mode"""
+    if body.get('mode', 'local') != 'ssh':
+        return None
+    ssh = body.get('ssh', {})
+    if not ssh.get('username'):
+        raise ValueError('ssh.username required for SSH mode')
+    return {
+        'hostname': ssh.get('host') or body.get('host'),
+        'username': ssh.get('username'),
+        'port': ssh.get('port', 22),
+        'password': ssh.get('password'),
+        'key_filename': ssh.get('keyFilename'),
+    }
+
+
+class JobLauncher:
+    """Starts jobs from request bodies"""
+
+    def __init__(self):
+        self.acp_service = AcpService()
+        self.averify_service = AverifyService()
+        # export_key -> (job id, source env, product line) of the latest export with that key
+        self._exports: Dict[str, Tuple[str, Optional[str], str]] = {}
+        self._exports_lock = threading.Lock()
+        # Export job id -> (cache key, source env, product line, config hash) to store on success
+        self._cache_pending: Dict[str, Tuple[str, str, str, str]] = {}
+        job_manager.add_finish_listener(self._on_job_finished)
+
+    @staticmethod
+    def validate(job_type: str, body: Dict) -> None:
+        """Raise ValueError if body cannot start a job of this type"""
+        if job_type not in REQUIRED_FIELDS:
+            raise ValueError(f"Unknown job type: {job_type}")
+        required = REQUIRED_FIELDS[job_type]
+        # In demo mode imports are simulated and only need a host
+        if Config.DEMO_MODE and job_type == 'acp-import':
+            required = ('host',)
+        if not all(body.get(name) for name in required):
+            if len(required) == 1:
+                raise ValueError(f'{required[0]} is required')
+            raise ValueError(f"{', '.join(required[:-1])} and {required[-1]} are required")
+        if job_type == 'acp-export' and body.get('cachePolicy', 'use') not in CACHE_POLICIES:
+            raise ValueError(f"cachePolicy must be one of: {', '.join(CACHE_POLICIES)}")
+        ssh_config(body)
+
+    def start(self, job_type: str, body: Dict, job_id: Optional[str] = None) -> str:
+        """
+        Validate body, start the job and return its id. job_id starts a
+        job already created with JobManager.create_job instead of a new one
+        """
+        self.validate(job_type, body)
+        if job_type == 'acp-export' and job_id is None:
+            return self._start_shared_export(body)
+        if job_id is None:
+            job_id = job_manager.create_job(job_type=job_type, host=body['host'])
+        self._schedule(job_type, job_id, body)
+        return job_id
+
+    def _schedule(self, job_type: str, job_id: str, body: Dict) -> None:
+        """Start the job once the environments and host it uses are free"""
+        starter = {
+            'acp-export': self._start_export,
+            'acp-import': self._start_import,
+            'averify': self._start_averify,
+        }[job_type]
+        resource_scheduler.submit(job_id, resource_claims(job_type, body),
+                                  lambda: starter(job_id, body))
+
+    @staticmethod
+    def _reusable(job_id: Optional[str]) -> Optional[str]:
+        """'attached' if the export is still running, 'reused' if its fresh outputs can be served"""
+        job = job_manager.get_job(job_id) if job_id else None
+        if job is None:
+            return None
+        if job.finished_at is None:
+            return 'attached'
+        age = (datetime.utcnow() - job.finished_at).total_seconds()
+        if job.status != 'success' or age > Config.EXPORT_FRESHNESS_SECONDS or not job.output_files:
+            return None
+        # Demo outputs are placeholders that never exist on disk
+        if not Config.DEMO_MODE and not all(os.path.exists(p) for p in job.output_files.values()):
+            return None
+        return 'reused'
+
+    def _start_shared_export(self, body: Dict) -> str:
+        """Serve an export from the cache or an identical export where possible, else start it"""
+        policy = body.get('cachePolicy', 'use')
+        cache_entry = None
+        if body.get('sourceEnv') and policy != 'bypass' and export_cache.enabled:
+            config_hash = config_digest(body['xmlConfig'])
+            cache_entry = (export_cache.key(body['sourceEnv'], body['productLine'], config_hash),
+                           body['sourceEnv'], body['productLine'], config_hash)
+            if policy == 'use':
+                cached = export_cache.get(cache_entry[0])
+                if cached:
+                    return self._serve_cached_export(body, cached)
+
+        key = export_key(body) if Config.EXPORT_COALESCING else None
+        with self._exports_lock:
+            existing = self._exports.get(key, (None,))[0] if key else None
+            outcome = self._reusable(existing)
+            # refresh and bypass want a new run, but may still follow one already running
+            if outcome == 'attached' or (outcome == 'reused' and policy == 'use'):
+                EXPORTS_COALESCED.labels(outcome).inc()
+                if outcome == 'attached':
+                    job_manager.append_log(existing, 'Identical export request attached to this job\n')
+                return existing
+            job_id = job_manager.create_job(job_type='acp-export', host=body['host'])
+            if key:
+                # Forget keys whose jobs can no longer be attached to or reused
+                for stale in [k for k, v in self._exports.items() if not self._reusable(v[0])]:
+                    del self._exports[stale]
+                self._exports[key] = (job_id, body.get('sourceEnv'), body['productLine'])
+            if cache_entry:
+                self._cache_pending[job_id] = cache_entry
+        self._schedule('acp-export', job_id, body)
+        return job_id
+
+    @staticmethod
+    def _serve_cached_export(body: Dict, cached: Dict) -> str:
+        """
+        A job that only links the cached bundle into its work directory.
+        It runs on a job thread like any other: its finish listeners must
+        not run on the caller's thread, which may hold their locks
+        """
+        job_id = job_manager.create_job(job_type='acp-export', host=body['host'])
+        work_dir = job_manager.get_job_work_dir(job_id)
+        exported_at = datetime.utcfromtimestamp(cached['createdAt']).isoformat() + 'Z'
+
+        def _serve():
+            with phase('staging'):
+                outputs = {}
+                for name, path in cached['files'].items():
+                    outputs[name] = os.path.join(work_dir, name)
+                    link_or_copy(path, outputs[name])
+                if cached.get('log'):
+                    # Stored as log-<name>; restores export.log for the ACP log view
+                    link_or_copy(os.path.join(cached['entryDir'], cached['log']),
+                                 os.path.join(work_dir, cached['log'][len('log-'):]))
+            analysis = cached.get('analysis') or {}
+            return {
+                'log': f"Served from export cache: exported {exported_at} by job {cached.get('jobId')}\n",
+                'output_files': outputs,
+                'summary': f'Served from export cache (exported {exported_at})',
+                'analysis': cached.get('analysis'),
+                'exit_code': 0,
+                'severity': analysis.get('severity', 'SUCCESS'),
+            }
+
+        job_manager.start_job(job_id, _serve)
+        return job_id
+
+    def _on_job_finished(self, job: Job) -> None:
+        with self._exports_lock:
+            pending = self._cache_pending.pop(job.id, None)
+        if pending is None or job.status != 'success':
+            return
+        key, source_env, product_line, config_hash = pending
+        export_cache.put(key, source_env, product_line, config_hash, job.output_files,
+                         log_path=job_manager.get_acp_log_path(job.id), job_id=job.id,
+                         analysis=job.analysis, work_dir=job_manager.get_job_work_dir(job.id))
+
+    def invalidate_exports(self, source_env: Optional[str] = None,
+                           product_line: Optional[str] = None) -> int:
+        """
+        Forget cached bundles and finished exports for a source environment
+        (and product line), so the next export runs against current data.
+        Returns the number of cache entries removed
+        """
+        with self._exports_lock:
+            for key, (_, env, line) in list(self._exports.items()):
+                if (not source_env or env == source_env) and (not product_line or line == product_line):
+                    del self._exports[key]
+        return export_cache.invalidate(source_env, product_line)
+
+    def _start_export(self, job_id: str, body: Dict) -> None:
+        xml_config = body['xmlConfig']
+        product_line = body['productLine']
+        host = body['host']
+        ssh_cfg = ssh_config(body)
+
+        # Get environment to retrieve acp_project_dir
+        env = Environment.find_by_tag(body['sourceEnv']) if body.get('sourceEnv') else None
+        acp_project_dir = env.acp_project_dir if env and env.acp_project_dir else None
+        if acp_project_dir and not os.path.exists(acp_project_dir):
+            acp_project_dir = None
+
+        work_dir = job_manager.get_job_work_dir(job_id)
+        workspace = bool(acp_project_dir) and Config.WORKSPACES_ENABLED
+
+        # Without workspaces, the job runs in the shared project directory itself
+        if acp_project_dir and not workspace:
+            config_dest = os.path.join(acp_project_dir, 'config.xml')
+            if os.path.exists(xml_config):
+                shutil.copy2(xml_config, config_dest)
+                xml_config = config_dest
+                work_dir = acp_project_dir
+
+        if Config.DEMO_MODE:
+            if workspace:
+                workspace_manager.create(job_id, acp_project_dir, work_dir, xml_config)
+            demo_service.start_acp_export(job_id, host=host, product_line=product_line,
+                                          work_dir=work_dir)
+            return
+
+        def _run():
+            config_path = xml_config
+            if workspace:
+                # The project is cloned into the job's own work directory
+                with phase('staging'):
+                    config_path = workspace_manager.create(job_id, acp_project_dir, work_dir, xml_config)
+            return self.acp_service.run_acp_export(
+                host=host,
+                xml_config_path=config_path,
+                product_line=product_line,
+                work_dir=work_dir,
+                remote=ssh_cfg is not None,
+                ssh_config=ssh_cfg,
+                # The clone's project XML files are not outputs of this run
+                exclude=workspace_manager.created(job_id),
+            )
+
+        job_manager.start_job(job_id, _run)
+
+    def _start_import(self, job_id: str, body: Dict) -> None:
+        host = body['host']
+        ssh_cfg = ssh_config(body)
+        work_dir = job_manager.get_job_work_dir(job_id)
+
+        if Config.DEMO_MODE:
+            demo_service.start_acp_import(job_id, host=host, work_dir=work_dir)
+            return
+
+        def _run():
+            return self.acp_service.run_acp_import(
+                host=host,
+                xml_config_path=body['xmlConfig'],
+                export_bundle_path=body['exportBundle'],
+                work_dir=work_dir,
+                remote=ssh_cfg is not None,
+                ssh_config=ssh_cfg,
+            )
+
+        job_manager.start_job(job_id, _run)
+
+    def _start_averify(self, job_id: str, body: Dict) -> None:
+        host = body['host']
+        ssh_cfg = ssh_config(body)
+        work_dir = job_manager.get_job_work_dir(job_id)
+
+        if Config.DEMO_MODE:
+            demo_service.start_averify(job_id, source_env=body['sourceEnv'],
+                                       target_env=body['targetEnv'])
+            return
+
+        def _run():
+            return self.averify_service.run_averify(
+                host=host,
+                source_env=body['sourceEnv'],
+                target_env=body['targetEnv'],
+                config_path=body.get('configPath'),
+                work_dir=work_dir,
+                remote=ssh_cfg is not None,
+                ssh_config=ssh_cfg,
+            )
+
+        job_manager.start_job(job_id, _run)
+
+
+job_launcher = JobLauncher()
@@ -1,17 +1,50 @@
 import os
+import logging
+import sqlite3
 import threading
+import time
+import traceback
 import uuid
 from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Callable, Dict, Optional, List, Tuple
 
 from config import Config
+from app.services.acp_log_parser import ACPLogParser
+from app.services.analysis_cache import analysis_cache
+from app.services.log_index import log_index
+from app.services.error_rollups import error_rollups
+from app.services.parser_rules import rule_registry
+from app.utils import job_timing
+from app.utils.job_timing import JobTimings
+from app.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+JOBS_STARTED = metrics.counter('acp_jobs_started_total', 'Jobs started', ('type',))
+JOB_DURATION = metrics.histogram(
+    'acp_job_duration_seconds', 'Job wall-clock time from submission to finish',
+    ('type', 'severity'))
+JOB_EXIT_CODES = metrics.counter(
+    'acp_job_exit_codes_total', 'Finished jobs by analyzed exit code', ('type', 'exit_code'))
+LOG_INGESTED = metrics.counter(
+    'acp_log_ingested_bytes_total', 'Job log text appended, in characters', ('type',))
+JOB_PHASE_SECONDS = metrics.histogram(
+    'acp_job_phase_seconds', 'Time a job spent in each lifecycle phase', ('type', 'phase'))
+
+# ACP program log written to the work directory, by job type
+ACP_LOG_FILES = {
+    'acp-export': 'export.log',
+    'acp-import': 'import.log',
+    'file-copy': 'filecopy.log',
+}
 
 
 @dataclass
 class Job:
     id: str
     type: str
+    host: Optional[str] = None
     status: str = 'pending'
     created_at: datetime = field(default_factory=datetime.utcnow)
     finished_at: Optional[datetime] = None
@@ -19,8 +52,16 @@ class Job:
     log: str = ''
     output_files: Dict[str, str] = field(default_factory=dict)
     exit_code: Optional[int] = None
+    reported_exit_code: Optional[int] = None
     severity: str = 'UNKNOWN'
     analysis: Optional[Dict] = None
+    rules_version: Optional[str] = None
+    # [start, end) of the text in log that the analysis was computed from
+    analyzed_span: Optional[Tuple[int, int]] = None
+    timings: JobTimings = field(default_factory=JobTimings)
+    # Fan-out jobs: the parent's child job ids by target, and each child's parent
+    parent_id: Optional[str] = None
+    children: Dict[str, str] = field(default_factory=dict)
 
     @property
     def finished(self) -> bool:
@@ -30,6 +71,7 @@ class Job:
         return {
             'id': self.id,
             'type': self.type,
+            'host': self.host,
             'status': self.status,
             'createdAt': self.created_at.isoformat() + 'Z',
             'finishedAt': self.finished_at.isoformat() + 'Z' if self.finished_at else None,
@@ -37,6 +79,9 @@ class Job:
             'exitCode': self.exit_code,
             'severity': self.severity,
             'analysis': self.analysis,
+            'timings': self.timings.to_dict(self.created_at, self.finished_at),
+            'parentId': self.parent_id,
+            'children': self.children,
         }
 
 
@@ -44,14 +89,63 @@ class JobManager:
     def __init__(self):
         self.jobs: Dict[str, Job] = {}
         self._lock = threading.Lock()
+        self._finish_listeners: List[Callable[[Job], None]] = []
+        self._delete_listeners: List[Callable[[str], None]] = []
         os.makedirs(Config.WORK_DIR, exist_ok=True)
 
-    def create_job(self, job_type: str) -> str:
+    def create_job(self, job_type: str, host: Optional[str] = None) -> str:
         job_id = str(uuid.uuid4())
         with self._lock:
-            self.jobs[job_id] = Job(id=job_id, type=job_type)
+            self.jobs[job_id] = Job(id=job_id, type=job_type, host=host)
         return job_id
 
+    def add_finish_listener(self, listener: Callable[[Job], None]) -> None:
+        """Call listener with each job once it has finished and been persisted"""
+        self._finish_listeners.append(listener)
+
+    def add_delete_listener(self, listener: Callable[[str], None]) -> None:
+        """Call listener with the id of each deleted job; a job deleted while running never finishes"""
+        self._delete_listeners.append(listener)
+
+    def job_counts(self) -> Dict[Tuple[str, str, str], int]:
+        """Number of jobs per (status, type, host)"""
+        counts: Dict[Tuple[str, str, str], int] = {}
+        for job in list(self.jobs.values()):
+            key = (job.status, job.type, job.host or '')
+            counts[key] = counts.get(key, 0) + 1
+        return counts
+
+    def queue_depth(self) -> int:
+        return sum(1 for job in list(self.jobs.values()) if job.status == 'pending')
+
+    def phase_summary(self, job_type: Optional[str] = None) -> Dict[str, Dict[str, Dict]]:
+        """Per job type and phase: count, total, mean, p95 and max milliseconds of finished jobs"""
+        samples: Dict[str, Dict[str, List[float]]] = {}
+        for job in list(self.jobs.values()):
+            if job.finished_at is None or (job_type and job.type != job_type):
+                continue
+            phases = samples.setdefault(job.type, {})
+            for phase, seconds in job.timings.totals().items():
+                phases.setdefault(phase, []).append(seconds * 1000)
+            phases.setdefault('total', []).append(
+                (job.finished_at - job.created_at).total_seconds() * 1000)
+
+        summary: Dict[str, Dict[str, Dict]] = {}
+        for jtype, phases in samples.items():
+            summary[jtype] = {}
+            for phase in list(job_timing.PHASES) + ['total']:
+                values = sorted(phases.get(phase, []))
+                if not values:
+                    continue
+                summary[jtype][phase] = {
+                    'count': len(values),
+                    'totalMs': round(sum(values), 1),
+                    'meanMs': round(sum(values) / len(values), 1),
+                    'p95Ms': round(values[min(len(values) - 1, int(len(values) * 0.95))], 1),
+                    'maxMs': round(values[-1], 1),
+                }
+        return summary
+
     def get_job(self, job_id: str) -> Optional[Job]:
         return self.jobs.get(job_id)
 
@@ -63,11 +157,21 @@ class JobManager:
         os.makedirs(path, exist_ok=True)
         return path
 
+    def get_acp_log_path(self, job_id: str) -> Optional[str]:
+        """Path of the ACP program log for a job, or None for job types without one"""
+        job = self.jobs.get(job_id)
+        if not job or job.type not in ACP_LOG_FILES:
+            return None
+        return os.path.join(Config.WORK_DIR, job_id, ACP_LOG_FILES[job.type])
+
     def append_log(self, job_id: str, text: str) -> None:
         with self._lock:
             job = self.jobs.get(job_id)
             if job:
                 job.log += text
+        if job:
+            LOG_INGESTED.labels(job.type).inc(len(text))
+            log_index.add_text(job_id, job.type, text)
 
     def set_output_files(self, job_id: str, files: Dict[str, str]) -> None:
         with self._lock:
@@ -88,6 +192,12 @@ class JobManager:
             if job_id not in self.jobs:
                 return False
             del self.jobs[job_id]
+        log_index.remove_job(job_id)
+        for listener in self._delete_listeners:
+            try:
+                listener(job_id)
+            except Exception:  # noqa
+                logger.exception(f"Delete listener failed for job {job_id}")
 
         # Clean up work directory
         work_dir = os.path.join(Config.WORK_DIR, job_id)
@@ -100,45 +210,145 @@ class JobManager:
 
         return True
 
-    def start_job(self, job_id: str, target: Callable[[], Dict[str, str]]) -> None:
-        def runner():
-            job = self.jobs[job_id]
-            job.status = 'running'
-            self.append_log(job_id, f'Job {job_id} started\n')
+    @staticmethod
+    def _status_for_exit_code(exit_code: int) -> str:
+        if exit_code == 0:
+            return 'success'
+        elif exit_code == 9:  # Cancelled
+            return 'cancelled'
+        return 'error'
+
+    def reanalyze_job(self, job_id: str) -> bool:
+        """
+        Re-run log analysis for a finished job if its parser rules changed
+        since it was analyzed. Returns True if the job was re-analyzed.
+        """
+        job = self.jobs.get(job_id)
+        # Cancelled jobs count too: new rules can reclassify them
+        if not job or job.finished_at is None or job.analysis is None:
+            return False
+        rules = rule_registry.get(job.type)
+        if job.rules_version == rules.version:
+            return False
+
+        reported = job.reported_exit_code
+        if reported is None:
+            reported = job.exit_code or 0
+        if not job.analyzed_span:
+            return False
+        # The program output the first analysis saw, without JobManager's own lines.
+        # Not the ACP log file: a different input could change the outcome on its own
+        start, end = job.analyzed_span
+        analysis, version = analysis_cache.analyze(job.log[start:end], reported, job.type)
+
+        job.analysis = analysis.to_dict()
+        job.exit_code = analysis.exit_code
+        job.severity = analysis.severity
+        job.summary = ACPLogParser.format_summary(analysis)
+        job.status = self._status_for_exit_code(job.exit_code)
+        job.rules_version = version
+        return True
+
+    def begin_job(self, job_id: str) -> None:
+        """Mark a job as running; pair with complete_job()"""
+        job = self.jobs[job_id]
+        job.timings.add('queued', job.created_at,
+                        (datetime.utcnow() - job.created_at).total_seconds())
+        job.status = 'running'
+        JOBS_STARTED.labels(job.type).inc()
+        self.append_log(job_id, f'Job {job_id} started\n')
+
+    def complete_job(self, job_id: str, result: Optional[Dict] = None,
+                     error: Optional[BaseException] = None, tb: str = '') -> None:
+        """
+        Record the outcome of a job started with begin_job(): a result dict
+        as returned by the ACP/Averify services, or the exception it failed with
+        """
+        job = self.jobs.get(job_id)
+        if not job:
+            return
+        signatures = None
+        if error is None:
             try:
-                result = target()
+                log_start = len(job.log)
                 self.append_log(job_id, result.get('log', ''))
+                job.analyzed_span = result.get('analyzed_span') or (log_start, len(job.log))
                 self.set_output_files(job_id, result.get('output_files', {}))
 
                 # Store exit code, severity, and analysis
                 job.exit_code = result.get('exit_code', 0)
+                job.reported_exit_code = result.get(
+                    'reported_exit_code', job.exit_code)
                 job.severity = result.get('severity', 'UNKNOWN')
                 job.analysis = result.get('analysis')
+                job.rules_version = result.get('rules_version')
+                signatures = result.get('error_signatures')
 
                 # Determine job status based on exit code
-                if job.exit_code == 0:
-                    job.status = 'success'
-                elif job.exit_code == 9:  # Cancelled
-                    job.status = 'cancelled'
-                else:
-                    job.status = 'error'
+                job.status = self._status_for_exit_code(job.exit_code)
 
                 job.summary = result.get('summary', 'Completed')
             except Exception as exc:  # noqa
-                import traceback
-                tb = traceback.format_exc()
-                self.append_log(job_id, f'ERROR: {exc}\n{tb}')
-                job.status = 'error'
-                job.summary = str(exc)
-                job.exit_code = 1
-                job.severity = 'CRITICAL'
-            finally:
-                job.finished_at = datetime.utcnow()
-                self.append_log(
-                    job_id, f'Job {job_id} finished with status {job.status}\n')
-
-        thread = threading.Thread(target=runner, daemon=True)
+                error, tb = exc, traceback.format_exc()
+        if error is not None:
+            self.append_log(job_id, f'ERROR: {error}\n{tb}')
+            job.status = 'error'
+            job.summary = str(error)
+            job.exit_code = 1
+            job.severity = 'CRITICAL'
+
+        persist_started_at = datetime.utcnow()
+        persist_started = time.perf_counter()
+        self.append_log(
+            job_id, f'Job {job_id} finished with status {job.status}\n')
+        log_path = self.get_acp_log_path(job_id)
+        if log_path:
+            log_index.add_file(job_id, job.type, log_path,
+                               source=os.path.basename(log_path))
+        try:
+            error_rollups.record_job(
+                job.type, job.host, persist_started_at,
+                job.status == 'error', signatures)
+        except sqlite3.Error as e:
+            logger.warning(f"Could not record error rollups for job {job_id}: {e}")
+        job.timings.add('persistence', persist_started_at,
+                        time.perf_counter() - persist_started)
+
+        job.finished_at = datetime.utcnow()
+        JOB_DURATION.labels(job.type, job.severity).observe(
+            (job.finished_at - job.created_at).total_seconds())
+        JOB_EXIT_CODES.labels(job.type, job.exit_code).inc()
+        for phase, seconds in job.timings.totals().items():
+            JOB_PHASE_SECONDS.labels(job.type, phase).observe(seconds)
+        for listener in self._finish_listeners:
+            try:
+                listener(job)
+            except Exception:  # noqa
+                logger.exception(f"Finish listener failed for job {job_id}")
+
+    def run_job(self, job_id: str, target: Callable[[], Dict[str, str]]) -> None:
+        """Run target as job_id on the calling thread, from begin to completion"""
+        job = self.jobs[job_id]
+        job_timing.bind(job.timings)
+        try:
+            self.begin_job(job_id)
+            try:
+                result = target()
+            except Exception as exc:  # noqa
+                self.complete_job(job_id, error=exc, tb=traceback.format_exc())
+            else:
+                self.complete_job(job_id, result)
+        finally:
+            job_timing.bind(None)
+
+    def start_job(self, job_id: str, target: Callable[[], Dict[str, str]]) -> None:
+        thread = threading.Thread(target=self.run_job, args=(job_id, target), daemon=True)
         thread.start()
 
 
 job_manager = JobManager()
+
+metrics.gauge_callback('acp_jobs', 'Jobs currently known, by status, type and host',
+                       ('status', 'type', 'host'), job_manager.job_counts)
+metrics.gauge_callback('acp_job_queue_depth', 'Jobs waiting to start', (),
+                       lambda: {(): job_manager.queue_depth()})
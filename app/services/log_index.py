@@ -0,0 +1,265 @@
+"""
+Log Index - Incremental full-text index of job log lines
+
+Job output (fed from JobManager.append_log) and ACP program logs are split
+into lines and stored in an SQLite FTS5 table. Writes go through a single
+background thread that batches inserts, so appending to a job log never
+waits on the index.
+"""
+import html
+import logging
+import os
+import queue
+import re
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_token_re = re.compile(r'\S+')
+
+
+class LogIndex:
+    """Full-text index of job log lines backed by SQLite FTS5"""
+
+    BATCH_SIZE = 500
+    SNIPPET_TOKENS = 16
+    # Around each hit in a snippet; [ and ] would be lost among [INFO]/[ERROR] levels
+    HIT_START = '<mark>'
+    HIT_END = '</mark>'
+    # What FTS5 puts around hits: control characters text logs never contain, so
+    # they survive HTML-escaping the snippet and cannot be mistaken for log text
+    _SNIPPET_START = '\x02'
+    _SNIPPET_END = '\x03'
+
+    def __init__(self, db_path: str, enabled: bool = True):
+        self.db_path = db_path
+        self.enabled = enabled
+        self._queue: 'queue.Queue[Tuple]' = queue.Queue()
+        # Writer-thread state: trailing partial line and next line number per (job, source)
+        self._partial: Dict[Tuple[str, str], str] = {}
+        self._line_numbers: Dict[Tuple[str, str], int] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        # The table is created on first use so importing this module stays cheap
+        self._initialized = False
+        self._init_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    def _init_db(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS log_lines USING fts5(
+                    content,
+                    job_id UNINDEXED,
+                    job_type UNINDEXED,
+                    source UNINDEXED,
+                    line_no UNINDEXED
+                )
+            ''')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _ensure_db(self) -> bool:
+        """Create the index table once; a failure disables the index"""
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    try:
+                        self._init_db()
+                    except sqlite3.Error as e:
+                        logger.warning(f"Log search index disabled: {e}")
+                        self.enabled = False
+                    self._initialized = True
+        return self.enabled
+
+    def _ensure_writer(self) -> bool:
+        if self._thread and self._thread.is_alive():
+            return True
+        if not self._ensure_db():
+            return False
+        with self._start_lock:
+            if not (self._thread and self._thread.is_alive()):
+                self._thread = threading.Thread(target=self._writer, daemon=True)
+                self._thread.start()
+        return True
+
+    def add_text(self, job_id: str, job_type: str, text: str, source: str = 'job') -> None:
+        """Queue a chunk of log output for indexing; chunks need not end on a line break"""
+        if not self.enabled or not text:
+            return
+        if not self._ensure_writer():
+            return
+        self._queue.put(('text', job_id, job_type, source, text))
+
+    def add_file(self, job_id: str, job_type: str, path: str, source: str) -> None:
+        """Queue a complete log file for indexing, replacing any earlier copy of that source"""
+        if not self.enabled:
+            return
+        if not self._ensure_writer():
+            return
+        self._queue.put(('file', job_id, job_type, source, path))
+
+    def remove_job(self, job_id: str) -> None:
+        if not self.enabled:
+            return
+        if not self._ensure_writer():
+            return
+        self._queue.put(('remove', job_id, None, None, None))
+
+    def flush(self, timeout: float = 10.0) -> None:
+        """Block until everything queued so far has been written"""
+        if not self.enabled:
+            return
+        if not self._ensure_writer():
+            return
+        done = threading.Event()
+        self._queue.put(('flush', None, None, None, done))
+        done.wait(timeout)
+
+    def _writer(self):
+        conn = self._connect()
+        while True:
+            items = [self._queue.get()]
+            while len(items) < self.BATCH_SIZE:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            rows: List[Tuple] = []
+            flushed = []
+            try:
+                for kind, job_id, job_type, source, payload in items:
+                    if kind == 'text':
+                        rows.extend(self._split_lines(job_id, job_type, source, payload))
+                    elif kind == 'file':
+                        # Keep row order: earlier text for this batch goes in first
+                        self._write(conn, rows)
+                        rows = []
+                        self._index_file(conn, job_id, job_type, source, payload)
+                    elif kind == 'remove':
+                        self._write(conn, rows)
+                        rows = []
+                        conn.execute('DELETE FROM log_lines WHERE job_id = ?', (job_id,))
+                        for key in [k for k in self._line_numbers if k[0] == job_id]:
+                            self._line_numbers.pop(key, None)
+                            self._partial.pop(key, None)
+                    elif kind == 'flush':
+                        flushed.append(payload)
+                self._write(conn, rows)
+                conn.commit()
+            except Exception as e:  # noqa
+                # Anything that ended this thread would stop indexing and stall every flush()
+                logger.warning(f"Log index write failed: {e}")
+                conn.rollback()
+            for done in flushed:
+                done.set()
+
+    def _split_lines(self, job_id: str, job_type: str, source: str, text: str) -> List[Tuple]:
+        key = (job_id, source)
+        text = self._partial.pop(key, '') + text
+        lines = text.split('\n')
+        if lines[-1]:
+            self._partial[key] = lines[-1]
+        lines = lines[:-1]
+        line_no = self._line_numbers.get(key, 1)
+        rows = []
+        for line in lines:
+            if line.strip():
+                rows.append((line, job_id, job_type, source, line_no))
+            line_no += 1
+        self._line_numbers[key] = line_no
+        return rows
+
+    def _index_file(self, conn: sqlite3.Connection, job_id: str, job_type: str,
+                    source: str, path: str) -> None:
+        try:
+            f = open(path, 'r', encoding='utf-8', errors='ignore')
+        except OSError:
+            # Gone already, e.g. its job was deleted while this was queued
+            return
+        conn.execute('DELETE FROM log_lines WHERE job_id = ? AND source = ?', (job_id, source))
+        batch = []
+        with f:
+            for line_no, line in enumerate(f, 1):
+                line = line.rstrip('\r\n')
+                if not line.strip():
+                    continue
+                batch.append((line, job_id, job_type, source, line_no))
+                if len(batch) >= self.BATCH_SIZE * 10:
+                    self._write(conn, batch)
+                    batch = []
+        self._write(conn, batch)
+
+    @staticmethod
+    def _write(conn: sqlite3.Connection, rows: List[Tuple]) -> None:
+        if rows:
+            conn.executemany(
+                'INSERT INTO log_lines (content, job_id, job_type, source, line_no) '
+                'VALUES (?, ?, ?, ?, ?)', rows)
+
+    @staticmethod
+    def _to_match_query(query: str) -> str:
+        """Quote each whitespace-separated term so log text like ORA-12541 is taken literally"""
+        terms = _token_re.findall(query)
+        return ' '.join('"' + term.replace('"', '""') + '"' for term in terms)
+
+    def search(self, query: str, limit: int = 50, job_id: Optional[str] = None,
+               job_type: Optional[str] = None, raw: bool = False) -> List[Dict]:
+        """
+        Search indexed log lines, best matches first. Terms are ANDed and
+        matched literally unless raw is set, in which case the query is
+        passed through as FTS5 syntax.
+        """
+        if not self.enabled or not self._ensure_db():
+            return []
+        match = query if raw else self._to_match_query(query)
+        if not match:
+            return []
+        sql = (
+            "SELECT job_id, job_type, source, line_no, "
+            f"snippet(log_lines, 0, ?, ?, '...', {self.SNIPPET_TOKENS}) "
+            "FROM log_lines WHERE log_lines MATCH ?"
+        )
+        params: List = [self._SNIPPET_START, self._SNIPPET_END, match]
+        if job_id:
+            sql += ' AND job_id = ?'
+            params.append(job_id)
+        if job_type:
+            sql += ' AND job_type = ?'
+            params.append(job_type)
+        sql += ' ORDER BY rank LIMIT ?'
+        params.append(limit)
+
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+        return [{
+            'jobId': row[0],
+            'jobType': row[1],
+            'source': row[2],
+            'line': row[3],
+            'snippet': self._highlight(row[4]),
+        } for row in rows]
+
+    @classmethod
+    def _highlight(cls, snippet: str) -> str:
+        """HTML-escape a snippet, then mark its hits; ACP logs are full of XML"""
+        return (html.escape(snippet, quote=False)
+                .replace(cls._SNIPPET_START, cls.HIT_START)
+                .replace(cls._SNIPPET_END, cls.HIT_END))
+
+
+log_index = LogIndex(Config.LOG_INDEX_PATH, enabled=Config.LOG_INDEX_ENABLED)
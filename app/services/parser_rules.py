@@ -0,0 +1,209 @@
+"""
+Parser Rules - Named, precompiled rule profiles for ACPLogParser
+
+Each job type gets its own profile so that, for example, Averify output is
+not scanned with the ACP connection/auth/config heuristics. Profiles are
+compiled once when the registry is built and can be extended or overridden
+from a JSON file referenced by Config.PARSER_RULES_FILE.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Pattern, Tuple
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILE = 'acp-export'
+
+CONNECTION_ERROR_PATTERNS = [
+    r'connection\s+(?:failed|refused|timeout)',
+    r'could\s+not\s+connect',
+    r'unable\s+to\s+connect',
+    r'network\s+(?:error|timeout)',
+]
+
+AUTH_ERROR_PATTERNS = [
+    r'authentication\s+failed',
+    r'invalid\s+(?:credentials|username|password)',
+    r'access\s+denied',
+    r'login\s+failed',
+]
+
+CONFIG_ERROR_PATTERNS = [
+    r'(?:invalid|malformed)\s+configuration',
+    r'config\s+(?:error|parse\s+error)',
+    r'invalid\s+xml',
+]
+
+GENERAL_ERROR_PATTERNS = [
+    r'\[(?:error|severe|fatal)\]',
+]
+
+ACP_ITEM_PATTERNS = {
+    'processed': r'(?:processed|completed|exported|imported)\s+(\d+)\s+(?:item|object|record|row)',
+    'failed': r'(?:failed|error)\s+(\d+)\s+(?:item|object|record|row)',
+    'skipped': r'(?:skipped|ignored)\s+(\d+)\s+(?:item|object|record|row)',
+}
+
+
+@dataclass
+class RuleProfile:
+    """
+    A named set of parser rules
+
+    issue_rules lists (exit code, patterns) in order of precedence: when the
+    reported exit code is 0, the first code with any match anywhere in the
+    log wins. item_patterns maps processed/failed/skipped to a regex whose
+    first group is the item count; omitted keys are not extracted.
+    """
+    name: str
+    issue_rules: List[Tuple[int, List[str]]] = field(default_factory=list)
+    item_patterns: Dict[str, str] = field(default_factory=dict)
+
+    def __post_init__(self):
+        self._compile()
+
+    def _compile(self):
+        # All issue patterns are folded into one zero-width alternation, so a
+        # single pass over the log reports every code that matches somewhere.
+        # Zero-width matches never consume text, so an earlier match cannot
+        # hide a higher-precedence one that overlaps it.
+        alternatives = []
+        self._group_codes: Dict[str, int] = {}
+        for index, (code, patterns) in enumerate(self.issue_rules):
+            if not patterns:
+                continue
+            group = f'c{index}'
+            self._group_codes[group] = code
+            alternatives.append(
+                f'(?P<{group}>' + '|'.join(f'(?:{p})' for p in patterns) + ')')
+        try:
+            self.issue_regex: Optional[Pattern] = re.compile(
+                '(?=' + '|'.join(alternatives) + ')', re.IGNORECASE) if alternatives else None
+            self.processed_regex = self._compile_item('processed')
+            self.failed_regex = self._compile_item('failed')
+            self.skipped_regex = self._compile_item('skipped')
+        except re.error as e:
+            raise ValueError(f'Invalid pattern in parser rule profile "{self.name}": {e}')
+        self._precedence = [code for code, patterns in self.issue_rules if patterns]
+
+    def _compile_item(self, key: str) -> Optional[Pattern]:
+        pattern = self.item_patterns.get(key)
+        return re.compile(pattern, re.IGNORECASE) if pattern else None
+
+    @property
+    def has_item_patterns(self) -> bool:
+        return bool(self.processed_regex or self.failed_regex or self.skipped_regex)
+
+    @property
+    def version(self) -> str:
+        """Short digest of the rule definitions, changes whenever a rule does"""
+        payload = json.dumps([self.issue_rules, self.item_patterns], sort_keys=True)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:12]
+
+    def detect_exit_code(self, log_text: str) -> Optional[int]:
+        """Return the highest-precedence exit code implied by log content"""
+        if not self.issue_regex:
+            return None
+        found = set()
+        top = self._precedence[0]
+        for match in self.issue_regex.finditer(log_text):
+            code = self._group_codes[match.lastgroup]
+            if code == top:
+                return code
+            found.add(code)
+        for code in self._precedence:
+            if code in found:
+                return code
+        return None
+
+    def precedence_index(self, code: int) -> int:
+        return self._precedence.index(code)
+
+    @classmethod
+    def from_dict(cls, name: str, data: Dict, base: Optional['RuleProfile'] = None) -> 'RuleProfile':
+        """
+        Build a profile from config, inheriting unspecified rules from base.
+        itemPatterns is merged per key; an empty or null value drops that key
+        """
+        issue_rules = list(base.issue_rules) if base else []
+        if 'issuePatterns' in data:
+            issue_rules = [(int(code), list(patterns))
+                           for code, patterns in data['issuePatterns'].items()]
+        item_patterns = {**(base.item_patterns if base else {}), **(data.get('itemPatterns') or {})}
+        item_patterns = {k: v for k, v in item_patterns.items() if v}
+        return cls(name=name, issue_rules=issue_rules, item_patterns=item_patterns)
+
+
+def _builtin_profiles() -> List[RuleProfile]:
+    acp_issues = [
+        (2, CONNECTION_ERROR_PATTERNS),
+        (3, AUTH_ERROR_PATTERNS),
+        (4, CONFIG_ERROR_PATTERNS),
+        (1, GENERAL_ERROR_PATTERNS),
+    ]
+    return [
+        RuleProfile('acp-export', acp_issues, ACP_ITEM_PATTERNS),
+        RuleProfile('acp-import', acp_issues, ACP_ITEM_PATTERNS),
+        RuleProfile('averify', [(1, GENERAL_ERROR_PATTERNS)]),
+        RuleProfile('file-copy', [
+            (2, CONNECTION_ERROR_PATTERNS),
+            (3, AUTH_ERROR_PATTERNS),
+            (1, GENERAL_ERROR_PATTERNS),
+        ]),
+    ]
+
+
+class RuleRegistry:
+    """Registry of compiled rule profiles, keyed by job type"""
+
+    def __init__(self, rules_file: Optional[str] = None):
+        self._profiles: Dict[str, RuleProfile] = {}
+        self._lock = threading.Lock()
+        for profile in _builtin_profiles():
+            self._profiles[profile.name] = profile
+        if rules_file:
+            self.load_file(rules_file)
+
+    def load_file(self, path: str) -> None:
+        """
+        Load profiles from a JSON file of the form
+        {"<name>": {"extends": "<name>", "issuePatterns": {"2": [...]}, "itemPatterns": {...}}}
+        """
+        if not os.path.exists(path):
+            logger.warning(f"Parser rules file not found: {path}")
+            return
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self.load_dict(data)
+
+    def load_dict(self, data: Dict[str, Dict]) -> None:
+        # Compile everything before swapping any profile in
+        profiles = {}
+        for name, spec in data.items():
+            base_name = spec.get('extends', name)
+            base = profiles.get(base_name) or self._profiles.get(base_name)
+            if base is None and 'extends' in spec:
+                raise ValueError(f'Parser rule profile "{name}" extends unknown profile "{base_name}"')
+            profiles[name] = RuleProfile.from_dict(name, spec, base)
+        with self._lock:
+            self._profiles.update(profiles)
+
+    def get(self, name: Optional[str] = None) -> RuleProfile:
+        """Return the named profile (the default ACP rules for None); raises KeyError if unknown"""
+        profile = self._profiles.get(name or DEFAULT_PROFILE)
+        if profile is None:
+            raise KeyError(f"Unknown parser rule profile: {name} (known: {', '.join(self.names())})")
+        return profile
+
+    def names(self) -> List[str]:
+        return sorted(self._profiles)
+
+
+rule_registry = RuleRegistry(Config.PARSER_RULES_FILE)
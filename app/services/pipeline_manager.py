@@ -0,0 +1,289 @@
+"""
+Pipeline Manager - Run a DAG of jobs, each step as soon as its dependencies succeed
+
+A pipeline is a list of steps. Each step is the JSON body its endpoint
+takes (acp/export, acp/import or averify/run), plus an id, a job type and
+the ids of the steps it depends on:
+
+    {
+      "defaults": {"mode": "local"},
+      "steps": [
+        {"id": "export", "type": "acp-export", "host": "acp-dev", "sourceEnv": "DEV",
+         "productLine": "PL1", "xmlConfig": "/path/config.xml"},
+        {"id": "import", "type": "acp-import", "dependsOn": ["export"], "host": "acp-qa",
+         "targetEnv": "QA", "xmlConfig": "/path/config.xml"},
+        {"id": "verify", "type": "averify", "dependsOn": ["import"], "host": "acp-qa",
+         "sourceEnv": "DEV", "targetEnv": "QA"}
+      ]
+    }
+
+Steps are started from JobManager's finish listener, on the thread that
+finished the last dependency, so there is no polling gap between stages.
+An import without exportBundle takes the bundle from the output files of
+its export dependency (or the step named by bundleFrom). The path is
+passed by reference, with no upload round trip. When a step fails, or its
+job is deleted, every step downstream of it is skipped; independent
+branches carry on.
+"""
+import logging
+import threading
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from app.services.job_launcher import job_launcher
+from app.services.job_manager import Job, job_manager
+
+logger = logging.getLogger(__name__)
+
+STEP_KEYS = ('id', 'type', 'dependsOn', 'bundleFrom')
+
+
+@dataclass
+class PipelineStep:
+    id: str
+    type: str
+    body: Dict
+    depends_on: List[str] = field(default_factory=list)
+    bundle_from: Optional[str] = None
+    status: str = 'waiting'
+    job_id: Optional[str] = None
+    error: Optional[str] = None
+    started_at: Optional[datetime] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in {'success', 'error', 'skipped'}
+
+    def to_dict(self) -> Dict:
+        return {
+            'id': self.id,
+            'type': self.type,
+            'dependsOn': self.depends_on,
+            'status': self.status,
+            'jobId': self.job_id,
+            'error': self.error,
+            'startedAt': self.started_at.isoformat() + 'Z' if self.started_at else None,
+        }
+
+
+@dataclass
+class Pipeline:
+    id: str
+    steps: Dict[str, PipelineStep]
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+
+    @property
+    def status(self) -> str:
+        if any(not step.done for step in self.steps.values()):
+            return 'running'
+        if all(step.status == 'success' for step in self.steps.values()):
+            return 'success'
+        return 'error'
+
+    def to_dict(self) -> Dict:
+        return {
+            'id': self.id,
+            'status': self.status,
+            'createdAt': self.created_at.isoformat() + 'Z',
+            'finishedAt': self.finished_at.isoformat() + 'Z' if self.finished_at else None,
+            'steps': [step.to_dict() for step in self.steps.values()],
+        }
+
+
+def _bundle_path(job: Job) -> Optional[str]:
+    """The export bundle among a job's output files, preferring a zip"""
+    paths = list(job.output_files.values())
+    zips = [p for p in paths if p.lower().endswith('.zip')]
+    return (zips or paths or [None])[0]
+
+
+class PipelineManager:
+    def __init__(self):
+        self.pipelines: Dict[str, Pipeline] = {}
+        # job id -> (pipeline id, step id) of each running step it serves
+        self._steps_by_job: Dict[str, List[Tuple[str, str]]] = {}
+        self._lock = threading.Lock()
+        job_manager.add_finish_listener(self._on_job_finished)
+        job_manager.add_delete_listener(self._on_job_deleted)
+
+    @staticmethod
+    def parse(spec: Dict) -> Dict[str, PipelineStep]:
+        """Build and check the steps of a pipeline spec; raises ValueError"""
+        defaults = spec.get('defaults') or {}
+        raw_steps = spec.get('steps')
+        if not isinstance(raw_steps, list) or not raw_steps:
+            raise ValueError('steps must be a non-empty list')
+
+        steps: Dict[str, PipelineStep] = {}
+        for i, raw in enumerate(raw_steps):
+            if not isinstance(raw, dict):
+                raise ValueError(f'step {i + 1} must be an object')
+            step_id = str(raw.get('id') or f'step{i + 1}')
+            if step_id in steps:
+                raise ValueError(f'Duplicate step id: {step_id}')
+            body = dict(defaults)
+            body.update({k: v for k, v in raw.items() if k not in STEP_KEYS})
+            steps[step_id] = PipelineStep(
+                id=step_id,
+                type=raw.get('type', ''),
+                body=body,
+                depends_on=[str(d) for d in raw.get('dependsOn', [])],
+                bundle_from=raw.get('bundleFrom'),
+            )
+
+        for step in steps.values():
+            for dep in step.depends_on:
+                if dep not in steps:
+                    raise ValueError(f'Step {step.id} depends on unknown step {dep}')
+            body = step.body
+            if step.type == 'acp-import' and not body.get('exportBundle'):
+                source = step.bundle_from or next(
+                    (d for d in step.depends_on if steps[d].type == 'acp-export'), None)
+                if source not in step.depends_on or steps[source].type != 'acp-export':
+                    raise ValueError(f'Step {step.id} needs exportBundle or an acp-export dependency')
+                step.bundle_from = source
+                # Stands in for the bundle path, which is only known once the export finishes
+                body = dict(body, exportBundle=f'<{source}>')
+            try:
+                job_launcher.validate(step.type, body)
+            except ValueError as e:
+                raise ValueError(f'Step {step.id}: {e}')
+
+        # Kahn's algorithm: anything left over is on a cycle
+        remaining = {step.id: set(step.depends_on) for step in steps.values()}
+        while True:
+            ready = [step_id for step_id, deps in remaining.items() if not deps]
+            if not ready:
+                break
+            for step_id in ready:
+                del remaining[step_id]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        if remaining:
+            raise ValueError(f"Dependency cycle between steps: {', '.join(sorted(remaining))}")
+        return steps
+
+    def submit(self, spec: Dict) -> Pipeline:
+        """Create a pipeline and start the steps that have no dependencies"""
+        pipeline = Pipeline(id=str(uuid.uuid4()), steps=self.parse(spec))
+        with self._lock:
+            self.pipelines[pipeline.id] = pipeline
+        self._advance(pipeline)
+        return pipeline
+
+    def get(self, pipeline_id: str) -> Optional[Pipeline]:
+        return self.pipelines.get(pipeline_id)
+
+    def list_pipelines(self) -> List[Pipeline]:
+        return list(self.pipelines.values())
+
+    def _on_job_finished(self, job: Job) -> None:
+        advance = []
+        with self._lock:
+            # Coalesced exports can make one job serve steps of several pipelines
+            for pipeline_id, step_id in self._steps_by_job.pop(job.id, []):
+                pipeline = self.pipelines.get(pipeline_id)
+                if pipeline is None:
+                    continue
+                self._record(pipeline.steps[step_id], job)
+                advance.append(pipeline)
+        for pipeline in advance:
+            self._advance(pipeline)
+
+    def _on_job_deleted(self, job_id: str) -> None:
+        # A deleted job never finishes, so fail its steps here
+        advance = []
+        with self._lock:
+            for pipeline_id, step_id in self._steps_by_job.pop(job_id, []):
+                pipeline = self.pipelines.get(pipeline_id)
+                if pipeline is None:
+                    continue
+                step = pipeline.steps[step_id]
+                step.status = 'error'
+                step.error = f'Job {job_id} was deleted'
+                advance.append(pipeline)
+        for pipeline in advance:
+            self._advance(pipeline)
+
+    @staticmethod
+    def _record(step: PipelineStep, job: Job) -> None:
+        step.status = 'success' if job.status == 'success' else 'error'
+        if step.status == 'error':
+            step.error = f'Job finished with status {job.status} (exit code {job.exit_code})'
+
+    def _advance(self, pipeline: Pipeline) -> None:
+        """
+        Skip steps behind a failure and start every step whose dependencies
+        all succeeded. Call without the lock held: starting a step can
+        finish its job at once (a cache hit, a failed start), which runs
+        _on_job_finished on this thread
+        """
+        while True:
+            with self._lock:
+                ready = self._ready_steps(pipeline)
+                if not ready:
+                    if pipeline.finished_at is None and pipeline.status != 'running':
+                        pipeline.finished_at = datetime.utcnow()
+                    return
+            for step in ready:
+                self._start_step(pipeline, step)
+
+    @staticmethod
+    def _ready_steps(pipeline: Pipeline) -> List[PipelineStep]:
+        """Mark steps behind a failure skipped and claim the startable ones; call with the lock held"""
+        steps = pipeline.steps
+        ready = []
+        progressed = True
+        while progressed:
+            progressed = False
+            for step in steps.values():
+                if step.status != 'waiting':
+                    continue
+                deps = [steps[d] for d in step.depends_on]
+                failed = next((d for d in deps if d.status in {'error', 'skipped'}), None)
+                if failed:
+                    step.status = 'skipped'
+                    step.error = f'Dependency {failed.id} did not succeed'
+                    progressed = True
+                elif all(d.status == 'success' for d in deps):
+                    # Running from here on, so no other thread starts it too
+                    step.status = 'running'
+                    step.started_at = datetime.utcnow()
+                    ready.append(step)
+        return ready
+
+    def _start_step(self, pipeline: Pipeline, step: PipelineStep) -> None:
+        body = step.body
+        try:
+            if step.bundle_from:
+                export_job = job_manager.get_job(pipeline.steps[step.bundle_from].job_id)
+                bundle = _bundle_path(export_job) if export_job else None
+                if not bundle:
+                    raise ValueError(f'Step {step.bundle_from} produced no export bundle')
+                body = dict(body, exportBundle=bundle)
+            job_id = job_launcher.start(step.type, body)
+        except Exception as e:  # noqa
+            logger.warning(f"Pipeline {pipeline.id} step {step.id} could not start: {e}")
+            with self._lock:
+                step.status = 'error'
+                step.error = str(e)
+            return
+        with self._lock:
+            step.job_id = job_id
+            job = job_manager.get_job(job_id)
+            if job is None:
+                # Deleted before it could be registered
+                step.status = 'error'
+                step.error = f'Job {job_id} was deleted'
+                return
+            if job.finished_at is not None:
+                # Finished before it could be registered; its listeners have run
+                self._record(step, job)
+                return
+            self._steps_by_job.setdefault(job_id, []).append((pipeline.id, step.id))
+
+
+pipeline_manager = PipelineManager()
@@ -0,0 +1,223 @@
+"""
+Resource Scheduler - Start jobs when the environments and hosts they use are free
+
+Every export, import, Averify and file copy job claims the resources it
+touches before it starts:
+
+- env:<tag> for each environment it reads or writes. Writers (imports and
+  file copies into targetEnv) hold it exclusively. Readers (exports from
+  sourceEnv, Averify on both) share it, up to SCHEDULER_MAX_READERS_PER_ENV
+  at once. So two imports into one target never overlap, and nothing
+  exports from an environment while an import is writing to it.
+- host:<name> for the ACP host it runs on, up to SCHEDULER_MAX_PER_HOST
+  jobs at once.
+
+A job whose claims all fit starts at once. Otherwise it stays pending in
+one FIFO queue and the claims it is waiting on are blocked for every job
+queued after it. Each resource is thereby handed out in submission order,
+and a stream of readers cannot starve a waiting import. Jobs that share
+no blocked resource are not held up, so independent targets run fully in
+parallel. Claims are released when the job finishes or is deleted.
+
+Time spent waiting shows up as the job's queued phase.
+"""
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, List, Tuple
+
+from config import Config
+from app.services.job_manager import Job, job_manager
+from app.utils.metrics import metrics
+
+SCHEDULER_WAIT = metrics.histogram(
+    'acp_scheduler_wait_seconds', 'Time jobs waited for their resources before starting', ('type',))
+
+# Body fields naming the environments each job type writes to and reads from
+ENV_ACCESS = {
+    'acp-export': ((), ('sourceEnv',)),
+    'acp-import': (('targetEnv',), ()),
+    'averify': ((), ('sourceEnv', 'targetEnv')),
+    'file-copy': (('targetEnv',), ()),
+}
+
+
+@dataclass(frozen=True)
+class Claim:
+    key: str
+    exclusive: bool = False
+
+    def __str__(self) -> str:
+        return f"{self.key} ({'exclusive' if self.exclusive else 'shared'})"
+
+
+@dataclass
+class Ticket:
+    job_id: str
+    claims: Tuple[Claim, ...]
+    start: Callable[[], None]
+    queued_at: float
+
+
+def resource_claims(job_type: str, body: Dict) -> List[Claim]:
+    """The claims a job of this type needs for body; exclusive wins when a key appears twice"""
+    claims: Dict[str, bool] = {}
+    writes, reads = ENV_ACCESS.get(job_type, ((), ()))
+    for name in reads:
+        if body.get(name):
+            claims.setdefault(f'env:{body[name]}', False)
+    for name in writes:
+        if body.get(name):
+            claims[f'env:{body[name]}'] = True
+    if body.get('host'):
+        claims.setdefault(f"host:{body['host']}", False)
+    return [Claim(key, exclusive) for key, exclusive in claims.items()]
+
+
+class ResourceScheduler:
+    def __init__(self, max_per_host: int, max_readers_per_env: int):
+        # 0 means no limit
+        self.max_per_host = max(max_per_host, 0)
+        self.max_readers_per_env = max(max_readers_per_env, 0)
+        self._queue: Deque[Ticket] = deque()
+        self._running: Dict[str, Ticket] = {}
+        # resource key -> {job id: exclusive} of the jobs holding it
+        self._holders: Dict[str, Dict[str, bool]] = {}
+        self._lock = threading.Lock()
+        job_manager.add_finish_listener(self._on_job_finished)
+        job_manager.add_delete_listener(self._on_job_deleted)
+
+    def _limit(self, key: str) -> int:
+        return self.max_per_host if key.startswith('host:') else self.max_readers_per_env
+
+    def _fits(self, claim: Claim) -> bool:
+        holders = self._holders.get(claim.key, {})
+        if claim.exclusive:
+            return not holders
+        if any(holders.values()):
+            return False
+        limit = self._limit(claim.key)
+        return not limit or len(holders) < limit
+
+    def submit(self, job_id: str, claims: List[Claim], start: Callable[[], None]) -> None:
+        """Call start once job_id holds all its claims: now if they are free, else when they are released"""
+        if not claims:
+            self._start([Ticket(job_id, (), start, time.time())])
+            return
+        ticket = Ticket(job_id, tuple(claims), start, time.time())
+        with self._lock:
+            self._queue.append(ticket)
+            ready = self._take_ready()
+            waiting = [] if ticket.job_id in self._running else self._waiting_on(ticket)
+        if waiting:
+            job_manager.append_log(job_id, f"Waiting for {', '.join(waiting)}\n")
+        self._start(ready)
+
+    def _take_ready(self) -> List[Ticket]:
+        """Dequeue every ticket whose claims fit now, oldest first; call with the lock held"""
+        ready = []
+        blocked = set()
+        for ticket in list(self._queue):
+            if any(c.key in blocked for c in ticket.claims) or not all(self._fits(c) for c in ticket.claims):
+                # Hold what it is waiting on for it, so later tickets cannot overtake it there
+                blocked.update(c.key for c in ticket.claims if c.key in blocked or not self._fits(c))
+                continue
+            self._queue.remove(ticket)
+            for claim in ticket.claims:
+                self._holders.setdefault(claim.key, {})[ticket.job_id] = claim.exclusive
+            self._running[ticket.job_id] = ticket
+            ready.append(ticket)
+        return ready
+
+    def _waiting_on(self, ticket: Ticket) -> List[str]:
+        """What a queued ticket is waiting for, as _take_ready() sees it; call with the lock held"""
+        # resource key -> the first job queued ahead of ticket that is waiting on it
+        blocked: Dict[str, str] = {}
+        for queued in self._queue:
+            if queued is ticket:
+                break
+            for claim in queued.claims:
+                if claim.key in blocked or not self._fits(claim):
+                    blocked.setdefault(claim.key, queued.job_id)
+        waiting = []
+        for claim in ticket.claims:
+            if not self._fits(claim):
+                holders = ', '.join(sorted(self._holders.get(claim.key, {})))
+                waiting.append(f'{claim.key} (held by {holders})')
+            elif claim.key in blocked:
+                waiting.append(f'{claim.key} (queued behind {blocked[claim.key]})')
+        return waiting
+
+    def _start(self, tickets: List[Ticket]) -> None:
+        for ticket in tickets:
+            job = job_manager.get_job(ticket.job_id)
+            if job is None:
+                # Deleted while it waited; nothing will finish it, so release it here
+                self._release(ticket.job_id)
+                continue
+            SCHEDULER_WAIT.labels(job.type).observe(time.time() - ticket.queued_at)
+            try:
+                ticket.start()
+            except Exception as e:  # noqa
+                # complete_job runs the finish listener, which releases the claims
+                job_manager.complete_job(ticket.job_id, error=e)
+
+    def _release(self, job_id: str) -> None:
+        with self._lock:
+            ticket = self._running.pop(job_id, None)
+            if ticket is None:
+                return
+            for claim in ticket.claims:
+                holders = self._holders.get(claim.key, {})
+                holders.pop(job_id, None)
+                if not holders:
+                    self._holders.pop(claim.key, None)
+            ready = self._take_ready()
+        self._start(ready)
+
+    def _forget(self, job_id: str) -> None:
+        """Drop a job from the queue, or release its claims if it holds them"""
+        with self._lock:
+            for ticket in list(self._queue):
+                if ticket.job_id == job_id:
+                    self._queue.remove(ticket)
+        self._release(job_id)
+
+    def _on_job_finished(self, job: Job) -> None:
+        # complete_job() may also be called on a job that never left the queue
+        self._forget(job.id)
+
+    def _on_job_deleted(self, job_id: str) -> None:
+        # A deleted job is never completed, so this is the only release it gets
+        self._forget(job_id)
+
+    def snapshot(self) -> Dict:
+        """Running and queued jobs with their claims, and what each queued job is waiting for"""
+        now = time.time()
+        with self._lock:
+            return {
+                'limits': {'maxPerHost': self.max_per_host,
+                           'maxReadersPerEnv': self.max_readers_per_env},
+                'running': [{
+                    'jobId': t.job_id,
+                    'claims': [str(c) for c in t.claims],
+                } for t in self._running.values()],
+                'queued': [{
+                    'jobId': t.job_id,
+                    'claims': [str(c) for c in t.claims],
+                    'waitingFor': self._waiting_on(t),
+                    'waitingSeconds': round(now - t.queued_at, 1),
+                } for t in self._queue],
+            }
+
+    def job_counts(self) -> Dict[Tuple[str], int]:
+        with self._lock:
+            return {('queued',): len(self._queue), ('running',): len(self._running)}
+
+
+resource_scheduler = ResourceScheduler(Config.SCHEDULER_MAX_PER_HOST,
+                                       Config.SCHEDULER_MAX_READERS_PER_ENV)
+
+metrics.gauge_callback('acp_scheduler_jobs', 'Jobs holding or waiting for resources, by state',
+                       ('state',), resource_scheduler.job_counts)
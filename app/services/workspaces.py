@@ -0,0 +1,140 @@
+"""
+Workspaces - Private per-job clones of shared ACP project directories
+
+An environment's acp_project_dir holds the ACP install and project files
+that every export for it uses. Running jobs in it directly means
+concurrent exports overwrite each other's config.xml and outputs. Instead,
+each job gets a clone of the project in its own work directory:
+
+- files matching WORKSPACE_COPY_PATTERNS (configuration the program may
+  rewrite) are copied
+- files matching WORKSPACE_SKIP_PATTERNS (bundles and logs left by earlier
+  runs) are left out, so they are not mistaken for this job's outputs
+- everything else (jars, libraries, scripts) is hard-linked, which costs
+  one directory entry per file and no data
+- symlinks are recreated as they are
+
+The job's config.xml is written into the clone, and its outputs are
+written there too. Output discovery skips the cloned entries (created()),
+so a project's own XML files are never reported as outputs. When the job
+finishes, the cloned entries are removed again. Outputs and logs the run
+created stay with the job.
+"""
+import fnmatch
+import logging
+import os
+import shutil
+import threading
+from typing import Dict, List, Sequence, Tuple
+
+from config import Config
+from app.services.job_manager import Job, job_manager
+from app.utils.files import link_or_copy
+
+logger = logging.getLogger(__name__)
+
+
+def _patterns(value: str) -> List[str]:
+    return [p.strip() for p in value.split(',') if p.strip()]
+
+
+class WorkspaceManager:
+    def __init__(self, copy_patterns: Sequence[str], skip_patterns: Sequence[str]):
+        self.copy_patterns = list(copy_patterns)
+        self.skip_patterns = list(skip_patterns)
+        # job id -> (workspace dir, paths the clone created, relative to it)
+        self._clones: Dict[str, Tuple[str, List[str]]] = {}
+        self._lock = threading.Lock()
+        job_manager.add_finish_listener(self._on_job_finished)
+
+    @staticmethod
+    def _matches(name: str, patterns: Sequence[str]) -> bool:
+        return any(fnmatch.fnmatch(name, p) for p in patterns)
+
+    def create(self, job_id: str, project_dir: str, workspace: str, config_path: str) -> str:
+        """
+        Clone project_dir into workspace and write config_path there as
+        config.xml; returns the path of that config.xml
+        """
+        created: List[str] = []
+        linked = copied = 0
+        for root, dirs, files in os.walk(project_dir):
+            rel_root = os.path.relpath(root, project_dir)
+            target_root = workspace if rel_root == '.' else os.path.join(workspace, rel_root)
+            for name in list(dirs):
+                src = os.path.join(root, name)
+                dst = os.path.join(target_root, name)
+                if os.path.islink(src):
+                    # os.walk does not descend into directory symlinks; recreate them as links
+                    os.symlink(os.readlink(src), dst)
+                    created.append(os.path.relpath(dst, workspace))
+                    dirs.remove(name)
+                else:
+                    os.makedirs(dst, exist_ok=True)
+                    created.append(os.path.relpath(dst, workspace))
+            for name in files:
+                # The job's own config.xml replaces the project's
+                if self._matches(name, self.skip_patterns) or (rel_root == '.' and name == 'config.xml'):
+                    continue
+                src = os.path.join(root, name)
+                dst = os.path.join(target_root, name)
+                if os.path.islink(src):
+                    os.symlink(os.readlink(src), dst)
+                elif self._matches(name, self.copy_patterns):
+                    shutil.copy2(src, dst)
+                    copied += 1
+                else:
+                    link_or_copy(src, dst)
+                    linked += 1
+                created.append(os.path.relpath(dst, workspace))
+
+        config_dest = os.path.join(workspace, 'config.xml')
+        if os.path.exists(config_path):
+            shutil.copy2(config_path, config_dest)
+        created.append('config.xml')
+        with self._lock:
+            self._clones[job_id] = (workspace, created)
+        job_manager.append_log(
+            job_id, f'Workspace cloned from {project_dir}: {linked} files linked, {copied} copied\n')
+        return config_dest
+
+    def created(self, job_id: str) -> List[str]:
+        """Absolute paths of the entries create() put in a job's workspace"""
+        with self._lock:
+            workspace, created = self._clones.get(job_id, ('', []))
+        return [os.path.join(workspace, rel) for rel in created]
+
+    def cleanup(self, job_id: str, keep: Sequence[str] = ()) -> None:
+        """
+        Remove what create() cloned into the job's workspace. Files the run
+        created, and any path in keep (the job's reported outputs), stay
+        """
+        with self._lock:
+            clone = self._clones.pop(job_id, None)
+        if clone is None:
+            return
+        workspace, created = clone
+        keep = {os.path.abspath(p) for p in keep}
+        # Deepest paths first, so directories are empty by the time they are reached
+        for rel in sorted(created, key=lambda p: p.count(os.sep), reverse=True):
+            path = os.path.join(workspace, rel)
+            if os.path.abspath(path) in keep:
+                continue
+            try:
+                if os.path.isdir(path) and not os.path.islink(path):
+                    os.rmdir(path)
+                else:
+                    os.remove(path)
+            except OSError:
+                # A directory the run wrote into, or something already gone
+                pass
+
+    def _on_job_finished(self, job: Job) -> None:
+        if job.id in self._clones:
+            self.cleanup(job.id, keep=list(job.output_files.values()))
+
+
+workspace_manager = WorkspaceManager(
+    _patterns(Config.WORKSPACE_COPY_PATTERNS),
+    _patterns(Config.WORKSPACE_SKIP_PATTERNS),
+)
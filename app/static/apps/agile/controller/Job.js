@@ -30,7 +30,33 @@ Ext.define("AgileAcpt.controller.Job", {
     var jobId = selection.get("id");
     var filename = prompt("Enter filename to download:");
     if (filename) {
-      window.open("/api/jobs/" + jobId + "/download?filename=" + encodeURIComponent(filename));
+      // window.open cannot send the Authorization header; fetch and save a blob instead
+      fetch("/api/jobs/" + jobId + "/download?filename=" + encodeURIComponent(filename), {
+        headers: {
+          Authorization: "Bearer " + localStorage.getItem("jwt"),
+        },
+      })
+        .then(function (response) {
+          if (!response.ok) {
+            return response.json().then(function (body) {
+              throw new Error(body.error || response.statusText);
+            });
+          }
+          return response.blob();
+        })
+        .then(function (blob) {
+          var url = window.URL.createObjectURL(blob);
+          var a = document.createElement("a");
+          a.href = url;
+          a.download = filename;
+          document.body.appendChild(a);
+          a.click();
+          window.URL.revokeObjectURL(url);
+          document.body.removeChild(a);
+        })
+        .catch(function (err) {
+          Ext.Msg.alert("Error", "Download failed: " + err.message);
+        });
     }
   },
 
@@ -89,7 +89,7 @@ Ext.define("AgileAcpt.view.filecopy.FileCopyPanel", {
             url: "/api/jobs/filecopy/run",
             method: "POST",
             headers: {
-              Authorization: "Bearer" + localStorage.getItem("jwt"),
+              Authorization: "Bearer " + localStorage.getItem("jwt"),
               "Content-Type": "application/json",
             },
             jsonData: requestData,
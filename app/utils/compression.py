@@ -0,0 +1,144 @@
+"""
+Response compression negotiated from Accept-Encoding
+
+JSON and text responses above a size threshold are gzip- or, when the
+optional brotli package is installed, brotli-compressed. Streamed
+responses are compressed chunk by chunk with a flush after every chunk,
+so clients still see output as it is produced. Server-sent events and
+file responses (send_file) are left alone.
+"""
+import zlib
+from typing import Iterable, Iterator, List, Optional
+
+from flask import Flask, request
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+COMPRESSIBLE_TYPES = {
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml',
+}
+
+
+def available_encodings() -> List[str]:
+    """Encodings this server can produce, most preferred first"""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def negotiate_encoding(accept_encoding: Optional[str],
+                       supported: Optional[List[str]] = None) -> Optional[str]:
+    """Pick the best supported encoding for an Accept-Encoding header, or None"""
+    supported = supported if supported is not None else available_encodings()
+    if not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    best, best_q = None, 0.0
+    for encoding in supported:
+        q = weights.get(encoding, weights.get('*', 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def is_compressible(mimetype: Optional[str]) -> bool:
+    if not mimetype or mimetype == 'text/event-stream':
+        return False
+    return mimetype.startswith('text/') or mimetype in COMPRESSIBLE_TYPES
+
+
+class StreamCompressor:
+    """Incremental gzip/brotli encoder that flushes after every chunk"""
+
+    def __init__(self, encoding: str, gzip_level: int = 6, brotli_quality: int = 4):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+        else:
+            # wbits=31 writes a gzip header and trailer
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == 'br':
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == 'br':
+            return self._brotli.finish()
+        return self._zlib.flush()
+
+
+def compress_bytes(data: bytes, encoding: str, gzip_level: int = 6,
+                   brotli_quality: int = 4) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=brotli_quality)
+    compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _compress_stream(chunks: Iterable[bytes], source, compressor: StreamCompressor) -> Iterator[bytes]:
+    try:
+        for chunk in chunks:
+            if chunk:
+                data = compressor.compress(chunk)
+                if data:
+                    yield data
+        yield compressor.finish()
+    finally:
+        close = getattr(source, 'close', None)
+        if close:
+            close()
+
+
+def init_compression(app: Flask) -> None:
+    """Compress eligible responses according to COMPRESSION_* settings"""
+    min_bytes = app.config['COMPRESSION_MIN_BYTES']
+    gzip_level = app.config['COMPRESSION_GZIP_LEVEL']
+    brotli_quality = app.config['COMPRESSION_BROTLI_QUALITY']
+
+    @app.after_request
+    def compress_response(response):
+        if (request.method == 'HEAD'
+                or not 200 <= response.status_code < 300 or response.status_code in (204, 206)
+                or response.direct_passthrough
+                or 'Content-Encoding' in response.headers
+                or 'no-transform' in response.headers.get('Cache-Control', '')
+                or not is_compressible(response.mimetype)):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = negotiate_encoding(request.headers.get('Accept-Encoding'))
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            source = response.response
+            compressor = StreamCompressor(encoding, gzip_level, brotli_quality)
+            response.response = _compress_stream(response.iter_encoded(), source, compressor)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < min_bytes:
+                return response
+            response.set_data(compress_bytes(data, encoding, gzip_level, brotli_quality))
+
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(f'{etag}-{encoding}', weak)
+        return response
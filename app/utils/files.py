@@ -0,0 +1,18 @@
+import os
+import shutil
+
+
+def link_or_copy(src: str, dst: str) -> None:
+    """
+    Place src at dst as a hard link, so staging a large bundle into a work
+    directory costs no I/O. Falls back to a copy across filesystems or
+    where links are not supported.
+    """
+    if os.path.abspath(src) == os.path.abspath(dst):
+        return
+    if os.path.lexists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
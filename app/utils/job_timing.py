@@ -0,0 +1,98 @@
+"""
+Job Timing - Wall-clock spans for the lifecycle phases of a job
+
+The job runner binds a JobTimings to its worker thread, so services can
+wrap staging, SSH connect, exec, log parsing and output discovery in
+phase('...') without holding a reference to the job. Outside a bound
+thread phase() does nothing.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+PHASES = (
+    'queued',            # submitted, waiting for the runner thread
+    'staging',           # copying config XML and bundles into the work directory
+    'ssh_connect',       # SSH connect and authentication
+    'exec',              # the acp/averify command itself, local or remote
+    'log_parse',         # analysing the command log
+    'output_discovery',  # globbing the work directory for bundles
+    'persistence',       # storing results, indexing logs, error rollups
+)
+
+_local = threading.local()
+
+
+class Span:
+    __slots__ = ('phase', 'started_at', 'seconds')
+
+    def __init__(self, phase: str, started_at: datetime, seconds: float):
+        self.phase = phase
+        self.started_at = started_at
+        self.seconds = seconds
+
+
+class JobTimings:
+    """Spans recorded for one job, in the order they finished"""
+
+    def __init__(self):
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def add(self, phase: str, started_at: datetime, seconds: float) -> None:
+        with self._lock:
+            self.spans.append(Span(phase, started_at, max(seconds, 0.0)))
+
+    def totals(self) -> Dict[str, float]:
+        """Seconds per phase, summed over repeated spans"""
+        totals: Dict[str, float] = {}
+        with self._lock:
+            for span in self.spans:
+                totals[span.phase] = totals.get(span.phase, 0.0) + span.seconds
+        return totals
+
+    def to_dict(self, origin: datetime, finished_at: Optional[datetime] = None) -> Dict:
+        """Spans as offsets from origin (job creation), plus per-phase totals"""
+        with self._lock:
+            spans = list(self.spans)
+        totals = self.totals()
+        result = {
+            'spans': [{
+                'phase': span.phase,
+                'offsetMs': round((span.started_at - origin).total_seconds() * 1000, 1),
+                'durationMs': round(span.seconds * 1000, 1),
+            } for span in spans],
+            'totalsMs': {phase: round(seconds * 1000, 1) for phase, seconds in totals.items()},
+        }
+        if finished_at:
+            wall = (finished_at - origin).total_seconds()
+            # Wall-clock time not covered by any recorded phase
+            result['unaccountedMs'] = round(max(wall - sum(totals.values()), 0.0) * 1000, 1)
+        return result
+
+
+def bind(timings: Optional[JobTimings]) -> None:
+    """Make phase() record into timings for the current thread (None unbinds)"""
+    _local.timings = timings
+
+
+def current() -> Optional[JobTimings]:
+    return getattr(_local, 'timings', None)
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Record the enclosed block as a span of the current thread's job"""
+    timings = current()
+    if timings is None:
+        yield
+        return
+    started_at = datetime.utcnow()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, started_at, time.perf_counter() - started)
+
@@ -0,0 +1,239 @@
+"""
+Profiling - On-demand cProfile and stack sampling of a running worker
+
+Two kinds of session, started from the admin API:
+
+- requests: the next N matching requests run under cProfile, one at a time,
+  while a sampler thread records their stacks. Downloadable as a pstats
+  dump, a text report or collapsed stacks.
+- sample: every thread in the worker is stack-sampled for a number of
+  seconds. Downloadable as collapsed stacks.
+
+Collapsed stacks are the "frame;frame;frame count" lines understood by
+flamegraph.pl, speedscope and most other flame graph viewers.
+"""
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from flask import Flask, g, request
+
+MODES = ('requests', 'sample')
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    name = getattr(code, 'co_qualname', code.co_name)
+    return f'{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+def _collapse(frame, thread_name: str) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.append(thread_name)
+    return ';'.join(reversed(labels))
+
+
+class ProfileSession:
+    """One profiling run and its results"""
+
+    def __init__(self, mode: str, requests: int = 0, seconds: float = 0.0,
+                 interval_ms: float = 10.0, path_prefix: str = ''):
+        self.id = uuid.uuid4().hex[:12]
+        self.mode = mode
+        self.requests_wanted = requests
+        self.requests_profiled = 0
+        self.seconds = seconds
+        self.interval = max(interval_ms, 1.0) / 1000
+        self.path_prefix = path_prefix
+        self.started_at = datetime.utcnow()
+        self.finished_at: Optional[datetime] = None
+        self.samples: Counter = Counter()
+        self.stats: Optional[pstats.Stats] = None
+        # Thread ids currently running a profiled request (requests mode)
+        self.active_threads: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self._done.is_set()
+
+    def finish(self) -> None:
+        if not self._done.is_set():
+            self.finished_at = datetime.utcnow()
+            self._done.set()
+
+    def add_profile(self, profile: cProfile.Profile) -> None:
+        with self._lock:
+            if self.stats is None:
+                self.stats = pstats.Stats(profile)
+            else:
+                self.stats.add(profile)
+
+    def sample(self, exclude: int) -> None:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        with self._lock:
+            targets = dict(self.active_threads) if self.mode == 'requests' else None
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == exclude:
+                continue
+            if targets is not None and thread_id not in targets:
+                continue
+            name = targets[thread_id] if targets is not None else names.get(thread_id, str(thread_id))
+            self.samples[_collapse(frame, name)] += 1
+
+    def to_dict(self) -> Dict:
+        formats = ['collapsed']
+        if self.stats is not None:
+            formats = ['pstats', 'text', 'collapsed']
+        return {
+            'id': self.id,
+            'mode': self.mode,
+            'status': 'finished' if self.finished else 'running',
+            'startedAt': self.started_at.isoformat() + 'Z',
+            'finishedAt': self.finished_at.isoformat() + 'Z' if self.finished_at else None,
+            'requestsWanted': self.requests_wanted,
+            'requestsProfiled': self.requests_profiled,
+            'seconds': self.seconds,
+            'pathPrefix': self.path_prefix,
+            'samples': sum(self.samples.values()),
+            'formats': formats if self.finished else [],
+        }
+
+    def export(self, fmt: str) -> bytes:
+        """Render results as 'pstats' (marshal dump), 'text' or 'collapsed'"""
+        if fmt == 'collapsed':
+            lines = [f'{stack} {count}' for stack, count in self.samples.most_common()]
+            return ('\n'.join(lines) + '\n').encode('utf-8')
+        if self.stats is None:
+            raise ValueError(f'{fmt} output is only available for requests sessions')
+        if fmt == 'pstats':
+            return marshal.dumps(self.stats.stats)
+        if fmt == 'text':
+            stream = io.StringIO()
+            with self._lock:
+                self.stats.stream = stream
+                try:
+                    self.stats.sort_stats('cumulative').print_stats(80)
+                finally:
+                    self.stats.stream = sys.stdout
+            return stream.getvalue().encode('utf-8')
+        raise ValueError(f'Unknown profile format: {fmt}')
+
+
+class Profiler:
+    """Starts profiling sessions and hooks the requests they cover"""
+
+    def __init__(self, history: int = 5):
+        self._current: Optional[ProfileSession] = None
+        self._sessions: deque = deque(maxlen=history)
+        self._lock = threading.Lock()
+        # cProfile hooks are global on newer Pythons; profile one request at a time
+        self._request_lock = threading.Lock()
+
+    @property
+    def current(self) -> Optional[ProfileSession]:
+        session = self._current
+        return session if session and not session.finished else None
+
+    def start(self, mode: str, requests: int = 10, seconds: float = 10.0,
+              interval_ms: float = 10.0, path_prefix: str = '') -> ProfileSession:
+        if mode not in MODES:
+            raise ValueError(f'mode must be one of: {", ".join(MODES)}')
+        with self._lock:
+            if self.current:
+                raise RuntimeError(f'Profile session {self._current.id} is still running')
+            session = ProfileSession(mode, requests=requests if mode == 'requests' else 0,
+                                     seconds=seconds if mode == 'sample' else 0.0,
+                                     interval_ms=interval_ms, path_prefix=path_prefix)
+            self._current = session
+            self._sessions.append(session)
+        threading.Thread(target=self._sampler, args=(session,), daemon=True,
+                         name=f'profiler-{session.id}').start()
+        return session
+
+    def _sampler(self, session: ProfileSession) -> None:
+        me = threading.get_ident()
+        deadline = time.monotonic() + session.seconds if session.mode == 'sample' else None
+        while not session.finished:
+            session.sample(exclude=me)
+            if deadline is not None and time.monotonic() >= deadline:
+                session.finish()
+                break
+            time.sleep(session.interval)
+
+    def stop(self) -> Optional[ProfileSession]:
+        session = self.current
+        if session:
+            session.finish()
+        return session
+
+    def get(self, session_id: str) -> Optional[ProfileSession]:
+        for session in self._sessions:
+            if session.id == session_id:
+                return session
+        return None
+
+    def sessions(self) -> List[ProfileSession]:
+        return list(self._sessions)[::-1]
+
+    def begin_request(self, path: str) -> Optional[Tuple[cProfile.Profile, ProfileSession]]:
+        """Start profiling this request if a requests session wants it"""
+        session = self.current
+        if (not session or session.mode != 'requests'
+                or not path.startswith(session.path_prefix)
+                or not self._request_lock.acquire(blocking=False)):
+            return None
+        if session.finished or session.requests_profiled >= session.requests_wanted:
+            self._request_lock.release()
+            return None
+        with session._lock:
+            session.active_threads[threading.get_ident()] = path
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile, session
+
+    def end_request(self, profile: cProfile.Profile, session: ProfileSession) -> None:
+        profile.disable()
+        try:
+            with session._lock:
+                session.active_threads.pop(threading.get_ident(), None)
+            session.add_profile(profile)
+            session.requests_profiled += 1
+            if session.requests_profiled >= session.requests_wanted:
+                session.finish()
+        finally:
+            self._request_lock.release()
+
+
+profiler = Profiler()
+
+
+def init_profiling(app: Flask, profiler: Profiler, exclude_prefix: str = '/api/admin/') -> None:
+    """Run requests under cProfile while a requests session is collecting"""
+
+    @app.before_request
+    def start_request_profile():
+        if request.path.startswith(exclude_prefix):
+            return
+        active = profiler.begin_request(request.path)
+        if active:
+            g.request_profile = active
+
+    @app.teardown_request
+    def stop_request_profile(exc):
+        active = g.pop('request_profile', None)
+        if active:
+            profiler.end_request(*active)
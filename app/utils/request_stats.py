@@ -0,0 +1,198 @@
+"""
+Request Stats - Per-endpoint latency histograms, payload sizes and slow log
+
+Every request is timed from before_request to after_request and folded
+into a fixed-bucket histogram keyed by method and URL rule, so
+/api/jobs/<job_id>/log is one series however many jobs exist. Requests
+slower than SLOW_REQUEST_MS are logged and kept in a bounded ring buffer.
+"""
+import bisect
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from flask import Flask, g, request
+
+from config import Config
+from app.utils.metrics import MetricFamily, metrics
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in milliseconds; the last bucket catches everything slower
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class EndpointStats:
+    """Counters for one method + URL rule"""
+
+    __slots__ = ('count', 'client_errors', 'server_errors', 'total_ms', 'max_ms',
+                 'buckets', 'bytes_in', 'bytes_out', 'max_bytes_out')
+
+    def __init__(self):
+        self.count = 0
+        self.client_errors = 0
+        self.server_errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.max_bytes_out = 0
+
+    def record(self, duration_ms: float, status: int, bytes_in: int, bytes_out: int) -> None:
+        self.count += 1
+        if 400 <= status < 500:
+            self.client_errors += 1
+        elif status >= 500:
+            self.server_errors += 1
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS_MS, duration_ms)] += 1
+        self.bytes_in += bytes_in
+        self.bytes_out += bytes_out
+        self.max_bytes_out = max(self.max_bytes_out, bytes_out)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Upper bound of the bucket holding the pct-th percentile (max_ms for the last)"""
+        if not self.count:
+            return None
+        rank = pct / 100 * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if seen >= rank:
+                if index < len(LATENCY_BUCKETS_MS):
+                    return round(min(LATENCY_BUCKETS_MS[index], self.max_ms), 1)
+                return round(self.max_ms, 1)
+        return round(self.max_ms, 1)
+
+    def to_dict(self) -> Dict:
+        return {
+            'count': self.count,
+            'clientErrors': self.client_errors,
+            'serverErrors': self.server_errors,
+            'avgMs': round(self.total_ms / self.count, 2) if self.count else None,
+            'p50Ms': self.percentile(50),
+            'p95Ms': self.percentile(95),
+            'p99Ms': self.percentile(99),
+            'maxMs': round(self.max_ms, 1),
+            'histogram': {
+                **{f'le{bound}': n for bound, n in zip(LATENCY_BUCKETS_MS, self.buckets)},
+                'inf': self.buckets[-1],
+            },
+            'bytesIn': self.bytes_in,
+            'bytesOut': self.bytes_out,
+            'avgBytesOut': round(self.bytes_out / self.count) if self.count else None,
+            'maxBytesOut': self.max_bytes_out,
+        }
+
+
+class RequestStats:
+    """Per-endpoint request statistics and a ring buffer of slow requests"""
+
+    def __init__(self, slow_ms: float = 1000.0, slow_log_size: int = 200):
+        self.slow_ms = slow_ms
+        self.started_at = datetime.utcnow()
+        self._endpoints: Dict[str, EndpointStats] = {}
+        self._slow: deque = deque(maxlen=slow_log_size)
+        self._lock = threading.Lock()
+
+    def record(self, key: str, path: str, status: int, duration_ms: float,
+               bytes_in: int, bytes_out: int) -> None:
+        with self._lock:
+            stats = self._endpoints.get(key)
+            if stats is None:
+                stats = self._endpoints[key] = EndpointStats()
+            stats.record(duration_ms, status, bytes_in, bytes_out)
+        if self.slow_ms and duration_ms >= self.slow_ms:
+            entry = {
+                'at': datetime.utcnow().isoformat() + 'Z',
+                'endpoint': key,
+                'path': path,
+                'status': status,
+                'durationMs': round(duration_ms, 1),
+                'bytesIn': bytes_in,
+                'bytesOut': bytes_out,
+            }
+            self._slow.append(entry)
+            logger.warning(f"Slow request: {key} ({path}) -> {status} in {duration_ms:.0f} ms")
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            endpoints = {key: stats.to_dict() for key, stats in self._endpoints.items()}
+        return {
+            'since': self.started_at.isoformat() + 'Z',
+            'bucketsMs': list(LATENCY_BUCKETS_MS),
+            'endpoints': dict(sorted(endpoints.items(), key=lambda item: -item[1]['count'])),
+        }
+
+    def slow_requests(self, limit: int = 100) -> List[Dict]:
+        """Most recent slow requests first"""
+        return list(self._slow)[::-1][:limit]
+
+    def metric_families(self) -> List[MetricFamily]:
+        """Per-endpoint latency and size series for /metrics"""
+        duration, bytes_in, bytes_out = [], [], []
+        with self._lock:
+            items = [(key, list(stats.buckets), stats.total_ms, stats.count,
+                      stats.bytes_in, stats.bytes_out) for key, stats in self._endpoints.items()]
+        for key, buckets, total_ms, count, received, sent in items:
+            method, _, rule = key.partition(' ')
+            labels = {'method': method, 'endpoint': rule}
+            running = 0
+            for bound, n in zip(list(LATENCY_BUCKETS_MS) + [None], buckets):
+                running += n
+                le = '+Inf' if bound is None else repr(bound / 1000)
+                duration.append(('acp_http_request_duration_seconds_bucket', {**labels, 'le': le}, running))
+            duration.append(('acp_http_request_duration_seconds_sum', labels, total_ms / 1000))
+            duration.append(('acp_http_request_duration_seconds_count', labels, count))
+            bytes_in.append(('acp_http_request_bytes_total', labels, received))
+            bytes_out.append(('acp_http_response_bytes_total', labels, sent))
+        return [
+            MetricFamily('acp_http_request_duration_seconds', 'HTTP request latency by endpoint',
+                         'histogram', duration),
+            MetricFamily('acp_http_request_bytes_total', 'HTTP request body bytes by endpoint',
+                         'counter', bytes_in),
+            MetricFamily('acp_http_response_bytes_total',
+                         'HTTP response bytes sent by endpoint (0 for streamed responses)',
+                         'counter', bytes_out),
+        ]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._endpoints.clear()
+            self._slow.clear()
+            self.started_at = datetime.utcnow()
+
+
+def init_request_stats(app: Flask, stats: RequestStats) -> None:
+    """Time every request and record it against its URL rule"""
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop('request_started', None)
+        if started is None:
+            return response
+        duration_ms = (time.perf_counter() - started) * 1000
+        rule = request.url_rule.rule if request.url_rule else '<unmatched>'
+        stats.record(
+            f'{request.method} {rule}',
+            request.path,
+            response.status_code,
+            duration_ms,
+            request.content_length or 0,
+            # Bytes on the wire; streamed responses have no length and count as 0
+            response.content_length or 0,
+        )
+        return response
+
+
+request_stats = RequestStats(Config.SLOW_REQUEST_MS, Config.SLOW_REQUEST_LOG_SIZE)
+metrics.add_collector(request_stats.metric_families)
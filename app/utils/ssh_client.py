@@ -1,5 +1,19 @@
-import paramiko
-from typing import Optional, Tuple
+import time
+from typing import TYPE_CHECKING, Optional, Tuple
+
+from app.utils.job_timing import phase
+from app.utils.metrics import metrics
+from config import Config
+
+if TYPE_CHECKING:
+    import paramiko
+
+SSH_CONNECT_SECONDS = metrics.histogram(
+    'acp_ssh_connect_seconds', 'SSH connect and authentication time', ('host',))
+SSH_CONNECT_FAILURES = metrics.counter(
+    'acp_ssh_connect_failures_total', 'SSH connections that failed', ('host',))
+SSH_EXEC_SECONDS = metrics.histogram(
+    'acp_ssh_exec_seconds', 'Remote command run time until exit status', ('host',))
 
 
 class SSHClientWrapper:
@@ -10,9 +24,26 @@ class SSHClientWrapper:
         self.port = port
         self.password = password
         self.key_filename = key_filename
-        self.client: Optional[paramiko.SSHClient] = None
+        self.client: Optional['paramiko.SSHClient'] = None
 
     def __enter__(self):
+        started = time.perf_counter()
+        try:
+            with phase('ssh_connect'):
+                self._connect()
+        except Exception:
+            SSH_CONNECT_FAILURES.labels(self.hostname).inc()
+            raise
+        SSH_CONNECT_SECONDS.labels(self.hostname).observe(time.perf_counter() - started)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.client:
+            self.client.close()
+
+    def _connect(self) -> None:
+        # paramiko pulls in cryptography and friends; only pay for that on first use
+        import paramiko
         self.client = paramiko.SSHClient()
         self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
         self.client.connect(
@@ -23,18 +54,27 @@ class SSHClientWrapper:
             key_filename=self.key_filename,
             look_for_keys=False,
         )
-        return self
 
-    def __exit__(self, exc_type, exc, tb):
-        if self.client:
-            self.client.close()
-
-    def run(self, command: str, work_dir: Optional[str] = None) -> Tuple[int, str, str]:
+    def _exec(self, command: str) -> Tuple[int, str, str]:
         assert self.client
-        if work_dir:
-            command = f'cd {work_dir} && ' + command
         stdin, stdout, stderr = self.client.exec_command(command)
         out = stdout.read().decode('utf-8', errors='ignore')
         err = stderr.read().decode('utf-8', errors='ignore')
         exit_code = stdout.channel.recv_exit_status()
         return exit_code, out, err
+
+    def run(self, command: str, work_dir: Optional[str] = None) -> Tuple[int, str, str]:
+        if work_dir:
+            command = f'cd {work_dir} && ' + command
+        started = time.perf_counter()
+        result = self._exec(command)
+        SSH_EXEC_SECONDS.labels(self.hostname).observe(time.perf_counter() - started)
+        return result
+
+
+def open_ssh(**config) -> SSHClientWrapper:
+    """SSH client for a job: the real one, or the local stand-in when FAULT_SCENARIO is set"""
+    if Config.FAULT_SCENARIO:
+        from app.faults.ssh import LocalSSHClient
+        return LocalSSHClient(Config.FAULT_SCENARIO, **config)
+    return SSHClientWrapper(**config)
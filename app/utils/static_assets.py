@@ -0,0 +1,180 @@
+"""
+Static Assets - Build-time pre-compression and fingerprinting
+
+build_static() writes a build directory next to the static folder:
+
+- a .gz (and, with brotli installed, .br) copy of every compressible
+  asset above the size threshold
+- content-hashed copies (name.<hash>.ext) of the stylesheets and scripts
+  the HTML entry pages reference, plus entry pages rewritten to use them
+- manifest.json mapping original paths to fingerprinted ones
+
+StaticAssets serves from the build directory when it has a fresh copy and
+from the static folder otherwise. Fingerprinted files are cached for a
+year; entry pages are always revalidated.
+"""
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+from typing import Dict, Optional
+
+from flask import request, send_from_directory
+
+from app.utils.compression import (available_encodings, compress_bytes,
+                                   is_compressible, negotiate_encoding)
+
+MANIFEST_NAME = 'manifest.json'
+ENTRY_PAGES = ('index.html', 'login.html')
+FINGERPRINT_LENGTH = 10
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+ENCODING_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+# Local href/src references in the entry pages (no scheme, query or fragment)
+_reference_re = re.compile(r'''((?:href|src)\s*=\s*["'])(?!/|[a-z]+:)([^"'?#]+)(["'])''', re.IGNORECASE)
+
+
+def _write_compressed(path: str, data: bytes, min_bytes: int) -> int:
+    written = 0
+    if len(data) < min_bytes or not is_compressible(mimetypes.guess_type(path)[0]):
+        return written
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    for encoding in available_encodings():
+        with open(path + ENCODING_SUFFIXES[encoding], 'wb') as f:
+            f.write(compress_bytes(data, encoding, gzip_level=9, brotli_quality=11))
+        written += 1
+    return written
+
+
+def fingerprinted_name(path: str, data: bytes) -> str:
+    digest = hashlib.sha256(data).hexdigest()[:FINGERPRINT_LENGTH]
+    base, ext = os.path.splitext(path)
+    return f'{base}.{digest}{ext}'
+
+
+def build_static(static_dir: str, build_dir: str, min_bytes: int = 1024) -> Dict:
+    """Pre-compress and fingerprint static assets into build_dir, replacing it"""
+    if os.path.isdir(build_dir):
+        shutil.rmtree(build_dir)
+    os.makedirs(build_dir)
+
+    compressed = 0
+    for root, _, files in os.walk(static_dir):
+        for name in files:
+            source = os.path.join(root, name)
+            rel = os.path.relpath(source, static_dir)
+            if rel in ENTRY_PAGES:
+                continue
+            if os.path.getsize(source) < min_bytes:
+                continue
+            with open(source, 'rb') as f:
+                data = f.read()
+            compressed += _write_compressed(os.path.join(build_dir, rel), data, min_bytes)
+
+    assets: Dict[str, str] = {}
+
+    def fingerprint(match):
+        rel = os.path.normpath(match.group(2)).replace(os.sep, '/')
+        source = os.path.join(static_dir, rel)
+        if rel.endswith('.html') or not os.path.isfile(source):
+            return match.group(0)
+        if rel not in assets:
+            with open(source, 'rb') as f:
+                data = f.read()
+            assets[rel] = fingerprinted_name(rel, data)
+            target = os.path.join(build_dir, assets[rel])
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as f:
+                f.write(data)
+            _write_compressed(target, data, min_bytes)
+        return match.group(1) + assets[rel] + match.group(3)
+
+    for page in ENTRY_PAGES:
+        source = os.path.join(static_dir, page)
+        if not os.path.isfile(source):
+            continue
+        with open(source, 'r', encoding='utf-8') as f:
+            html = _reference_re.sub(fingerprint, f.read())
+        target = os.path.join(build_dir, page)
+        with open(target, 'w', encoding='utf-8') as f:
+            f.write(html)
+        _write_compressed(target, html.encode('utf-8'), min_bytes)
+
+    with open(os.path.join(build_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump({'assets': assets}, f, indent=2, sort_keys=True)
+    return {'compressed': compressed, 'fingerprinted': len(assets), 'buildDir': build_dir}
+
+
+class StaticAssets:
+    """Serves static files, preferring fresh pre-compressed and fingerprinted builds"""
+
+    def __init__(self, static_dir: str, build_dir: str, max_age: int = 300):
+        self.static_dir = static_dir
+        self.build_dir = build_dir
+        self.max_age = max_age
+        self.fingerprinted = set()
+        try:
+            with open(os.path.join(build_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+                self.fingerprinted = set(json.load(f).get('assets', {}).values())
+        except (OSError, ValueError):
+            pass
+
+    def _max_age(self, filename: str) -> int:
+        if filename in self.fingerprinted:
+            return IMMUTABLE_MAX_AGE
+        if filename.endswith('.html'):
+            return 0
+        return self.max_age
+
+    def _fresh(self, path: str, source: Optional[str]) -> bool:
+        """A build file is usable unless the static original was edited after the build"""
+        try:
+            built = os.path.getmtime(path)
+        except OSError:
+            return False
+        if source is None:
+            return True
+        try:
+            return built >= os.path.getmtime(source)
+        except OSError:
+            return True
+
+    def send(self, filename: str):
+        """View function for /<path:filename> and the entry pages"""
+        filename = filename.replace('\\', '/')
+        source = os.path.join(self.static_dir, filename)
+        source = source if os.path.isfile(source) else None
+        built = os.path.join(self.build_dir, filename)
+        directory = self.static_dir
+        if self._fresh(built, source):
+            directory, source = self.build_dir, built
+
+        max_age = self._max_age(filename)
+        mimetype = mimetypes.guess_type(filename)[0]
+        accept_encoding = request.headers.get('Accept-Encoding')
+        for encoding in available_encodings():
+            if negotiate_encoding(accept_encoding, [encoding]) is None:
+                continue
+            variant = filename + ENCODING_SUFFIXES[encoding]
+            if self._fresh(os.path.join(self.build_dir, variant), source):
+                response = send_from_directory(
+                    self.build_dir, variant, mimetype=mimetype, max_age=max_age)
+                response.headers['Content-Encoding'] = encoding
+                response.vary.add('Accept-Encoding')
+                return self._cache_headers(response, filename)
+
+        response = send_from_directory(directory, filename, max_age=max_age)
+        if is_compressible(mimetype):
+            response.vary.add('Accept-Encoding')
+        return self._cache_headers(response, filename)
+
+    def _cache_headers(self, response, filename: str):
+        if filename in self.fingerprinted:
+            response.cache_control.public = True
+            response.cache_control.immutable = True
+        elif filename.endswith('.html'):
+            response.cache_control.no_cache = True
+        return response
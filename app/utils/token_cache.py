@@ -0,0 +1,56 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+
+class TokenCache:
+    """
+    LRU of already-verified bearer tokens
+
+    Entries are keyed by a digest of the token (the raw token is never kept)
+    and hold the token's own expiry, so a cached token stops being accepted
+    exactly when jwt.decode would start rejecting it. They also hold the
+    decoded claims, for checks such as the admin role.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[bytes, Tuple[float, Dict]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode('utf-8')).digest()
+
+    def get(self, token: str) -> Optional[Dict]:
+        """The claims of a cached, unexpired token; None if it must be verified"""
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def is_valid(self, token: str) -> bool:
+        return self.get(token) is not None
+
+    def add(self, token: str, exp: Optional[float], claims: Optional[Dict] = None) -> None:
+        # Tokens without an expiry are never cached
+        if self.max_entries <= 0 or not exp:
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (float(exp), claims or {})
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
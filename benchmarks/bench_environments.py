@@ -0,0 +1,102 @@
+"""
+Benchmark Environment lookups under concurrent requests
+
+Seeds a scratch database with N environments, then runs find_by_tag /
+find_by_id / find_all from several threads (mimicking concurrent job
+submissions and UI refreshes) and reports throughput and latency
+percentiles.
+
+    python benchmarks/bench_environments.py --threads 16 --seconds 5
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--environments', type=int, default=50)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--write-ratio', type=float, default=0.01,
+                        help='fraction of operations that save() an environment')
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix='bench-env-')
+    os.chdir(scratch)
+    from app.models.environment import Environment
+    Environment.DB_PATH = os.path.join(scratch, 'bench.db')
+    Environment.init_db()
+
+    tags = []
+    for i in range(args.environments):
+        env = Environment(tag=f'env{i:03d}', agile_plm_url=f'http://agile{i}:7001/Agile',
+                          propagation_user='admin', propagation_password='secret')
+        env.save()
+        tags.append(env.tag)
+    ids = [env.id for env in Environment.find_all()]
+
+    latencies = {'find_by_tag': [], 'find_by_id': [], 'find_all': [], 'save': []}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.seconds
+
+    def worker(seed):
+        rnd = random.Random(seed)
+        local = {name: [] for name in latencies}
+        while time.perf_counter() < deadline:
+            roll = rnd.random()
+            start = time.perf_counter()
+            if roll < args.write_ratio:
+                env = Environment.find_by_id(rnd.choice(ids))
+                env.propagation_password = str(rnd.random())
+                env.save()
+                name = 'save'
+            elif roll < 0.7:
+                Environment.find_by_tag(rnd.choice(tags))
+                name = 'find_by_tag'
+            elif roll < 0.9:
+                Environment.find_by_id(rnd.choice(ids))
+                name = 'find_by_id'
+            else:
+                Environment.find_all()
+                name = 'find_all'
+            local[name].append(time.perf_counter() - start)
+        with lock:
+            for name, values in local.items():
+                latencies[name].extend(values)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    total = sum(len(v) for v in latencies.values())
+    print(f'{args.threads} threads, {args.environments} environments, {args.seconds:.1f}s')
+    print(f'total: {total} ops, {total / args.seconds:,.0f} ops/s')
+    print(f"{'operation':<12} {'count':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, values in latencies.items():
+        if not values:
+            continue
+        print(f'{name:<12} {len(values):>8} '
+              f'{percentile(values, 50) * 1000:>8.3f} '
+              f'{percentile(values, 95) * 1000:>8.3f} '
+              f'{percentile(values, 99) * 1000:>8.3f}')
+
+
+if __name__ == '__main__':
+    main()
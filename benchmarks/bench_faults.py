@@ -0,0 +1,138 @@
+"""
+Benchmark job execution under injected faults
+
+Runs N ACP/Averify jobs through JobManager and the real services with
+FAULT_SCENARIO set, so the fake acp/averify executable and (with --mode
+ssh) the local SSH stand-in replace the real programs. Reports outcomes by
+status and exit code, wall time, and per-phase timings. Work directories
+are named by run index, so a scenario's probability draws repeat exactly
+from run to run.
+
+    python benchmarks/bench_faults.py benchmarks/scenarios/exit-codes.json \\
+        --hosts exit-2,exit-3,exit-4,exit-5,exit-6,exit-7,exit-8,exit-9
+    python benchmarks/bench_faults.py benchmarks/scenarios/mixed.json --mode ssh --jobs 200 --concurrency 16
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('scenario')
+    parser.add_argument('--command', choices=('export', 'import', 'averify'), default='export')
+    parser.add_argument('--mode', choices=('local', 'ssh'), default='local')
+    parser.add_argument('--hosts', default='bench-host',
+                        help='comma-separated hosts, assigned to jobs round robin')
+    parser.add_argument('--jobs', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--save', metavar='PATH', help='write results as JSON')
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix='bench-faults-')
+    os.environ['FAULT_SCENARIO'] = os.path.abspath(args.scenario)
+    os.environ['WORK_DIR'] = os.path.join(scratch, 'work')
+    os.environ.setdefault('LOG_INDEX_ENABLED', 'false')
+    os.chdir(scratch)
+
+    from app.services.acp_service import AcpService
+    from app.services.averify_service import AverifyService
+    from app.services.job_manager import job_manager
+    from app.utils.job_timing import PHASES
+
+    acp_service = AcpService()
+    averify_service = AverifyService()
+    hosts = [h.strip() for h in args.hosts.split(',') if h.strip()]
+    config_path = os.path.join(scratch, 'config.xml')
+    with open(config_path, 'w') as f:
+        f.write('<config/>\n')
+    bundle_path = os.path.join(scratch, 'bundle.zip')
+    with open(bundle_path, 'wb') as f:
+        f.write(b'\0' * 4096)
+    job_type = {'export': 'acp-export', 'import': 'acp-import', 'averify': 'averify'}[args.command]
+
+    def run_one(index):
+        host = hosts[index % len(hosts)]
+        work_dir = os.path.join(scratch, f'run-{index:05d}')
+        os.makedirs(work_dir)
+        remote = args.mode == 'ssh'
+        ssh_config = {'hostname': host, 'username': 'bench'} if remote else None
+
+        def target():
+            if args.command == 'export':
+                return acp_service.run_acp_export(host, config_path, 'bench', work_dir,
+                                                  remote=remote, ssh_config=ssh_config)
+            if args.command == 'import':
+                return acp_service.run_acp_import(host, config_path, bundle_path, work_dir,
+                                                  remote=remote, ssh_config=ssh_config)
+            return averify_service.run_averify(host, 'DEV', 'QA', config_path, work_dir,
+                                               remote=remote, ssh_config=ssh_config)
+
+        job_id = job_manager.create_job(job_type, host)
+        job_manager.run_job(job_id, target)
+        return job_manager.get_job(job_id)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        jobs = list(pool.map(run_one, range(args.jobs)))
+    elapsed = time.perf_counter() - started
+
+    outcomes = Counter((job.status, job.exit_code) for job in jobs)
+    walls = [(job.finished_at - job.created_at).total_seconds() for job in jobs]
+    phases = {}
+    for job in jobs:
+        for phase, seconds in job.timings.totals().items():
+            phases.setdefault(phase, []).append(seconds)
+
+    result = {
+        'scenario': args.scenario,
+        'command': args.command,
+        'mode': args.mode,
+        'hosts': hosts,
+        'jobs': args.jobs,
+        'concurrency': args.concurrency,
+        'elapsedSeconds': round(elapsed, 2),
+        'jobsPerSecond': round(args.jobs / elapsed, 2),
+        'outcomes': {f'{status}/{code}': n for (status, code), n in sorted(outcomes.items())},
+        'wallSeconds': {'p50': round(percentile(walls, 50), 3), 'p95': round(percentile(walls, 95), 3),
+                        'max': round(max(walls), 3)},
+        'phases': {phase: {'count': len(phases[phase]),
+                           'p50': round(percentile(phases[phase], 50), 3),
+                           'p95': round(percentile(phases[phase], 95), 3),
+                           'max': round(max(phases[phase]), 3)}
+                   for phase in PHASES if phase in phases},
+    }
+
+    print(f"{args.jobs} {args.command} jobs ({args.mode}), concurrency {args.concurrency}, "
+          f"scenario {args.scenario}")
+    print(f"total: {elapsed:.2f}s, {result['jobsPerSecond']} jobs/s; wall p50 "
+          f"{result['wallSeconds']['p50']}s p95 {result['wallSeconds']['p95']}s")
+    print('outcomes: ' + ', '.join(f'{k}: {v}' for k, v in result['outcomes'].items()))
+    print(f"{'phase':<18} {'count':>6} {'p50 s':>8} {'p95 s':>8} {'max s':>8}")
+    for phase, stats in result['phases'].items():
+        print(f"{phase:<18} {stats['count']:>6} {stats['p50']:>8.3f} {stats['p95']:>8.3f} {stats['max']:>8.3f}")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f'results written to {args.save}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,401 @@
+"""
+Load-test the API end to end against a demo-mode server
+
+Starts the app in a subprocess with DEMO_MODE on and a short
+DEMO_JOB_DURATION, then drives it from many client threads. The clients
+run a weighted mix of export/import/averify submissions, log polls and
+job listings. Watcher threads each follow one job's log to the end, like
+an open log viewer. Reports throughput, latency percentiles per
+operation, and the server's RSS and thread count over the run.
+
+    python benchmarks/bench_load.py --clients 32 --watchers 64 --seconds 30
+    python benchmarks/bench_load.py --mix export=1,poll=20,list=1 --save baseline.json
+    python benchmarks/bench_load.py --compare baseline.json --tolerance 0.25
+
+--save writes the results as a JSON baseline. --compare exits non-zero
+when throughput drops, or p95 latency, peak RSS or peak threads grow, by
+more than the tolerance relative to the baseline.
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_SERVER = (
+    'import logging, sys\n'
+    f'sys.path.insert(0, {ROOT!r})\n'
+    'logging.getLogger("werkzeug").setLevel(logging.WARNING)\n'
+    'from app import create_app\n'
+    'create_app().run(host="127.0.0.1", port=int(sys.argv[1]), threaded=True)\n'
+)
+
+DEFAULT_MIX = 'export=2,import=1,averify=1,poll=12,list=2'
+OPERATIONS = ('export', 'import', 'averify', 'poll', 'list')
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise SystemExit(f'unknown operation in --mix: {name} (choose from {", ".join(OPERATIONS)})')
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def proc_status(pid):
+    """(RSS in MB, thread count) of a process from /proc, or (None, None) off Linux"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            fields = dict(line.split(':', 1) for line in f if ':' in line)
+        return int(fields['VmRSS'].split()[0]) / 1024, int(fields['Threads'])
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+
+class Client:
+    """One keep-alive HTTP connection with a bearer token"""
+
+    def __init__(self, port, token=None):
+        self.conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        self.token = token
+
+    def request(self, method, path, body=None):
+        headers = {'Content-Type': 'application/json'}
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        payload = json.dumps(body) if body is not None else None
+        try:
+            self.conn.request(method, path, body=payload, headers=headers)
+            response = self.conn.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            raise
+        return response.status, json.loads(data) if data else None
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {name: [] for name in OPERATIONS}
+        self.errors = {name: 0 for name in OPERATIONS}
+        self._lock = threading.Lock()
+
+    def merge(self, latencies, errors):
+        with self._lock:
+            for name, values in latencies.items():
+                self.latencies[name].extend(values)
+            for name, count in errors.items():
+                self.errors[name] += count
+
+
+def start_server(port, args, scratch):
+    env = dict(os.environ,
+               DEMO_MODE='true',
+               DEMO_JOB_DURATION=str(args.job_duration),
+               DEMO_FAILURE_RATE=str(args.failure_rate),
+               WORK_DIR=os.path.join(scratch, 'work'),
+               SLOW_REQUEST_MS='0',
+               # Every job goes to bench-host; measure the job system, not scheduler caps
+               SCHEDULER_MAX_PER_HOST='0',
+               SCHEDULER_MAX_READERS_PER_ENV='0')
+    server = subprocess.Popen([sys.executable, '-c', _SERVER, str(port)], cwd=scratch, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit(f'server exited early:\n{server.stderr.read().decode()}')
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.2):
+                return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise SystemExit('server did not start within 30s')
+
+
+def run(args):
+    mix = parse_mix(args.mix)
+    names, weights = list(mix), list(mix.values())
+    scratch = tempfile.mkdtemp(prefix='bench-load-')
+    port = free_port()
+    server = start_server(port, args, scratch)
+    try:
+        status, body = Client(port).request('POST', '/api/auth/login',
+                                            {'username': args.username, 'password': args.password})
+        if status != 200:
+            raise SystemExit(f'login failed ({status}): {body}')
+        token = body['token']
+
+        recorder = Recorder()
+        job_ids = []
+        jobs_lock = threading.Lock()
+        offsets = {}
+        submissions = {
+            'export': ('/api/jobs/acp/export', {'xmlConfig': 'bench.xml', 'productLine': 'bench',
+                                                'host': 'bench-host'}),
+            'import': ('/api/jobs/acp/import', {'host': 'bench-host'}),
+            'averify': ('/api/jobs/averify/run', {'sourceEnv': 'DEV', 'targetEnv': 'QA',
+                                                  'host': 'bench-host'}),
+        }
+        stop = threading.Event()
+        followed = {'watchers': 0}
+
+        def timed(client, local, errors, name, method, path, body=None):
+            started = time.perf_counter()
+            try:
+                status, data = client.request(method, path, body)
+            except (OSError, http.client.HTTPException, ValueError):
+                status, data = 0, None
+            local[name].append(time.perf_counter() - started)
+            if not 200 <= status < 300:
+                errors[name] += 1
+                return None
+            return data
+
+        def client_loop(seed):
+            rnd = random.Random(seed)
+            client = Client(port, token)
+            local = {name: [] for name in OPERATIONS}
+            errors = {name: 0 for name in OPERATIONS}
+            while not stop.is_set():
+                name = rnd.choices(names, weights)[0]
+                if name in submissions:
+                    path, body = submissions[name]
+                    data = timed(client, local, errors, name, 'POST', path, body)
+                    if data:
+                        with jobs_lock:
+                            job_ids.append(data['jobId'])
+                elif name == 'poll':
+                    with jobs_lock:
+                        job_id = rnd.choice(job_ids) if job_ids else None
+                    if job_id is None:
+                        time.sleep(0.01)
+                        continue
+                    data = timed(client, local, errors, name, 'GET',
+                                 f'/api/jobs/{job_id}/log?offset={offsets.get(job_id, 0)}')
+                    if data:
+                        offsets[job_id] = data['offset']
+                else:
+                    timed(client, local, errors, name, 'GET', '/api/jobs/')
+                if args.think_ms:
+                    time.sleep(rnd.uniform(0, 2 * args.think_ms) / 1000)
+            recorder.merge(local, errors)
+
+        def watcher_loop(seed):
+            rnd = random.Random(seed)
+            client = Client(port, token)
+            local = {name: [] for name in OPERATIONS}
+            errors = {name: 0 for name in OPERATIONS}
+            while not stop.is_set():
+                with jobs_lock:
+                    job_id = rnd.choice(job_ids) if job_ids else None
+                if job_id is None:
+                    time.sleep(0.05)
+                    continue
+                offset = 0
+                while not stop.is_set():
+                    data = timed(client, local, errors, 'poll', 'GET',
+                                 f'/api/jobs/{job_id}/log?offset={offset}')
+                    if not data or data['finished']:
+                        break
+                    offset = data['offset']
+                    stop.wait(args.poll_interval)
+                with jobs_lock:
+                    followed['watchers'] += 1
+            recorder.merge(local, errors)
+
+        threads = [threading.Thread(target=client_loop, args=(i,), daemon=True)
+                   for i in range(args.clients)]
+        threads += [threading.Thread(target=watcher_loop, args=(10000 + i,), daemon=True)
+                    for i in range(args.watchers)]
+
+        rss_start, threads_start = proc_status(server.pid)
+        samples = []
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        while time.perf_counter() - started < args.seconds:
+            time.sleep(0.5)
+            samples.append(proc_status(server.pid))
+        stop.set()
+        for t in threads:
+            t.join(timeout=35)
+        elapsed = time.perf_counter() - started
+        rss_end, threads_end = proc_status(server.pid)
+
+        status, jobs = Client(port, token).request('GET', '/api/jobs/')
+        finished = sum(1 for job in jobs or [] if job['finishedAt'])
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+    operations = {}
+    total = 0
+    for name in OPERATIONS:
+        values = recorder.latencies[name]
+        if not values:
+            continue
+        total += len(values)
+        operations[name] = {
+            'count': len(values),
+            'errors': recorder.errors[name],
+            'perSecond': round(len(values) / elapsed, 1),
+            'p50Ms': round(percentile(values, 50) * 1000, 2),
+            'p95Ms': round(percentile(values, 95) * 1000, 2),
+            'p99Ms': round(percentile(values, 99) * 1000, 2),
+        }
+    rss = [s[0] for s in samples if s[0] is not None]
+    counts = [s[1] for s in samples if s[1] is not None]
+    return {
+        'timestamp': datetime.utcnow().isoformat() + 'Z',
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'config': {
+            'clients': args.clients,
+            'watchers': args.watchers,
+            'seconds': args.seconds,
+            'mix': args.mix,
+            'jobDuration': args.job_duration,
+            'failureRate': args.failure_rate,
+            'pollInterval': args.poll_interval,
+            'thinkMs': args.think_ms,
+        },
+        'elapsedSeconds': round(elapsed, 2),
+        'requests': total,
+        'requestsPerSecond': round(total / elapsed, 1),
+        'jobsSubmitted': len(job_ids),
+        'jobsFinished': finished,
+        'logsFollowed': followed['watchers'],
+        'operations': operations,
+        'server': {
+            'rssStartMb': round(rss_start, 1) if rss_start is not None else None,
+            'rssEndMb': round(rss_end, 1) if rss_end is not None else None,
+            'rssPeakMb': round(max(rss), 1) if rss else None,
+            'rssGrowthMb': round(rss_end - rss_start, 1) if rss_start is not None and rss_end is not None else None,
+            'threadsStart': threads_start,
+            'threadsPeak': max(counts) if counts else None,
+            'threadsEnd': threads_end,
+        },
+    }
+
+
+def report(result):
+    config = result['config']
+    print(f"{config['clients']} clients, {config['watchers']} watchers, {result['elapsedSeconds']:.1f}s, "
+          f"mix {config['mix']}, job duration {config['jobDuration']}s")
+    print(f"total: {result['requests']} requests, {result['requestsPerSecond']:,.1f} req/s; "
+          f"jobs submitted {result['jobsSubmitted']}, finished {result['jobsFinished']}")
+    print(f"{'operation':<10} {'count':>8} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, op in result['operations'].items():
+        print(f"{name:<10} {op['count']:>8} {op['errors']:>7} {op['perSecond']:>8.1f} "
+              f"{op['p50Ms']:>8.2f} {op['p95Ms']:>8.2f} {op['p99Ms']:>8.2f}")
+    server = result['server']
+    if server['rssStartMb'] is not None:
+        print(f"server RSS: {server['rssStartMb']} -> {server['rssEndMb']} MB "
+              f"(peak {server['rssPeakMb']}, growth {server['rssGrowthMb']})")
+        print(f"server threads: {server['threadsStart']} -> {server['threadsEnd']} "
+              f"(peak {server['threadsPeak']})")
+
+
+def compare(result, baseline, tolerance):
+    """Regressions beyond tolerance, as human-readable lines"""
+    problems = []
+
+    def worse(label, current, previous, higher_is_better=False):
+        if current is None or previous is None or previous == 0:
+            return
+        change = (current - previous) / previous
+        if higher_is_better:
+            change = -change
+        if change > tolerance:
+            problems.append(f'{label}: {previous} -> {current} ({change:+.0%})')
+
+    worse('requests/s', result['requestsPerSecond'], baseline['requestsPerSecond'], True)
+    for name, op in result['operations'].items():
+        previous = baseline['operations'].get(name)
+        if previous:
+            worse(f'{name} p95 ms', op['p95Ms'], previous['p95Ms'])
+    worse('peak RSS MB', result['server']['rssPeakMb'], baseline['server']['rssPeakMb'])
+    worse('peak threads', result['server']['threadsPeak'], baseline['server']['threadsPeak'])
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--watchers', type=int, default=32,
+                        help='threads that each follow one job log to completion')
+    parser.add_argument('--seconds', type=float, default=20.0)
+    parser.add_argument('--mix', default=DEFAULT_MIX,
+                        help=f'operation weights for clients (default {DEFAULT_MIX})')
+    parser.add_argument('--job-duration', type=float, default=2.0,
+                        help='DEMO_JOB_DURATION for the server, in seconds')
+    parser.add_argument('--failure-rate', type=float, default=0.0,
+                        help='DEMO_FAILURE_RATE for the server')
+    parser.add_argument('--poll-interval', type=float, default=0.5,
+                        help='seconds between log polls of a watcher')
+    parser.add_argument('--think-ms', type=float, default=0.0,
+                        help='mean pause between client requests')
+    parser.add_argument('--username', default='admin')
+    parser.add_argument('--password', default='admin')
+    parser.add_argument('--save', metavar='PATH', help='write results as a JSON baseline')
+    parser.add_argument('--compare', metavar='PATH', help='fail on regressions against a baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed relative regression for --compare')
+    args = parser.parse_args()
+
+    result = run(args)
+    report(result)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f'baseline written to {args.save}')
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get('config') != result['config']:
+            print('WARNING: baseline was recorded with a different configuration')
+        problems = compare(result, baseline, args.tolerance)
+        if problems:
+            print(f'FAIL: regressions beyond {args.tolerance:.0%} against {args.compare}')
+            for line in problems:
+                print(f'  {line}')
+            sys.exit(1)
+        print(f'OK: within {args.tolerance:.0%} of {args.compare}')
+
+
+if __name__ == '__main__':
+    main()
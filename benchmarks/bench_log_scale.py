@@ -0,0 +1,198 @@
+"""
+Benchmark log parsing, storage and search on large synthetic ACP logs
+
+Generates seeded logs with benchmarks/log_generator.py (cached in
+--cache-dir, so each size and seed is only generated once) and for each
+size measures:
+- parse: ACPLogParser.parse_file, in-process and with the process pool
+- append: streaming the log into a job through JobManager.append_log in
+  64 KB chunks, as a running job's output arrives
+- index: LogIndex.add_file plus flush, and the resulting database size
+- search: LogIndex.search latency for rare, common, multi-term and phrase queries
+
+    python benchmarks/bench_log_scale.py --sizes 10MB,100MB
+    python benchmarks/bench_log_scale.py --sizes 1GB --stages parse,index,search --cache-dir /data/bench-logs
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from log_generator import cached_log, format_size, parse_size  # noqa: E402
+
+STAGES = ('parse', 'append', 'index', 'search')
+APPEND_CHUNK = 64 * 1024
+SEARCH_REPEATS = 20
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def rare_term(path):
+    """An object name from the last result table in the file, so it occurs about once"""
+    with open(path, 'rb') as f:
+        f.seek(max(0, os.path.getsize(path) - 256 * 1024))
+        tail = f.read().decode('utf-8', errors='ignore').splitlines()
+    rows = [line for line in tail if line[:1] == '\t' and line[1:2].isalpha() and '.' in line[37:]]
+    return rows[-1][37:].rsplit('.', 1)[-1] if rows else 'Succeeded'
+
+
+def bench_parse(path, size, workers):
+    from app.services.acp_log_parser import ACPLogParser
+
+    result = {}
+    for label, count in (('serial', 1), ('parallel', workers)):
+        if label == 'parallel' and count < 2:
+            continue
+        started = time.perf_counter()
+        analysis = ACPLogParser.parse_file(path, workers=count)
+        elapsed = time.perf_counter() - started
+        result[label] = {'seconds': round(elapsed, 3),
+                         'mbPerSecond': round(size / 1024 / 1024 / elapsed, 1),
+                         'lines': analysis.total_lines,
+                         'errors': analysis.error_count}
+    return result
+
+
+def bench_append(path, size):
+    from app.services.job_manager import job_manager
+
+    job_id = job_manager.create_job('acp-import', 'bench')
+    chunks = 0
+    started = time.perf_counter()
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        while True:
+            text = f.read(APPEND_CHUNK)
+            if not text:
+                break
+            job_manager.append_log(job_id, text)
+            chunks += 1
+    elapsed = time.perf_counter() - started
+
+    # A log viewer reading the whole job from the start
+    read_started = time.perf_counter()
+    offset = 0
+    while True:
+        data, offset = job_manager.get_job_log_chunk(job_id, offset)
+        if not data:
+            break
+    read_elapsed = time.perf_counter() - read_started
+    job_manager.delete_job(job_id)
+    return {'chunks': chunks, 'seconds': round(elapsed, 3),
+            'mbPerSecond': round(size / 1024 / 1024 / elapsed, 1),
+            'readSeconds': round(read_elapsed, 3)}
+
+
+def bench_index(path, size, index):
+    started = time.perf_counter()
+    index.add_file('bench', 'acp-import', path, 'acp-log')
+    index.flush(timeout=24 * 3600)
+    elapsed = time.perf_counter() - started
+    db_bytes = sum(os.path.getsize(index.db_path + suffix)
+                   for suffix in ('', '-wal') if os.path.exists(index.db_path + suffix))
+    return {'seconds': round(elapsed, 3), 'mbPerSecond': round(size / 1024 / 1024 / elapsed, 1),
+            'dbBytes': db_bytes, 'dbRatio': round(db_bytes / size, 2)}
+
+
+def bench_search(path, index):
+    queries = {
+        'rare': (rare_term(path), False),
+        'common': ('Skipped', False),
+        'terms': ('ERROR could not', False),
+        'phrase': ('"could not be found"', True),
+    }
+    result = {}
+    for label, (query, raw) in queries.items():
+        latencies = []
+        hits = 0
+        for _ in range(SEARCH_REPEATS):
+            started = time.perf_counter()
+            hits = len(index.search(query, limit=50, raw=raw))
+            latencies.append((time.perf_counter() - started) * 1000)
+        result[label] = {'query': query, 'hits': hits,
+                         'p50Ms': round(percentile(latencies, 50), 2),
+                         'p95Ms': round(percentile(latencies, 95), 2)}
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', default='10MB,100MB',
+                        help='comma-separated log sizes, e.g. 10MB,100MB,1GB')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--stages', default=','.join(STAGES))
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='process pool size for the parallel parse')
+    parser.add_argument('--cache-dir', default=os.path.join(tempfile.gettempdir(), 'acp-bench-logs'),
+                        help='where generated logs are kept between runs')
+    parser.add_argument('--save', metavar='PATH', help='write results as JSON')
+    args = parser.parse_args()
+
+    sizes = [parse_size(s) for s in args.sizes.split(',') if s.strip()]
+    stages = [s.strip() for s in args.stages.split(',') if s.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(sorted(unknown))}")
+
+    scratch = tempfile.mkdtemp(prefix='bench-log-scale-')
+    os.environ['WORK_DIR'] = os.path.join(scratch, 'work')
+    # append measures job log storage on its own; the index stage measures indexing
+    os.environ['LOG_INDEX_ENABLED'] = 'false'
+    from app.services.log_index import LogIndex
+
+    results = []
+    for size in sizes:
+        label = format_size(size)
+        started = time.perf_counter()
+        path = cached_log(args.cache_dir, size, args.seed)
+        entry = {'size': label, 'bytes': os.path.getsize(path), 'seed': args.seed,
+                 'prepareSeconds': round(time.perf_counter() - started, 2)}
+        print(f"== {label} ({entry['bytes']:,} bytes, seed {args.seed}) {path}")
+
+        if 'parse' in stages:
+            entry['parse'] = bench_parse(path, entry['bytes'], args.workers)
+            for mode, stats in entry['parse'].items():
+                print(f"parse {mode:<8} {stats['seconds']:>9.3f}s {stats['mbPerSecond']:>8.1f} MB/s "
+                      f"{stats['lines']:>10,} lines {stats['errors']:>7,} errors")
+        if 'append' in stages:
+            entry['append'] = stats = bench_append(path, entry['bytes'])
+            print(f"append          {stats['seconds']:>9.3f}s {stats['mbPerSecond']:>8.1f} MB/s "
+                  f"{stats['chunks']:>10,} chunks, full read {stats['readSeconds']:.3f}s")
+        if 'index' in stages or 'search' in stages:
+            index = LogIndex(os.path.join(scratch, f'log_index-{label}.db'))
+            entry['index'] = stats = bench_index(path, entry['bytes'], index)
+            print(f"index           {stats['seconds']:>9.3f}s {stats['mbPerSecond']:>8.1f} MB/s "
+                  f"db {stats['dbBytes']:,} bytes ({stats['dbRatio']}x)")
+            if 'search' in stages:
+                entry['search'] = bench_search(path, index)
+                for kind, stats in entry['search'].items():
+                    print(f"search {kind:<8} p50 {stats['p50Ms']:>8.2f} ms p95 {stats['p95Ms']:>8.2f} ms "
+                          f"{stats['hits']:>3} hits  {stats['query']}")
+        entry['peakRssMb'] = round(peak_rss_mb(), 1)
+        print(f"peak RSS {entry['peakRssMb']} MB")
+        results.append(entry)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'results written to {args.save}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark cold start of the Flask app
+
+Starts a fresh interpreter N times, each importing the app and calling
+create_app() against an empty scratch work directory, and reports the
+time to a ready app object. Exits non-zero when the median exceeds the
+budget, so it can gate changes that add import-time work.
+
+    python benchmarks/bench_startup.py --runs 10 --budget-ms 300
+    python benchmarks/bench_startup.py --importtime 15
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_PROBE = (
+    'import sys, time\n'
+    'started = time.perf_counter()\n'
+    f'sys.path.insert(0, {ROOT!r})\n'
+    'from app import create_app\n'
+    'create_app()\n'
+    'print((time.perf_counter() - started) * 1000)\n'
+)
+
+_importtime_re = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|\s*(\S+)$')
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def run_once(extra_args=()):
+    scratch = tempfile.mkdtemp(prefix='bench-startup-')
+    env = dict(os.environ, WORK_DIR=os.path.join(scratch, 'work'))
+    return subprocess.run([sys.executable, *extra_args, '-c', _PROBE], cwd=scratch, env=env,
+                          capture_output=True, text=True, check=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--budget-ms', type=float, default=300.0,
+                        help='fail if the median time to create_app() exceeds this')
+    parser.add_argument('--importtime', type=int, default=0, metavar='N',
+                        help='also list the N imports with the most self time in one run')
+    args = parser.parse_args()
+
+    # Warm-up run so .pyc compilation is not counted
+    run_once()
+    timings = [float(run_once().stdout.strip().splitlines()[-1]) for _ in range(args.runs)]
+
+    p50 = percentile(timings, 50)
+    print(f'{args.runs} cold starts, budget {args.budget_ms:.0f} ms')
+    print(f"{'p50 ms':>8} {'p95 ms':>8} {'min ms':>8} {'max ms':>8}")
+    print(f'{p50:>8.1f} {percentile(timings, 95):>8.1f} {min(timings):>8.1f} {max(timings):>8.1f}')
+
+    if args.importtime:
+        imports = []
+        for line in run_once(['-X', 'importtime']).stderr.splitlines():
+            match = _importtime_re.match(line)
+            if match:
+                imports.append((int(match.group(1)), int(match.group(2)), match.group(3)))
+        print(f"\n{'module':<40} {'self ms':>8} {'cumul. ms':>10}")
+        for self_us, cumulative_us, module in sorted(imports, reverse=True)[:args.importtime]:
+            print(f'{module:<40} {self_us / 1000:>8.1f} {cumulative_us / 1000:>10.1f}')
+
+    if p50 > args.budget_ms:
+        print(f'FAIL: median startup {p50:.1f} ms exceeds budget {args.budget_ms:.0f} ms')
+        sys.exit(1)
+    print('OK: within budget')
+
+
+if __name__ == '__main__':
+    main()
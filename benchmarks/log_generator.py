@@ -0,0 +1,274 @@
+"""
+Generate large synthetic ACP program logs from the shipped samples
+
+LogModel reads app/demo_logs and learns the structure of the samples:
+- the start banner and property tables, emitted once
+- configuration section titles
+- the object paths in the result tables, and the observed action/result mix
+- per-object error lines, turned into templates with the quoted names as slots
+- [LEVEL] tag frequencies
+- the closing banner
+
+SyntheticLogGenerator then writes statistically similar logs of any size.
+Each section is a result table, its detail error lines and its copy
+statistics. A fixed seed always produces the same bytes.
+
+    python benchmarks/log_generator.py --size 100MB --seed 1 -o /tmp/import-100mb.log
+"""
+import argparse
+import os
+import random
+import re
+import sys
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEMO_LOGS = os.path.join(ROOT, 'app', 'demo_logs')
+
+RULE = '=' * 66
+_title_re = re.compile(r'^=+ (\S.*?)\s+=+$')
+# Result table row: action and result in fixed-width columns, then a dotted object path
+_row_re = re.compile(r'^\t[A-Za-z]* *\s{1,}.{26}\S+\.\S')
+_error_re = re.compile(r'^\s+\d+\)\s+ERROR:\s*(.+)$')
+_level_re = re.compile(r'\[(ERROR|WARN|WARNING|INFO|DEBUG|SEVERE|FATAL)\]')
+_quoted_re = re.compile(r'"[^"]*"')
+_run_start_re = re.compile(r'^Run Start Date: .*$')
+
+# Used when the samples have too little of something to learn from
+DEFAULT_LEVELS = {'INFO': 90, 'WARN': 8, 'ERROR': 2}
+DEFAULT_ERROR_TEMPLATES = [
+    'The List object identified by the name {name} could not be found.',
+    'The attribute identified by the name {name} does not exist on the target.',
+    'Unable to update {name}: the object is locked by another user.',
+]
+DEFAULT_OUTCOMES = {('Update', 'Succeeded'): 6, ('Update', 'No Action Needed'): 3,
+                    ('Create', 'Succeeded'): 2, ('Skipped', ''): 8, ('Update', 'Failed'): 1}
+STAT_LABELS = ('Attempted', 'Skipped', 'No Action Needed', 'Not Licensed', 'Created',
+               'Updated', 'Exported', 'with Warnings', 'Failed')
+
+
+def parse_size(text: str) -> int:
+    """'10MB', '1.5GB', '512KB' or a byte count"""
+    match = re.fullmatch(r'\s*([\d.]+)\s*([KMG]?)B?\s*', text.upper())
+    if not match:
+        raise argparse.ArgumentTypeError(f'invalid size: {text}')
+    return int(float(match.group(1)) * 1024 ** ' KMG'.index(match.group(2) or ' '))
+
+
+def format_size(size: int) -> str:
+    for unit in ('GB', 'MB', 'KB'):
+        factor = 1024 ** ' KMG'.index(unit[0])
+        if size >= factor and size % factor == 0:
+            return f'{size // factor}{unit}'
+    return f'{size}B'
+
+
+class LogModel:
+    """Structure and frequencies learned from sample logs"""
+
+    def __init__(self):
+        self.header: List[str] = []
+        self.footer: List[str] = []
+        self.titles: List[str] = []
+        self.path_parts: List[List[str]] = []
+        self.outcomes: Counter = Counter()
+        self.error_templates: List[str] = []
+        self.names: List[str] = []
+        self.levels: Counter = Counter()
+
+    @classmethod
+    def learn(cls, paths: List[str]) -> 'LogModel':
+        model = cls()
+        parts_by_depth: Dict[int, set] = {}
+        for path in paths:
+            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                lines = f.read().splitlines()
+            model._learn_lines(lines, parts_by_depth)
+        model.path_parts = [sorted(parts_by_depth[d]) for d in sorted(parts_by_depth)]
+
+        if not model.outcomes:
+            model.outcomes.update(DEFAULT_OUTCOMES)
+        if not any(result == 'Failed' for _, result in model.outcomes):
+            # Samples are clean runs; keep a small failure share so error paths get exercised
+            model.outcomes[('Update', 'Failed')] = max(1, sum(model.outcomes.values()) // 50)
+        if not model.error_templates:
+            model.error_templates = list(DEFAULT_ERROR_TEMPLATES)
+        if not model.names:
+            model.names = ['"Pack Style (API Name=PackStyle)"']
+        if not model.levels:
+            model.levels.update(DEFAULT_LEVELS)
+        if not model.titles:
+            model.titles = ['Subclass']
+        return model
+
+    def _learn_lines(self, lines: List[str], parts_by_depth: Dict[int, set]) -> None:
+        # The longest banner/properties preamble and closing banner win
+        first_table = next((i for i, line in enumerate(lines) if line.startswith('\tAction    Result')), None)
+        if first_table is not None:
+            start = first_table
+            while start > 0 and not _title_re.match(lines[start]):
+                start -= 1
+            if start > len(self.header):
+                self.header = lines[:start]
+        end = next((i for i, line in enumerate(lines) if line.startswith('Run End Date:')), None)
+        if end is not None and len(lines) - end > len(self.footer):
+            self.footer = lines[end:]
+
+        in_table = False
+        for line in lines:
+            title = _title_re.match(line)
+            if title:
+                name = title.group(1).strip()
+                if name not in ('Start of Program', 'End of Program', 'Program Settings',
+                                'Program Properties', 'Control Settings', 'Program Actions') \
+                        and name not in self.titles:
+                    self.titles.append(name)
+                in_table = False
+                continue
+            if line.startswith('\tAction    Result'):
+                in_table = True
+                continue
+            if line.startswith(('\tPattern Matching', '\tCopy Statistics')):
+                in_table = False
+            if in_table and _row_re.match(line):
+                action, result, obj = line[1:11].strip(), line[11:37].strip(), line[37:].strip()
+                self.outcomes[(action, result)] += 1
+                for depth, part in enumerate(obj.split('.')):
+                    parts_by_depth.setdefault(depth, set()).add(part)
+                continue
+            error = _error_re.match(line)
+            if error:
+                message = error.group(1)
+                self.names.extend(_quoted_re.findall(message))
+                template = _quoted_re.sub('{name}', message)
+                if template not in self.error_templates:
+                    self.error_templates.append(template)
+            for level in _level_re.findall(line):
+                self.levels[level.upper()] += 1
+
+
+class SyntheticLogGenerator:
+    """Writes ACP-like logs of a requested size from a LogModel"""
+
+    def __init__(self, model: LogModel, seed: int = 0, rows_per_section: Tuple[int, int] = (20, 400),
+                 level_rate: float = 0.05, start: Optional[datetime] = None):
+        self.model = model
+        self.rnd = random.Random(seed)
+        self.rows_per_section = rows_per_section
+        self.level_rate = level_rate
+        self.clock = start or datetime(2026, 1, 5, 9, 30, 0)
+        self._outcomes = list(model.outcomes)
+        self._outcome_weights = [model.outcomes[o] for o in self._outcomes]
+        self._levels = list(model.levels)
+        self._level_weights = [model.levels[level] for level in self._levels]
+
+    def _object_path(self) -> str:
+        parts = [self.rnd.choice(level) for level in self.model.path_parts[:-1]]
+        leaf = self.rnd.choice(self.model.path_parts[-1]) if self.model.path_parts else 'Object'
+        # Production configurations hold thousands of distinct objects; vary the leaf
+        return '.'.join(parts + [f'{leaf} {self.rnd.randint(1, 99999):05d}'])
+
+    def _section(self) -> Iterator[str]:
+        title = self.rnd.choice(self.model.titles)
+        yield f' {title}  '.center(len(RULE), '=')
+        yield ''
+        yield '\tAction    Result                    Configuration Object' + ' ' * 55
+        yield '\t-------   -----------------------   ' + '-' * 75
+        stats = Counter()
+        for _ in range(self.rnd.randint(*self.rows_per_section)):
+            action, result = self.rnd.choices(self._outcomes, self._outcome_weights)[0]
+            yield f'\t{action:<10}{result:<26}{self._object_path()}'
+            stats['Attempted'] += 1
+            if action == 'Skipped':
+                stats['Skipped'] += 1
+            elif result == 'Failed':
+                stats['Failed'] += 1
+                template = self.rnd.choice(self.model.error_templates)
+                yield f'\t\t   1) ERROR: {template.format(name=self.rnd.choice(self.model.names))}'
+                yield ''
+            elif result == 'No Action Needed':
+                stats['No Action Needed'] += 1
+            elif action == 'Create':
+                stats['Created'] += 1
+            elif action == 'Export':
+                stats['Exported'] += 1
+            else:
+                stats['Updated'] += 1
+            if self.rnd.random() < self.level_rate:
+                self.clock += timedelta(milliseconds=self.rnd.randint(5, 2000))
+                level = self.rnd.choices(self._levels, self._level_weights)[0]
+                yield f'[{level}] {self.clock:%Y-%m-%d %H:%M:%S} {title}: processed row {stats["Attempted"]}'
+        yield ''
+        yield ''
+        yield '\tCopy Statistics'
+        yield '\t---------------'
+        for label in STAT_LABELS:
+            yield f'\t   Objects {label + ":":<22}{stats[label]:>7}'
+        yield ''
+        seconds = self.rnd.uniform(0.1, 30)
+        yield f'\t   Processing Time:            0:0:{int(seconds) // 60}:{seconds % 60:.3f}'
+        yield ''
+        yield RULE
+        yield ''
+
+    def write(self, out: TextIO, size: int) -> int:
+        """Write about `size` bytes of log to out; returns the bytes written"""
+        written = 0
+
+        def emit(lines):
+            nonlocal written
+            text = '\n'.join(lines) + '\n'
+            out.write(text)
+            written += len(text.encode('utf-8'))
+
+        emit(_run_start_re.sub(f'Run Start Date: {self.clock:%b %d, %Y %I:%M:%S %p}', line)
+             for line in self.model.header)
+        footer = '\n'.join(self.model.footer) + '\n'
+        while written + len(footer) < size:
+            emit(self._section())
+        out.write(footer)
+        return written + len(footer.encode('utf-8'))
+
+    def write_file(self, path: str, size: int) -> int:
+        with open(path, 'w', encoding='utf-8', newline='\n') as f:
+            return self.write(f, size)
+
+
+def default_model() -> LogModel:
+    return LogModel.learn([os.path.join(DEMO_LOGS, name)
+                           for name in ('export.log', 'import.log') if os.path.exists(os.path.join(DEMO_LOGS, name))])
+
+
+def cached_log(directory: str, size: int, seed: int) -> str:
+    """Path of a generated log of this size and seed, generating it on first use"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'synthetic-{format_size(size)}-seed{seed}.log')
+    if not os.path.exists(path):
+        partial = path + '.partial'
+        SyntheticLogGenerator(default_model(), seed=seed).write_file(partial, size)
+        os.replace(partial, path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--size', type=parse_size, default=parse_size('10MB'),
+                        help='approximate output size, e.g. 10MB, 1GB')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--level-rate', type=float, default=0.05,
+                        help='fraction of table rows followed by a [LEVEL] line')
+    parser.add_argument('-o', '--output', help='output file (default stdout)')
+    args = parser.parse_args()
+
+    generator = SyntheticLogGenerator(default_model(), seed=args.seed, level_rate=args.level_rate)
+    if args.output:
+        written = generator.write_file(args.output, args.size)
+        print(f'{written:,} bytes written to {args.output}', file=sys.stderr)
+    else:
+        generator.write(sys.stdout, args.size)
+
+
+if __name__ == '__main__':
+    main()
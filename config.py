@@ -8,7 +8,94 @@ class Config:
     ACP_EXPORT_CMD = os.getenv('ACP_EXPORT_CMD', './acp export')
     ACP_IMPORT_CMD = os.getenv('ACP_IMPORT_CMD', './acp import')
     AVERIFY_CMD = os.getenv('AVERIFY_CMD', './averify')
+    # JSON fault-injection scenario; when set, jobs run the fake acp/averify and a
+    # local SSH stand-in instead of the real programs (see app/faults)
+    FAULT_SCENARIO = os.getenv('FAULT_SCENARIO', '')
+    # Optional JSON file with parser rule profiles (see docs/ACP_LOG_ANALYSIS.md)
+    PARSER_RULES_FILE = os.getenv('PARSER_RULES_FILE', '')
+    # Parsed log analyses, keyed by log content hash and rule profile version
+    ANALYSIS_CACHE_DIR = os.getenv(
+        'ANALYSIS_CACHE_DIR', os.path.join(WORK_DIR, 'analysis-cache'))
+    ANALYSIS_CACHE_SIZE = int(os.getenv('ANALYSIS_CACHE_SIZE', '256'))
+    ANALYSIS_CACHE_DISK_ENTRIES = int(
+        os.getenv('ANALYSIS_CACHE_DISK_ENTRIES', '5000'))
+    # Full-text index of job log lines (SQLite FTS5)
+    LOG_INDEX_ENABLED = os.getenv('LOG_INDEX_ENABLED', 'true').lower() == 'true'
+    LOG_INDEX_PATH = os.getenv(
+        'LOG_INDEX_PATH', os.path.join(WORK_DIR, 'log_index.db'))
+    # Cross-job error signature aggregates
+    ROLLUP_DB_PATH = os.getenv(
+        'ROLLUP_DB_PATH', os.path.join(WORK_DIR, 'rollups.db'))
+    # Environment reachability probes (interval 0 disables background probing)
+    PROBE_WORKERS = int(os.getenv('PROBE_WORKERS', '8'))
+    PROBE_TIMEOUT_SECONDS = float(os.getenv('PROBE_TIMEOUT_SECONDS', '3'))
+    PROBE_TTL_SECONDS = float(os.getenv('PROBE_TTL_SECONDS', '60'))
+    PROBE_INTERVAL_SECONDS = float(os.getenv('PROBE_INTERVAL_SECONDS', '0'))
+    # Identical exports (same host, product line and config XML) share one job:
+    # while it runs, and for this many seconds after it succeeds
+    EXPORT_COALESCING = os.getenv('EXPORT_COALESCING', 'true').lower() == 'true'
+    EXPORT_FRESHNESS_SECONDS = float(os.getenv('EXPORT_FRESHNESS_SECONDS', '300'))
+    # Durable cache of export bundles by (source env, product line, config hash)
+    EXPORT_CACHE_ENABLED = os.getenv('EXPORT_CACHE_ENABLED', 'true').lower() == 'true'
+    EXPORT_CACHE_DIR = os.getenv('EXPORT_CACHE_DIR', os.path.join(WORK_DIR, 'export-cache'))
+    EXPORT_CACHE_TTL_SECONDS = float(os.getenv('EXPORT_CACHE_TTL_SECONDS', '86400'))
+    EXPORT_CACHE_MAX_BYTES = int(os.getenv('EXPORT_CACHE_MAX_BYTES', str(10 * 1024 ** 3)))
+    # Exports for environments with an acp_project_dir run in a per-job clone of it
+    WORKSPACES_ENABLED = os.getenv('WORKSPACES_ENABLED', 'true').lower() == 'true'
+    # Copied into the clone rather than hard-linked, since a run may rewrite them
+    WORKSPACE_COPY_PATTERNS = os.getenv('WORKSPACE_COPY_PATTERNS', '*.xml,*.properties,*.cfg,*.ini')
+    # Left out of the clone: bundles and logs from earlier runs
+    WORKSPACE_SKIP_PATTERNS = os.getenv('WORKSPACE_SKIP_PATTERNS', '*.zip,*.log')
+    # Fan-out imports: imports running at once per request, and per ACP host
+    FANOUT_MAX_CONCURRENCY = int(os.getenv('FANOUT_MAX_CONCURRENCY', '4'))
+    FANOUT_MAX_PER_HOST = int(os.getenv('FANOUT_MAX_PER_HOST', '2'))
+    # Resource scheduling: optional caps on jobs running at once per ACP host,
+    # and jobs reading one environment at once (0 = no limit); writers to an
+    # environment always run alone
+    SCHEDULER_MAX_PER_HOST = int(os.getenv('SCHEDULER_MAX_PER_HOST', '0'))
+    SCHEDULER_MAX_READERS_PER_ENV = int(os.getenv('SCHEDULER_MAX_READERS_PER_ENV', '0'))
+    # Refuse job submissions whose environments fail the reachability probe
+    PREFLIGHT_CHECKS = os.getenv('PREFLIGHT_CHECKS', 'false').lower() == 'true'
+    # bcrypt hash of the admin password; empty keeps the demo password 'admin'.
+    # Generate with: python -c "import bcrypt; print(bcrypt.hashpw(b'...', bcrypt.gensalt()).decode())"
+    ADMIN_PASSWORD_HASH = os.getenv('ADMIN_PASSWORD_HASH', '')
+    # Users allowed to call /api/admin (request stats, profiling)
+    ADMIN_USERS = [u.strip() for u in os.getenv('ADMIN_USERS', 'admin').split(',') if u.strip()]
+    # Requests at least this slow are logged and kept for /api/admin/requests/slow
+    SLOW_REQUEST_MS = float(os.getenv('SLOW_REQUEST_MS', '1000'))
+    SLOW_REQUEST_LOG_SIZE = int(os.getenv('SLOW_REQUEST_LOG_SIZE', '200'))
+    # Bearer token required to scrape /metrics; empty leaves it open
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+    # Verified bearer tokens remembered until their own expiry
+    TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', '1024'))
+    # Password hashing runs on its own small pool so login bursts cannot
+    # tie up the workers serving job status polls
+    LOGIN_WORKERS = int(os.getenv('LOGIN_WORKERS', '2'))
+    LOGIN_MAX_PENDING = int(os.getenv('LOGIN_MAX_PENDING', '16'))
+    LOGIN_TIMEOUT_SECONDS = float(os.getenv('LOGIN_TIMEOUT_SECONDS', '10'))
+    # Negotiated gzip/brotli compression of JSON and text responses
+    COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', 'true').lower() == 'true'
+    COMPRESSION_MIN_BYTES = int(os.getenv('COMPRESSION_MIN_BYTES', '1024'))
+    COMPRESSION_GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', '6'))
+    COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', '4'))
+    # Output of `flask --app run build-static`; served in preference to app/static
+    STATIC_BUILD_DIR = os.getenv('STATIC_BUILD_DIR', os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'app', 'static-build'))
+    # Cache lifetime for static files that are not fingerprinted
+    STATIC_MAX_AGE_SECONDS = int(os.getenv('STATIC_MAX_AGE_SECONDS', '300'))
     DEMO_MODE = os.getenv('DEMO_MODE', 'true').lower(
     ) == 'true'  # Demo mode enabled by default
     # Duration in seconds
-    DEMO_JOB_DURATION = int(os.getenv('DEMO_JOB_DURATION', '60'))
+    DEMO_JOB_DURATION = float(os.getenv('DEMO_JOB_DURATION', '60'))
+    # Simulated log lines per second per job; 0 spreads the log over DEMO_JOB_DURATION
+    DEMO_LINE_RATE = float(os.getenv('DEMO_LINE_RATE', '0'))
+    # Repeat the body of the sample logs to simulate bigger runs (1 = as shipped)
+    DEMO_LOG_MULTIPLIER = float(os.getenv('DEMO_LOG_MULTIPLIER', '1'))
+    # Random +/- fraction applied to the delay before each simulated line
+    DEMO_JITTER = float(os.getenv('DEMO_JITTER', '0.3'))
+    # Fraction of simulated jobs that fail part way with an ACP exit code 2-9
+    DEMO_FAILURE_RATE = float(os.getenv('DEMO_FAILURE_RATE', '0'))
+    # Seed for jitter and failure injection; empty for a random run
+    DEMO_SEED = os.getenv('DEMO_SEED', '')
+    # How often the simulator wakes up to emit due lines
+    DEMO_TICK_MS = float(os.getenv('DEMO_TICK_MS', '50'))
@@ -0,0 +1,15 @@
+"""
+Shared test setup. Config is read at import time, so the environment is
+pointed at a throwaway work directory before any app module is imported.
+"""
+import os
+import sys
+import tempfile
+
+_work_dir = tempfile.mkdtemp(prefix='acp-tests-')
+os.environ.setdefault('WORK_DIR', _work_dir)
+os.environ.setdefault('DEMO_JOB_DURATION', '0.2')
+os.environ.setdefault('DEMO_JITTER', '0')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(_work_dir)
@@ -0,0 +1,42 @@
+import os
+
+import pytest
+
+from app.services.acp_log_parser import ACPLogParser
+
+DEMO_LOGS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app', 'demo_logs')
+
+
+def _demo_log(name: str) -> str:
+    with open(os.path.join(DEMO_LOGS, name), encoding='utf-8') as f:
+        return f.read()
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    # Send even the sample logs through the process pool, a few KB per chunk
+    monkeypatch.setattr(ACPLogParser, 'PARALLEL_MIN_BYTES', 0)
+    monkeypatch.setattr(ACPLogParser, 'CHUNK_MIN_BYTES', 4096)
+
+
+@pytest.mark.parametrize('name', ['export.log', 'import.log', 'filecopy.log'])
+@pytest.mark.parametrize('exit_code', [0, 1])
+def test_parse_file_matches_parse_log(tmp_path, small_chunks, name, exit_code):
+    # Repeat the sample so errors and item counts land in several chunks, and drop the final newline
+    text = (_demo_log(name) * 4).rstrip('\n')
+    path = tmp_path / name
+    path.write_text(text, encoding='utf-8')
+    assert len(ACPLogParser._chunk_bounds(str(path), len(text.encode()), 2)) > 1
+
+    from_file = ACPLogParser.parse_file(str(path), exit_code, workers=2)
+    from_text = ACPLogParser.parse_log(text, exit_code)
+    assert from_file.to_dict() == from_text.to_dict()
+    assert from_file.errors == from_text.errors
+    assert from_file.warnings == from_text.warnings
+
+
+def test_small_file_is_parsed_in_process(tmp_path):
+    text = _demo_log('import.log')
+    path = tmp_path / 'import.log'
+    path.write_text(text, encoding='utf-8')
+    assert ACPLogParser.parse_file(str(path)).to_dict() == ACPLogParser.parse_log(text).to_dict()
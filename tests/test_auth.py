@@ -0,0 +1,97 @@
+import os
+import re
+import time
+
+import jwt
+import pytest
+
+from app import create_app
+from app.models.user import ADMIN_USER
+from app.routes.auth import token_cache
+from config import Config
+
+STATIC_APPS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'app', 'static', 'apps')
+
+
+@pytest.fixture
+def client():
+    token_cache.clear()
+    return create_app().test_client()
+
+
+def _token(**claims):
+    payload = {'sub': ADMIN_USER.username, 'exp': int(time.time()) + 60, **claims}
+    return jwt.encode(payload, Config.SECRET_KEY, algorithm='HS256')
+
+
+def test_api_requires_a_bearer_token(client):
+    assert client.get('/api/jobs/').status_code == 401
+    assert client.get('/api/environments').status_code == 401
+    assert client.get('/api/jobs/', headers={'Authorization': 'Bearer nope'}).status_code == 401
+
+
+def test_login_is_open(client):
+    response = client.post('/api/auth/login', json={'username': 'admin', 'password': 'wrong'})
+    assert response.status_code == 401
+    assert response.get_json() == {'error': 'Invalid credentials'}
+
+
+def test_verified_tokens_are_cached(client):
+    token = _token()
+    assert not token_cache.is_valid(token)
+    assert client.get('/api/jobs/', headers={'Authorization': f'Bearer {token}'}).status_code == 200
+    assert token_cache.is_valid(token)
+    assert client.get('/api/jobs/', headers={'Authorization': f'Bearer {token}'}).status_code == 200
+
+
+def test_expired_token_is_rejected(client):
+    token = _token(exp=int(time.time()) - 1)
+    response = client.get('/api/jobs/', headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 401
+    assert response.get_json() == {'error': 'Token expired'}
+    assert not token_cache.is_valid(token)
+
+
+def test_file_copy_accepts_the_ui_header(client):
+    token = _token()
+    response = client.post('/api/jobs/filecopy/run', json={'targetEnv': 'QA'},
+                           headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 200
+    assert 'jobId' in response.get_json()
+    response = client.post('/api/jobs/filecopy/run', json={'targetEnv': 'QA'},
+                           headers={'Authorization': f'Bearer{token}'})
+    assert response.status_code == 401
+
+
+def test_ui_sends_bearer_with_a_space():
+    # require_auth only accepts "Bearer <token>"; an explicit header overrides the Ext default
+    bad = []
+    for root, _, files in os.walk(STATIC_APPS):
+        for name in files:
+            if name.endswith('.js'):
+                path = os.path.join(root, name)
+                with open(path, encoding='utf-8') as f:
+                    for number, line in enumerate(f, 1):
+                        if re.search(r'[\'"`]Bearer(?! )', line):
+                            bad.append(f'{os.path.relpath(path, STATIC_APPS)}:{number}')
+    assert bad == []
+
+
+def test_admin_routes_share_the_token_cache(client):
+    token = _token()
+    headers = {'Authorization': f'Bearer {token}'}
+    assert client.get('/api/admin/requests', headers=headers).status_code == 200
+    assert token_cache.get(token)['sub'] == ADMIN_USER.username
+    # Served from the cache, with the role still checked
+    assert client.get('/api/admin/requests', headers=headers).status_code == 200
+
+
+def test_admin_routes_require_an_admin(client):
+    assert client.get('/api/admin/requests').status_code == 401
+    response = client.get('/api/admin/requests', headers={'Authorization': f"Bearer {_token(sub='viewer')}"})
+    assert response.status_code == 403
+    assert response.get_json() == {'error': 'Admin access required'}
+    token = _token(sub='viewer')
+    assert client.get('/api/jobs/', headers={'Authorization': f'Bearer {token}'}).status_code == 200
+    assert client.get('/api/admin/requests', headers={'Authorization': f'Bearer {token}'}).status_code == 403
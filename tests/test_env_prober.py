@@ -0,0 +1,46 @@
+import socket
+import threading
+from types import SimpleNamespace
+
+from app.services.env_prober import EnvironmentProber, check_http
+
+
+def _plain_tcp_server():
+    """A port that answers, but not with TLS"""
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen(1)
+
+    def serve():
+        conn, _ = server.accept()
+        with conn:
+            conn.recv(1024)
+            conn.sendall(b'HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\n\r\n')
+        server.close()
+
+    threading.Thread(target=serve, daemon=True).start()
+    return server.getsockname()[1]
+
+
+def test_tls_failure_counts_as_reachable():
+    port = _plain_tcp_server()
+    result = check_http(f'https://127.0.0.1:{port}/Agile', timeout=2)
+    assert result['ok'] is True
+    assert result['tlsError']
+
+
+def test_closed_port_is_down():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    assert check_http(f'http://127.0.0.1:{port}/', timeout=2)['ok'] is False
+
+
+def test_malformed_port_is_misconfigured():
+    result = check_http('http://agile.example.com:80x/Agile', timeout=2)
+    assert result['ok'] is None and result['misconfigured']
+
+    env = SimpleNamespace(tag='BAD', agile_plm_url='http://agile.example.com:99999/Agile',
+                          dest_jdbc_url='', dest_tns_name='', dest_oracle_home='')
+    assert EnvironmentProber(timeout=2).probe(env)['status'] == 'misconfigured'
@@ -0,0 +1,133 @@
+import json
+import os
+import time
+
+import pytest
+
+from app.services.export_cache import META_FILE, ExportCache
+from app.services.job_launcher import config_digest, job_launcher
+from app.services.job_manager import job_manager
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ExportCache(str(tmp_path / 'cache'), ttl_seconds=60, max_bytes=1024)
+
+
+def _put(cache, tmp_path, source_env, product_line, content=b'bundle'):
+    work_dir = tmp_path / f'job-{source_env}-{product_line}'
+    work_dir.mkdir(exist_ok=True)
+    bundle = work_dir / 'export.zip'
+    bundle.write_bytes(content)
+    key = cache.key(source_env, product_line, 'cfg')
+    assert cache.put(key, source_env, product_line, 'cfg', {bundle.name: str(bundle)},
+                     work_dir=str(work_dir))
+    return key
+
+
+def _set_meta(cache, key, **fields):
+    path = os.path.join(cache.cache_dir, key, META_FILE)
+    with open(path) as f:
+        meta = json.load(f)
+    meta.update(fields)
+    with open(path, 'w') as f:
+        json.dump(meta, f)
+    return path
+
+
+def test_only_work_dir_outputs_are_linked(cache, tmp_path):
+    work_dir = tmp_path / 'job'
+    shared = tmp_path / 'project'
+    work_dir.mkdir()
+    shared.mkdir()
+    (work_dir / 'export.zip').write_bytes(b'bundle')
+    (shared / 'export.xml').write_text('<v1/>')
+    key = cache.key('DEV', 'PL1', 'cfg')
+    cache.put(key, 'DEV', 'PL1', 'cfg', {'export.zip': str(work_dir / 'export.zip'),
+                                         'export.xml': str(shared / 'export.xml')},
+              work_dir=str(work_dir))
+
+    files = cache.get(key)['files']
+    assert os.stat(files['export.zip']).st_ino == (work_dir / 'export.zip').stat().st_ino
+    # The next export in the shared directory rewrites the file in place
+    with open(shared / 'export.xml', 'r+') as f:
+        f.write('<v2/>')
+    with open(files['export.xml']) as f:
+        assert f.read() == '<v1/>'
+
+
+def test_entries_expire(cache, tmp_path):
+    key = _put(cache, tmp_path, 'DEV', 'PL1')
+    assert cache.get(key) is not None
+    _set_meta(cache, key, createdAt=time.time() - 61)
+    assert cache.get(key) is None
+    assert cache.prune() == 1
+    assert not os.path.exists(os.path.join(cache.cache_dir, key))
+
+
+def test_least_recently_used_entries_are_evicted(cache, tmp_path):
+    cache.max_bytes = 10
+    first = _put(cache, tmp_path, 'DEV', 'PL1', b'1234')
+    second = _put(cache, tmp_path, 'DEV', 'PL2', b'1234')
+    os.utime(_set_meta(cache, first), (100, 100))
+    os.utime(_set_meta(cache, second), (200, 200))
+    # Reading the first entry makes the second the least recently used
+    assert cache.get(first) is not None
+
+    third = _put(cache, tmp_path, 'DEV', 'PL3', b'1234')
+    assert cache.get(second) is None
+    assert cache.get(first) is not None
+    assert cache.get(third) is not None
+
+
+def test_invalidate(cache, tmp_path):
+    _put(cache, tmp_path, 'DEV', 'PL1')
+    _put(cache, tmp_path, 'DEV', 'PL2')
+    qa = _put(cache, tmp_path, 'QA', 'PL1')
+    assert cache.invalidate('DEV', 'PL1') == 1
+    assert cache.invalidate('DEV') == 1
+    assert [e['sourceEnv'] for e in cache.stats()['entries']] == ['QA']
+    assert cache.get(qa) is not None
+
+
+@pytest.fixture
+def cached_export(tmp_path, monkeypatch):
+    """An export body with a cached bundle; scheduled exports are recorded, not run"""
+    monkeypatch.setattr(job_launcher, '_schedule', lambda job_type, job_id, body: None)
+    cache = ExportCache(str(tmp_path / 'cache'), ttl_seconds=60, max_bytes=1024)
+    monkeypatch.setattr('app.services.job_launcher.export_cache', cache)
+    config = tmp_path / 'config.xml'
+    config.write_text(f'<config name="{tmp_path.name}"/>')
+    bundle = tmp_path / 'export_PL1.zip'
+    bundle.write_bytes(b'bundle')
+    config_hash = config_digest(str(config))
+    cache.put(cache.key('DEV', 'PL1', config_hash), 'DEV', 'PL1', config_hash,
+              {bundle.name: str(bundle)})
+    return {'host': 'acp01', 'sourceEnv': 'DEV', 'productLine': 'PL1', 'xmlConfig': str(config)}
+
+
+def _wait_finished(job_id):
+    job = job_manager.get_job(job_id)
+    deadline = time.monotonic() + 5
+    while job.finished_at is None and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return job
+
+
+def test_cache_policy_use_serves_the_cached_bundle(cached_export):
+    job = _wait_finished(job_launcher.start('acp-export', cached_export))
+    assert job.status == 'success'
+    assert 'Served from export cache' in job.log
+    assert job.id not in job_launcher._cache_pending
+
+
+def test_cache_policy_refresh_exports_and_recaches(cached_export):
+    job_id = job_launcher.start('acp-export', dict(cached_export, cachePolicy='refresh'))
+    assert 'Served from export cache' not in job_manager.get_job(job_id).log
+    assert job_launcher._cache_pending[job_id][1:3] == ('DEV', 'PL1')
+
+
+def test_cache_policy_bypass_leaves_the_cache_alone(cached_export):
+    job_id = job_launcher.start('acp-export', dict(cached_export, cachePolicy='bypass'))
+    assert 'Served from export cache' not in job_manager.get_job(job_id).log
+    assert job_id not in job_launcher._cache_pending
@@ -0,0 +1,85 @@
+import time
+
+import pytest
+
+from app.services.fanout import FanOutManager
+from app.services.job_launcher import job_launcher
+from app.services.job_manager import job_manager
+
+
+@pytest.fixture
+def started(monkeypatch):
+    """Child job ids in the order they were started; they run until the test finishes them"""
+    ids = []
+    monkeypatch.setattr(job_launcher, 'start', lambda job_type, body, job_id=None: ids.append(job_id))
+    return ids
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert condition()
+
+
+def _finish(job_id, exit_code=0):
+    job_manager.complete_job(job_id, {'exit_code': exit_code, 'log': ''})
+
+
+def _submit(manager, targets):
+    parent = manager.submit({'host': 'acp01', 'targets': targets})
+    return parent, [parent.children[target] for target in targets]
+
+
+def test_children_share_the_concurrency_limit(started):
+    manager = FanOutManager(1, 1)
+    parent, (qa, uat) = _submit(manager, ['QA', 'UAT'])
+    _wait_for(lambda: started == [qa])
+    _finish(qa)
+    assert started == [qa, uat]
+    _finish(uat, exit_code=1)
+    _wait_for(lambda: parent.finished_at is not None)
+    assert parent.status == 'error'
+    assert parent.summary == 'Imported into 1 of 2 targets; failed: UAT'
+
+
+def test_deleting_a_running_child_frees_its_slot(started):
+    manager = FanOutManager(1, 1)
+    parent, (qa, uat) = _submit(manager, ['QA', 'UAT'])
+    _wait_for(lambda: started == [qa])
+    job_manager.delete_job(qa)
+    assert started == [qa, uat]
+    assert manager.child_counts() == {('queued',): 0, ('running',): 1}
+
+    _finish(uat)
+    _wait_for(lambda: parent.finished_at is not None)
+    assert parent.status == 'error'
+    assert parent.summary == 'Imported into 1 of 2 targets; failed: QA'
+
+    # Later fan-outs get the slot back
+    later, (prod,) = _submit(manager, ['PROD'])
+    _wait_for(lambda: started[-1] == prod)
+
+
+def test_deleting_a_queued_child(started):
+    manager = FanOutManager(1, 1)
+    parent, (qa, uat) = _submit(manager, ['QA', 'UAT'])
+    _wait_for(lambda: started == [qa])
+    job_manager.delete_job(uat)
+    _finish(qa)
+    _wait_for(lambda: parent.finished_at is not None)
+    assert started == [qa]
+    assert parent.summary == 'Imported into 1 of 2 targets; failed: UAT'
+
+
+def test_deleting_the_parent_fails_children_not_started(started):
+    manager = FanOutManager(1, 1)
+    parent, (qa, uat) = _submit(manager, ['QA', 'UAT'])
+    _wait_for(lambda: started == [qa])
+    job_manager.delete_job(parent.id)
+    assert job_manager.get_job(uat).status == 'error'
+    assert manager.child_counts() == {('queued',): 0, ('running',): 1}
+
+    _finish(qa)
+    assert started == [qa]
+    assert manager.child_counts() == {('queued',): 0, ('running',): 0}
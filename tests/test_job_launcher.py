@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services.job_launcher import job_launcher
+from app.services.job_manager import job_manager
+from config import Config
+
+
+@pytest.fixture
+def export(tmp_path, monkeypatch):
+    """An export body of its own; scheduled exports stay running until finished by the test"""
+    monkeypatch.setattr(job_launcher, '_schedule', lambda job_type, job_id, body: None)
+    # Real mode, so reuse checks that the outputs are still on disk
+    monkeypatch.setattr(Config, 'DEMO_MODE', False)
+    config = tmp_path / 'config.xml'
+    config.write_text(f'<config name="{tmp_path.name}"/>')
+    return {'host': 'acp01', 'productLine': 'PL1', 'xmlConfig': str(config)}
+
+
+def _finish(job_id, tmp_path, exit_code=0):
+    bundle = tmp_path / f'{job_id}.zip'
+    bundle.write_bytes(b'bundle')
+    job_manager.complete_job(job_id, {'exit_code': exit_code, 'log': '',
+                                      'output_files': {bundle.name: str(bundle)}})
+    return bundle
+
+
+def test_identical_export_attaches_to_the_running_job(export):
+    first = job_launcher.start('acp-export', export)
+    assert job_launcher.start('acp-export', dict(export)) == first
+    assert 'Identical export request attached to this job' in job_manager.get_job(first).log
+
+
+def test_different_exports_do_not_coalesce(export):
+    first = job_launcher.start('acp-export', export)
+    assert job_launcher.start('acp-export', dict(export, productLine='PL2')) != first
+    assert job_launcher.start('acp-export', dict(export, host='acp02')) != first
+
+
+def test_fresh_success_is_reused(export, tmp_path):
+    first = job_launcher.start('acp-export', export)
+    _finish(first, tmp_path)
+    assert job_launcher.start('acp-export', export) == first
+
+
+def test_reuse_ends_with_the_freshness_window(export, tmp_path):
+    first = job_launcher.start('acp-export', export)
+    _finish(first, tmp_path)
+    job = job_manager.get_job(first)
+    job.finished_at = datetime.utcnow() - timedelta(seconds=Config.EXPORT_FRESHNESS_SECONDS + 1)
+    assert job_launcher.start('acp-export', export) != first
+
+
+def test_missing_outputs_are_not_reused(export, tmp_path):
+    first = job_launcher.start('acp-export', export)
+    _finish(first, tmp_path).unlink()
+    assert job_launcher.start('acp-export', export) != first
+
+
+def test_failed_export_is_not_reused(export, tmp_path):
+    first = job_launcher.start('acp-export', export)
+    _finish(first, tmp_path, exit_code=1)
+    assert job_manager.get_job(first).status == 'error'
+    assert job_launcher.start('acp-export', export) != first
+
+
+@pytest.mark.parametrize('policy', ['refresh', 'bypass'])
+def test_refresh_and_bypass_attach_but_never_reuse(export, tmp_path, policy):
+    first = job_launcher.start('acp-export', export)
+    assert job_launcher.start('acp-export', dict(export, cachePolicy=policy)) == first
+    _finish(first, tmp_path)
+    assert job_launcher.start('acp-export', dict(export, cachePolicy=policy)) != first
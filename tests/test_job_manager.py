@@ -0,0 +1,47 @@
+from app.services.analysis_cache import analysis_cache
+from app.services.job_manager import job_manager
+
+LOG = 'Connecting to Agile\nExported 12 objects\nDone\n'
+
+
+def _run(job_type, log, exit_code=0):
+    job_id = job_manager.create_job(job_type=job_type)
+    analysis, version = analysis_cache.analyze(log, exit_code, job_type)
+
+    def target():
+        return {'log': log, 'exit_code': analysis.exit_code, 'reported_exit_code': exit_code,
+                'analysis': analysis.to_dict(), 'rules_version': version}
+
+    job_manager.run_job(job_id, target)
+    return job_manager.get_job(job_id)
+
+
+def test_reanalysis_sees_the_text_the_first_analysis_saw():
+    job = _run('averify', LOG)
+    original = job.analysis
+    assert 'started' in job.log and job.log[slice(*job.analyzed_span)] == LOG
+
+    job.rules_version = 'stale'
+    assert job_manager.reanalyze_job(job.id)
+    assert job.analysis == original
+
+
+def test_cancelled_jobs_can_be_reanalyzed():
+    job = _run('averify', LOG, exit_code=9)
+    assert job.status == 'cancelled'
+    job.rules_version = 'stale'
+    assert job_manager.reanalyze_job(job.id)
+
+
+def test_reanalysis_ignores_the_acp_log_file():
+    job = _run('acp-import', LOG)
+    original = job.analysis
+    # The program log on disk can differ from the command output the first pass analyzed
+    job_manager.get_job_work_dir(job.id)
+    with open(job_manager.get_acp_log_path(job.id), 'w') as f:
+        f.write('[ERROR] ORA-12541: TNS:no listener\nImport failed\n')
+
+    job.rules_version = 'stale'
+    assert job_manager.reanalyze_job(job.id)
+    assert job.analysis == original
+    assert job.status == 'success'
@@ -0,0 +1,36 @@
+from app.services.log_index import LogIndex
+
+
+def test_hits_are_marked_apart_from_level_brackets(tmp_path):
+    index = LogIndex(str(tmp_path / 'index.db'))
+    index.add_text('job-1', 'acp-import', '[INFO] Connecting\n[ERROR] ORA-12541: TNS:no listener\n')
+    index.flush()
+
+    results = index.search('ORA-12541')
+    assert len(results) == 1
+    assert results[0]['line'] == 2
+    assert results[0]['snippet'] == '[ERROR] <mark>ORA-12541</mark>: TNS:no listener'
+
+
+def test_snippets_are_html_escaped(tmp_path):
+    index = LogIndex(str(tmp_path / 'index.db'))
+    index.add_text('job-1', 'acp-export', '<object name="PL1 & co"><mark>ORA-12541</mark></object>\n')
+    index.flush()
+
+    snippet = index.search('ORA-12541')[0]['snippet']
+    assert snippet == ('&lt;object name="PL1 &amp; co"&gt;&lt;mark&gt;<mark>ORA-12541</mark>'
+                       '&lt;/mark&gt;&lt;/object&gt;')
+
+
+def test_writer_survives_a_vanished_file(tmp_path, monkeypatch):
+    index = LogIndex(str(tmp_path / 'index.db'))
+    log = tmp_path / 'import.log'
+    log.write_text('ORA-01017: invalid username/password\n')
+    # Removed between the exists() check and open(), as a racing delete_job would
+    monkeypatch.setattr('os.path.exists', lambda path: True)
+    index.add_file('job-1', 'acp-import', str(tmp_path / 'missing.log'), 'import.log')
+    index.add_file('job-1', 'acp-import', str(log), 'import.log')
+    index.flush(timeout=5)
+
+    assert index._thread.is_alive()
+    assert [r['line'] for r in index.search('ORA-01017')] == [1]
@@ -0,0 +1,40 @@
+import pytest
+
+from app.services.parser_rules import ACP_ITEM_PATTERNS, DEFAULT_PROFILE, RuleRegistry
+
+
+def test_item_patterns_are_inherited_per_key():
+    registry = RuleRegistry()
+    registry.load_dict({
+        'acp-import-strict': {
+            'extends': 'acp-import',
+            'itemPatterns': {'failed': r'rejected\s+(\d+)\s+object'},
+        },
+    })
+    profile = registry.get('acp-import-strict')
+    assert profile.item_patterns == {
+        'processed': ACP_ITEM_PATTERNS['processed'],
+        'failed': r'rejected\s+(\d+)\s+object',
+        'skipped': ACP_ITEM_PATTERNS['skipped'],
+    }
+    assert profile.issue_rules == registry.get('acp-import').issue_rules
+
+
+def test_null_item_pattern_drops_the_key():
+    registry = RuleRegistry()
+    registry.load_dict({'acp-export': {'itemPatterns': {'skipped': None}}})
+    assert set(registry.get('acp-export').item_patterns) == {'processed', 'failed'}
+    assert registry.get('acp-export').skipped_regex is None
+
+
+def test_default_profile():
+    registry = RuleRegistry()
+    assert registry.get().name == DEFAULT_PROFILE
+
+
+def test_unknown_profile_is_an_error():
+    registry = RuleRegistry()
+    with pytest.raises(KeyError):
+        registry.get('acp-exprot')
+    with pytest.raises(ValueError):
+        registry.load_dict({'strict': {'extends': 'acp-imprt'}})
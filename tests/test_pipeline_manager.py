@@ -0,0 +1,90 @@
+import os
+import threading
+import time
+
+from app.services.export_cache import export_cache
+from app.services.job_launcher import config_digest, job_launcher
+from app.services.job_manager import job_manager
+from app.services.pipeline_manager import pipeline_manager
+
+
+def _submit(spec, timeout=5):
+    """Submit on another thread, so a deadlock fails the test instead of hanging it"""
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(pipeline=pipeline_manager.submit(spec)),
+                              daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert 'pipeline' in result, 'pipeline submit did not return'
+    return result['pipeline']
+
+
+def _wait(pipeline, timeout=5):
+    deadline = time.monotonic() + timeout
+    while pipeline.status == 'running' and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return pipeline
+
+
+def test_export_step_served_from_cache(tmp_path):
+    config = tmp_path / 'config.xml'
+    config.write_text('<config/>')
+    bundle = tmp_path / 'export_PL1.zip'
+    bundle.write_bytes(b'bundle')
+    key = export_cache.key('DEV', 'PL1', config_digest(str(config)))
+    assert export_cache.put(key, 'DEV', 'PL1', config_digest(str(config)),
+                            {bundle.name: str(bundle)})
+
+    pipeline = _wait(_submit({
+        'defaults': {'host': 'acp01', 'xmlConfig': str(config)},
+        'steps': [
+            {'id': 'export', 'type': 'acp-export', 'sourceEnv': 'DEV', 'productLine': 'PL1'},
+            {'id': 'import', 'type': 'acp-import', 'targetEnv': 'QA', 'dependsOn': ['export']},
+        ],
+    }))
+
+    assert pipeline.status == 'success'
+    export_job = pipeline.steps['export'].job_id
+    assert 'Served from export cache' in job_manager.get_job(export_job).log
+    assert os.path.exists(job_manager.get_job(export_job).output_files[bundle.name])
+
+
+def test_step_whose_start_fails_at_once(monkeypatch):
+    def fail(job_id, body):
+        raise RuntimeError('no averify here')
+
+    monkeypatch.setattr(job_launcher, '_start_averify', fail)
+    pipeline = _wait(_submit({
+        'defaults': {'host': 'acp01'},
+        'steps': [
+            {'id': 'verify', 'type': 'averify', 'sourceEnv': 'DEV', 'targetEnv': 'QA'},
+            {'id': 'after', 'type': 'averify', 'sourceEnv': 'DEV', 'targetEnv': 'UAT',
+             'dependsOn': ['verify']},
+        ],
+    }))
+
+    assert pipeline.status == 'error'
+    assert pipeline.steps['verify'].status == 'error'
+    assert pipeline.steps['after'].status == 'skipped'
+
+
+def test_deleting_a_step_job_fails_the_step(monkeypatch):
+    # The averify jobs never start, so they are still running when deleted
+    monkeypatch.setattr(job_launcher, '_start_averify', lambda job_id, body: None)
+    pipeline = _submit({
+        'defaults': {'host': 'acp01'},
+        'steps': [
+            {'id': 'v1', 'type': 'averify', 'sourceEnv': 'DEV', 'targetEnv': 'QA'},
+            {'id': 'v2', 'type': 'averify', 'sourceEnv': 'DEV', 'targetEnv': 'UAT',
+             'dependsOn': ['v1']},
+        ],
+    })
+    job_id = pipeline.steps['v1'].job_id
+    assert pipeline.steps['v1'].status == 'running'
+
+    job_manager.delete_job(job_id)
+    assert pipeline.status == 'error'
+    assert pipeline.finished_at is not None
+    assert pipeline.steps['v1'].error == f'Job {job_id} was deleted'
+    assert pipeline.steps['v2'].status == 'skipped'
+    assert job_id not in pipeline_manager._steps_by_job
@@ -0,0 +1,73 @@
+from app.services.job_manager import job_manager
+from app.services.resource_scheduler import Claim, ResourceScheduler, resource_claims
+
+
+def _submit(scheduler, started, claims, job_type='acp-import'):
+    job_id = job_manager.create_job(job_type=job_type, host='h1')
+    scheduler.submit(job_id, claims, lambda: started.append(job_id))
+    return job_id
+
+
+def _finish(job_id):
+    job_manager.complete_job(job_id, {'exit_code': 0, 'log': ''})
+
+
+def test_resource_claims_by_job_type():
+    assert resource_claims('acp-import', {'host': 'h1', 'targetEnv': 'QA'}) == [
+        Claim('env:QA', True), Claim('host:h1')]
+    assert resource_claims('acp-export', {'host': 'h1', 'sourceEnv': 'DEV'}) == [
+        Claim('env:DEV'), Claim('host:h1')]
+    # Averify reads both environments; one environment on both sides is claimed once
+    assert resource_claims('averify', {'host': 'h1', 'sourceEnv': 'QA', 'targetEnv': 'QA'}) == [
+        Claim('env:QA'), Claim('host:h1')]
+
+
+def test_writers_to_one_target_run_one_at_a_time():
+    scheduler, started = ResourceScheduler(0, 0), []
+    first = _submit(scheduler, started, [Claim('env:QA', True)])
+    second = _submit(scheduler, started, [Claim('env:QA', True)])
+    other = _submit(scheduler, started, [Claim('env:UAT', True)])
+    assert started == [first, other]
+    _finish(first)
+    assert started == [first, other, second]
+
+
+def test_waiting_writer_is_not_overtaken_by_readers():
+    scheduler, started = ResourceScheduler(0, 0), []
+    reader = _submit(scheduler, started, [Claim('env:DEV')], 'acp-export')
+    writer = _submit(scheduler, started, [Claim('env:DEV', True)])
+    late_reader = _submit(scheduler, started, [Claim('env:DEV')], 'acp-export')
+    assert started == [reader]
+    _finish(reader)
+    assert started == [reader, writer]
+    _finish(writer)
+    assert started == [reader, writer, late_reader]
+
+
+def test_host_limit():
+    scheduler, started = ResourceScheduler(1, 0), []
+    first = _submit(scheduler, started, [Claim('host:h1')])
+    second = _submit(scheduler, started, [Claim('host:h1')])
+    assert started == [first]
+    _finish(first)
+    assert started == [first, second]
+
+
+def test_deleting_a_running_job_releases_its_claims():
+    scheduler, started = ResourceScheduler(0, 0), []
+    running = _submit(scheduler, started, [Claim('env:QA', True), Claim('host:h1')])
+    waiting = _submit(scheduler, started, [Claim('env:QA', True), Claim('host:h1')])
+    assert started == [running]
+    job_manager.delete_job(running)
+    assert started == [running, waiting]
+    assert [r['jobId'] for r in scheduler.snapshot()['running']] == [waiting]
+
+
+def test_deleting_a_queued_job_removes_it_from_the_queue():
+    scheduler, started = ResourceScheduler(0, 0), []
+    running = _submit(scheduler, started, [Claim('env:QA', True)])
+    queued = _submit(scheduler, started, [Claim('env:QA', True)])
+    job_manager.delete_job(queued)
+    assert scheduler.snapshot()['queued'] == []
+    _finish(running)
+    assert started == [running]
@@ -0,0 +1,92 @@
+import os
+import time
+
+import pytest
+
+from app.models.environment import Environment
+from app.services.job_launcher import job_launcher
+from app.services.job_manager import job_manager
+from app.services.workspaces import WorkspaceManager, workspace_manager
+from config import Config
+
+
+@pytest.fixture
+def project(tmp_path):
+    """A shared ACP project directory, with leftovers from an earlier run"""
+    root = tmp_path / 'project'
+    (root / 'lib').mkdir(parents=True)
+    (root / 'lib' / 'acp.jar').write_bytes(b'jar')
+    (root / 'project.xml').write_text('<project/>')
+    (root / 'config.xml').write_text('<shared/>')
+    (root / 'acp.properties').write_text('a=1\n')
+    (root / 'export_old.zip').write_bytes(b'old')
+    (root / 'export.log').write_text('old run\n')
+    os.symlink('lib', root / 'current')
+    return root
+
+
+def test_create_clones_the_project(tmp_path, project):
+    manager = WorkspaceManager(['*.xml', '*.properties'], ['*.zip', '*.log'])
+    workspace = tmp_path / 'job'
+    workspace.mkdir()
+    config = tmp_path / 'job-config.xml'
+    config.write_text('<job/>')
+    job_id = job_manager.create_job(job_type='acp-export')
+
+    assert manager.create(job_id, str(project), str(workspace), str(config)) == str(workspace / 'config.xml')
+    assert (workspace / 'config.xml').read_text() == '<job/>'
+    assert (workspace / 'project.xml').stat().st_ino != (project / 'project.xml').stat().st_ino
+    assert (workspace / 'lib' / 'acp.jar').stat().st_ino == (project / 'lib' / 'acp.jar').stat().st_ino
+    assert os.readlink(workspace / 'current') == 'lib'
+    assert not (workspace / 'export_old.zip').exists()
+    assert not (workspace / 'export.log').exists()
+    assert sorted(os.path.relpath(p, workspace) for p in manager.created(job_id)) == sorted([
+        'lib', os.path.join('lib', 'acp.jar'), 'current', 'project.xml', 'acp.properties', 'config.xml'])
+
+
+def test_cleanup_keeps_what_the_run_created(tmp_path, project):
+    manager = WorkspaceManager(['*.xml', '*.properties'], ['*.zip', '*.log'])
+    workspace = tmp_path / 'job'
+    workspace.mkdir()
+    job_id = job_manager.create_job(job_type='acp-export')
+    manager.create(job_id, str(project), str(workspace), str(project / 'config.xml'))
+    (workspace / 'export_PL1.zip').write_bytes(b'bundle')
+    (workspace / 'lib' / 'run.tmp').write_text('')
+
+    manager.cleanup(job_id, keep=[str(workspace / 'acp.properties')])
+    assert sorted(os.listdir(workspace)) == ['acp.properties', 'export_PL1.zip', 'lib']
+    assert os.listdir(workspace / 'lib') == ['run.tmp']
+    assert manager.created(job_id) == []
+    # The shared project is untouched
+    assert (project / 'lib' / 'acp.jar').read_bytes() == b'jar'
+    assert (project / 'config.xml').read_text() == '<shared/>'
+
+
+def test_export_outputs_exclude_the_clone(tmp_path, project, monkeypatch):
+    config = tmp_path / 'config.xml'
+    config.write_text('<job/>')
+    monkeypatch.setattr(Config, 'DEMO_MODE', False)
+    monkeypatch.setattr(Environment, 'find_by_tag',
+                        lambda tag: Environment(tag=tag, acp_project_dir=str(project)))
+
+    def run(cmd, work_dir):
+        with open(os.path.join(work_dir, 'export_PL1.zip'), 'wb') as f:
+            f.write(b'bundle')
+        return {'exit_code': 0, 'log': 'Exported 1 objects\n'}
+
+    monkeypatch.setattr(job_launcher.acp_service, '_local_run', run)
+    job_id = job_manager.create_job(job_type='acp-export', host='acp01')
+    job_launcher.start('acp-export', {'host': 'acp01', 'sourceEnv': 'DEV', 'productLine': 'PL1',
+                                      'xmlConfig': str(config)}, job_id=job_id)
+    job = job_manager.get_job(job_id)
+    deadline = time.monotonic() + 5
+    while job.finished_at is None and time.monotonic() < deadline:
+        time.sleep(0.02)
+
+    assert job.status == 'success'
+    work_dir = job_manager.get_job_work_dir(job_id)
+    assert job.output_files == {'export_PL1.zip': os.path.join(work_dir, 'export_PL1.zip')}
+    # With nothing of the clone kept as an output, cleanup removes all of it
+    assert not os.path.exists(os.path.join(work_dir, 'project.xml'))
+    assert not os.path.exists(os.path.join(work_dir, 'lib'))
+    assert workspace_manager.created(job_id) == []